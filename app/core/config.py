@@ -1,24 +1,30 @@
 import json
 import os
+import re
 import shutil
 import logging
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
-CONFIG_PATH = "/config/settings.json"
-BACKUP_PATH = "/config/settings.json.bak"
+CONFIG_DIR = os.environ.get("CONFIG_DIR", "/config")
+CONFIG_PATH = os.path.join(CONFIG_DIR, "settings.json")
+BACKUP_PATH = os.path.join(CONFIG_DIR, "settings.json.bak")
 
 
 class RadarrSettings(BaseModel):
     url: str = ""
     api_key: str = ""
+    # Upper bound for the adaptive in-flight request limit
+    max_concurrency: int = 4
 
 
 class SonarrSettings(BaseModel):
     url: str = ""
     api_key: str = ""
+    # Upper bound for the adaptive in-flight request limit
+    max_concurrency: int = 4
 
 
 class SchedulerSettings(BaseModel):
@@ -31,6 +37,16 @@ class ServicePathMapping(BaseModel):
     to_prefix: str = ""
 
 
+class ArrInstance(BaseModel):
+    """An additional Radarr/Sonarr instance (4K, anime...) with its own tags and path mapping."""
+    name: str = ""
+    url: str = ""
+    api_key: str = ""
+    exclude_tag_ids: List[int] = []
+    mapping: ServicePathMapping = ServicePathMapping(from_prefix="/data/", to_prefix="/mnt/chloe/data/")
+    max_concurrency: int = 4
+
+
 class ExclusionSettings(BaseModel):
     custom_folders: List[str] = []
     radarr_exclude_tag_ids: List[int] = []
@@ -44,10 +60,23 @@ class ExclusionSettings(BaseModel):
     radarr_mapping: ServicePathMapping = ServicePathMapping(from_prefix="/data/", to_prefix="/mnt/chloe/data/")
     sonarr_mapping: ServicePathMapping = ServicePathMapping(from_prefix="/data/", to_prefix="/mnt/chloe/data/")
     plexcache_mapping: ServicePathMapping = ServicePathMapping(from_prefix="/chloe/", to_prefix="/mnt/chloe/data/media/")
-    last_build: Optional[str] = None
     full_sync_cron: str = "0 * * * *"
     log_monitor_cron: str = "*/5 * * * *"
-    last_stats_update: Optional[str] = None
+    # Keep this share of the cache pool free of excluded data
+    capacity_headroom_pct: float = 10.0
+    # Drop the lowest-priority exclusions when the set would not fit the budget
+    capacity_trim_enabled: bool = False
+    capacity_source_priority: List[str] = ["custom", "plexcache", "radarr", "sonarr"]
+    # Check cheap change signals before each sync and skip it when nothing moved,
+    # backing off between min and max interval instead of following full_sync_cron
+    adaptive_sync_enabled: bool = False
+    adaptive_min_interval_minutes: int = 15
+    adaptive_max_interval_minutes: int = 360
+    # Run builds in a separate process so CPU-heavy decoding does not stall the web UI
+    build_in_worker_process: bool = False
+    # Sources and existence checks still running after this long are cut off and
+    # the previous file's entries are used for them (0 = no deadline)
+    build_deadline_seconds: int = 900
 
 
 
@@ -64,12 +93,51 @@ class WebhookSettings(BaseModel):
     discord_notify_log_errors: bool = True
     discord_notify_log_warnings: bool = False
 
+class DebugSettings(BaseModel):
+    profiling_enabled: bool = False
+
+
 class UserSettings(BaseModel):
     radarr: RadarrSettings = RadarrSettings()
     sonarr: SonarrSettings = SonarrSettings()
     exclusions: ExclusionSettings = ExclusionSettings()
     scheduler: SchedulerSettings = SchedulerSettings()
     webhooks: WebhookSettings = WebhookSettings()
+    debug: DebugSettings = DebugSettings()
+    # Built alongside the main radarr/sonarr connection above
+    radarr_instances: List[ArrInstance] = []
+    sonarr_instances: List[ArrInstance] = []
+
+
+ARR_SERVICES = ("radarr", "sonarr")
+
+
+def instance_slug(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def arr_service(source: str) -> str:
+    """The service a source name belongs to: radarr for both radarr and radarr-4k."""
+    return source.partition("-")[0]
+
+
+def arr_sources(settings: "UserSettings", service: str) -> Dict[str, ArrInstance]:
+    """
+    Source name -> instance for every configured instance of a service: the
+    main connection as "radarr"/"sonarr" (its tags and mapping live under
+    exclusions), then each additional one as e.g. "radarr-4k".
+    """
+    ex = settings.exclusions
+    main = getattr(settings, service)
+    sources = {service: ArrInstance(name=service, url=main.url, api_key=main.api_key,
+                                    exclude_tag_ids=getattr(ex, f"{service}_exclude_tag_ids"),
+                                    mapping=getattr(ex, f"{service}_mapping"),
+                                    max_concurrency=main.max_concurrency)}
+    for instance in getattr(settings, f"{service}_instances"):
+        slug = instance_slug(instance.name)
+        if slug:
+            sources[f"{service}-{slug}"] = instance
+    return sources
 
 
 def _log_settings_snapshot(settings: UserSettings, context: str):
@@ -0,0 +1,165 @@
+"""
+Coordination between uvicorn workers sharing one /config directory: leader
+election on an flock'ed file (only the leader runs the scheduled builds,
+webhook rebuilds and manual build requests), a small SQLite database for
+the webhook debounce, build requests and build metrics, and file locks plus unique temp
+files for the JSON files more than one writer updates.
+"""
+import fcntl
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+from app.core.config import CONFIG_DIR
+
+logger = logging.getLogger(__name__)
+
+COORDINATION_DB_PATH = os.path.join(CONFIG_DIR, "coordination.db")
+LEADER_LOCK_PATH = os.path.join(CONFIG_DIR, "leader.lock")
+# How often a follower tries to take over from a leader that went away
+LEADER_RETRY_SECONDS = 5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending_rebuilds (
+    source TEXT PRIMARY KEY,
+    due_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS build_requests (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    trigger TEXT NOT NULL,
+    requested_at REAL NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS shared_metrics (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (name, labels)
+);
+"""
+_schema_ready = False
+
+
+@contextmanager
+def coordination_db():
+    """A short-lived connection; commits on success, rolls back on error."""
+    global _schema_ready
+    db = sqlite3.connect(COORDINATION_DB_PATH, timeout=10)
+    try:
+        if not _schema_ready:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+            _schema_ready = True
+        with db:
+            yield db
+    finally:
+        db.close()
+
+
+@contextmanager
+def file_lock(path: str):
+    """Exclusive lock shared by every worker, held on path + '.lock'."""
+    with open(path + ".lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def file_identity(path: str) -> Optional[tuple]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def write_json(path: str, data, **dump_kwargs):
+    """Atomic replace through a temp file unique to this call, so concurrent writers (threads or workers) never share one."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        # mkstemp creates 0600; keep the files readable like the ones open() used to create
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, **dump_kwargs)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class LeaderElection:
+    def __init__(self, path: str = LEADER_LOCK_PATH):
+        self.path = path
+        self.started = False
+        self.is_leader = False
+        self._file = None
+        self._on_elected = None
+
+    def leads(self) -> bool:
+        """True for the leader, and for processes that never joined an election (scripts, benchmarks)."""
+        return self.is_leader or not self.started
+
+    def start(self, on_elected: Callable[[], None]):
+        """Try to lead now; if another worker does, keep trying in the background until it goes away."""
+        if self.started:
+            return
+        self.started = True
+        self._on_elected = on_elected
+        if self._try_acquire():
+            return
+        logger.info(f"[LEADER] Worker {os.getpid()} is a follower (leader is pid {self.leader_pid()})")
+        threading.Thread(target=self._wait_for_leadership, name="leader-election", daemon=True).start()
+
+    def _try_acquire(self) -> bool:
+        f = open(self.path, "a+")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        f.seek(0)
+        f.truncate()
+        f.write(str(os.getpid()))
+        f.flush()
+        # The lock lives as long as this file stays open, i.e. until the process exits
+        self._file = f
+        self.is_leader = True
+        logger.info(f"[LEADER] Worker {os.getpid()} is the leader")
+        try:
+            self._on_elected()
+        except Exception as e:
+            logger.error(f"[LEADER] Failed to start leader duties: {e}", exc_info=True)
+        return True
+
+    def _wait_for_leadership(self):
+        while not self._try_acquire():
+            time.sleep(LEADER_RETRY_SECONDS)
+
+    def leader_pid(self) -> Optional[int]:
+        try:
+            with open(self.path, "r") as f:
+                return int(f.read().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
+
+    def info(self) -> dict:
+        return {"pid": os.getpid(), "is_leader": self.is_leader, "leader_pid": self.leader_pid()}
+
+
+_election = LeaderElection()
+
+
+def get_leader_election() -> LeaderElection:
+    return _election
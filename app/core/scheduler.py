@@ -1,52 +1,107 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
-from app.core.config import get_user_settings, save_user_settings
+from apscheduler.triggers.interval import IntervalTrigger
+from app.core.config import CONFIG_PATH, get_user_settings
+from app.core.coordination import file_identity
+from app.core.state import get_state_store
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-def run_sync_task():
+def run_sync_task() -> bool:
     logger.info("[SCHEDULER] run_sync_task() triggered")
     try:
-        from app.services.exclusions import get_exclusion_manager
-        result = get_exclusion_manager().build_exclusions()
+        from app.services.build_runner import run_build
+        result = run_build("schedule")
         logger.info(f"[SCHEDULER] Exclusion build complete: {result}")
     except Exception as e:
         logger.error(f"[SCHEDULER] Exclusion build FAILED: {e}", exc_info=True)
-        return
+        return False
+    # The build records its own last_build timestamp in the state store
+    return True
+
 
+def run_adaptive_sync_task():
+    """Build only if a change signal moved; back off the interval while nothing does."""
+    from app.services.sync_signals import get_adaptive_sync
+    from app.services.build_history import get_build_history
+    adaptive = get_adaptive_sync()
+    settings = get_user_settings()
     try:
-        settings = get_user_settings()
-        settings.exclusions.last_build = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        save_user_settings(settings)
-        logger.info(f"[SCHEDULER] Sync timestamp saved: {settings.exclusions.last_build}")
+        signals, reasons = adaptive.check(settings)
     except Exception as e:
-        logger.error(f"[SCHEDULER] Failed to save last_build timestamp: {e}", exc_info=True)
+        logger.error(f"[SCHEDULER] Change check FAILED, building anyway: {e}", exc_info=True)
+        signals, reasons = None, ["check failed"]
+
+    if not reasons:
+        minutes = adaptive.skipped(settings)
+        logger.info(f"[SCHEDULER] Sync skipped — nothing changed since the last build; next check in {minutes}m")
+        get_build_history().record({
+            "finished_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "result": "skipped",
+            "reason": "No Radarr/Sonarr history, PlexCache, mover run or settings change",
+            "next_check_minutes": minutes,
+        })
+        scheduler_service.set_sync_interval(minutes)
+        return
+
+    logger.info(f"[SCHEDULER] Adaptive sync running — {', '.join(reasons)}")
+    if run_sync_task() and signals is not None:
+        scheduler_service.set_sync_interval(adaptive.built(signals, reasons, settings))
 
 
 def run_stats_task():
     logger.info("[SCHEDULER] run_stats_task() triggered")
+    if get_user_settings().exclusions.adaptive_sync_enabled:
+        from app.services.sync_signals import get_adaptive_sync
+        if not get_adaptive_sync().new_mover_run():
+            logger.info("[SCHEDULER] Stats refresh skipped — no new mover run")
+            return
     try:
         from app.services.ca_mover import get_mover_parser
         parser = get_mover_parser()
         stats = parser.get_latest_stats()
         if stats:
             logger.info(f"[SCHEDULER] Stats refresh complete — filtered={stats.get('files_filtered', '?')} moved={stats.get('files_moved', '?')}")
+            # Warm the effectiveness report; it is only recomputed when a new mover run appears
+            from app.services.effectiveness import get_effectiveness_report
+            get_effectiveness_report().get()
         else:
             logger.info("[SCHEDULER] Stats refresh complete — no mover log files found yet")
     except Exception as e:
         logger.error(f"[SCHEDULER] Stats refresh FAILED: {e}", exc_info=True)
         return
 
+    get_state_store().update(last_stats_update=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+
+
+def run_settings_watch():
     try:
-        settings = get_user_settings()
-        settings.exclusions.last_stats_update = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        save_user_settings(settings)
-        logger.info(f"[SCHEDULER] Stats timestamp saved: {settings.exclusions.last_stats_update}")
+        scheduler_service.reload_if_settings_changed()
     except Exception as e:
-        logger.error(f"[SCHEDULER] Failed to save last_stats_update timestamp: {e}", exc_info=True)
+        logger.error(f"[SCHEDULER] Settings watch FAILED: {e}", exc_info=True)
+
+
+def run_health_probe():
+    try:
+        from app.services.health_monitor import get_health_monitor
+        get_health_monitor().probe_all()
+    except Exception as e:
+        logger.error(f"[SCHEDULER] Health probe FAILED: {e}", exc_info=True)
+
+
+def run_cache_index_scan():
+    try:
+        from app.services.cache_index import get_cache_index
+        get_cache_index().refresh()
+    except Exception as e:
+        logger.error(f"[SCHEDULER] Cache index scan FAILED: {e}", exc_info=True)
+
+
+# How often the leader checks whether another worker saved new schedules
+SETTINGS_WATCH_SECONDS = 5
 
 
 class CacheScheduler:
@@ -54,39 +109,107 @@ class CacheScheduler:
         self.scheduler = BackgroundScheduler()
         self.sync_id = "full_sync"
         self.monitor_id = "log_monitor"
+        self.health_id = "health_probe"
+        self.cache_index_id = "cache_index_scan"
+        self.settings_watch_id = "settings_watch"
+        self.leading = False
+        self._settings_identity = None
 
     def start(self):
+        """Jobs every worker runs for its own pages: upstream health probes and cache index scans."""
+        from app.services.health_monitor import PROBE_INTERVAL_SECONDS
+        self.scheduler.add_job(
+            run_health_probe,
+            IntervalTrigger(seconds=PROBE_INTERVAL_SECONDS),
+            id=self.health_id,
+            next_run_time=datetime.now(),
+            max_instances=1,
+            coalesce=True
+        )
+        from app.services.cache_index import RESCAN_INTERVAL_SECONDS
+        self.scheduler.add_job(
+            run_cache_index_scan,
+            IntervalTrigger(seconds=RESCAN_INTERVAL_SECONDS),
+            id=self.cache_index_id,
+            next_run_time=datetime.now(),
+            max_instances=1,
+            coalesce=True
+        )
+        self.scheduler.start()
+        logger.info("[SCHEDULER] BackgroundScheduler started successfully")
+
+    def start_leader_jobs(self):
+        """Builds and the stats refresh; only the leader worker runs these."""
         settings = get_user_settings()
+        self._settings_identity = file_identity(CONFIG_PATH)
         sync_cron = settings.exclusions.full_sync_cron
         monitor_cron = settings.exclusions.log_monitor_cron
 
-        logger.info(f"[SCHEDULER] Starting — sync_cron={sync_cron!r}  monitor_cron={monitor_cron!r}")
+        logger.info(f"[SCHEDULER] Starting leader jobs — sync_cron={sync_cron!r}  monitor_cron={monitor_cron!r}  "
+                    f"adaptive={settings.exclusions.adaptive_sync_enabled}")
 
-        self.scheduler.add_job(
-            run_sync_task,
-            CronTrigger.from_crontab(sync_cron),
-            id=self.sync_id,
-            misfire_grace_time=60
-        )
+        self._add_sync_job(settings)
         self.scheduler.add_job(
             run_stats_task,
             CronTrigger.from_crontab(monitor_cron),
             id=self.monitor_id,
-            misfire_grace_time=60
+            misfire_grace_time=60,
+            replace_existing=True
+        )
+        self.scheduler.add_job(
+            run_settings_watch,
+            IntervalTrigger(seconds=SETTINGS_WATCH_SECONDS),
+            id=self.settings_watch_id,
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True
+        )
+        self.leading = True
+
+    def _add_sync_job(self, settings):
+        """Cron-driven builds, or in adaptive mode a change check on a self-adjusting interval."""
+        ex = settings.exclusions
+        if ex.adaptive_sync_enabled:
+            from app.services.sync_signals import get_adaptive_sync
+            minutes = get_adaptive_sync().interval_minutes or ex.adaptive_min_interval_minutes
+            func, trigger = run_adaptive_sync_task, IntervalTrigger(minutes=minutes)
+        else:
+            func, trigger = run_sync_task, CronTrigger.from_crontab(ex.full_sync_cron)
+        self.scheduler.add_job(
+            func,
+            trigger,
+            id=self.sync_id,
+            misfire_grace_time=60,
+            max_instances=1,
+            replace_existing=True
         )
-        self.scheduler.start()
-        logger.info("[SCHEDULER] BackgroundScheduler started successfully")
+
+    def set_sync_interval(self, minutes: int):
+        """Next adaptive check in this many minutes (ignored if adaptive mode was switched off meanwhile)."""
+        if not get_user_settings().exclusions.adaptive_sync_enabled:
+            return
+        self.scheduler.reschedule_job(self.sync_id, trigger=IntervalTrigger(minutes=minutes))
 
     def reload_jobs(self):
+        if not self.leading:
+            logger.info("[SCHEDULER] Not the leader worker — the leader picks up the new schedules")
+            return
+        self._settings_identity = file_identity(CONFIG_PATH)
         settings = get_user_settings()
         sync_cron = settings.exclusions.full_sync_cron
         monitor_cron = settings.exclusions.log_monitor_cron
 
-        logger.info(f"[SCHEDULER] Reloading jobs — sync_cron={sync_cron!r}  monitor_cron={monitor_cron!r}")
+        logger.info(f"[SCHEDULER] Reloading jobs — sync_cron={sync_cron!r}  monitor_cron={monitor_cron!r}  "
+                    f"adaptive={settings.exclusions.adaptive_sync_enabled}")
 
-        self.scheduler.reschedule_job(self.sync_id, trigger=CronTrigger.from_crontab(sync_cron))
+        self._add_sync_job(settings)
         self.scheduler.reschedule_job(self.monitor_id, trigger=CronTrigger.from_crontab(monitor_cron))
         logger.info("[SCHEDULER] Jobs reloaded successfully")
 
+    def reload_if_settings_changed(self):
+        """Settings saved through another worker only reach the leader through the file."""
+        if self.leading and file_identity(CONFIG_PATH) != self._settings_identity:
+            self.reload_jobs()
+
 
 scheduler_service = CacheScheduler()
@@ -0,0 +1,118 @@
+"""
+Runtime state (last build/stats timestamps and similar volatile values),
+kept in /config/state.json so scheduled jobs never rewrite settings.json.
+Updates go to memory; writes are coalesced into one atomic file replace at
+most every FLUSH_DELAY_SECONDS, and flushed on shutdown. With several
+workers, reads pick up other workers' writes and a flush only overwrites
+the keys this process changed.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+from typing import Any, Optional
+from app.core.config import CONFIG_DIR, CONFIG_PATH, _try_load_json
+from app.core.coordination import file_identity, file_lock, write_json
+
+logger = logging.getLogger(__name__)
+
+STATE_PATH = os.path.join(CONFIG_DIR, "state.json")
+FLUSH_DELAY_SECONDS = 2.0
+# Keys that used to live in settings.json under "exclusions"
+MIGRATED_KEYS = ("last_build", "last_stats_update")
+
+
+class StateStore:
+    def __init__(self, path: str = STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = None
+        self._identity = None
+        self._timer: Optional[threading.Timer] = None
+        # Keys updated here since the last flush
+        self._changed = set()
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"[STATE] Failed to load {self.path}, starting empty: {e}")
+            return {}
+
+    def _load(self):
+        """Caller holds the lock. Rereads the file when another worker replaced it; unflushed local values win."""
+        identity = file_identity(self.path)
+        first = self._data is None
+        if not first and identity == self._identity:
+            return
+        disk = self._read() if identity is not None else {}
+        if not first:
+            disk.update({key: self._data[key] for key in self._changed if key in self._data})
+        self._data = disk
+        self._identity = identity
+        if first:
+            self._migrate()
+
+    def _migrate(self):
+        """Carry timestamps over from settings.json written by older versions (settings.json itself is left alone)."""
+        missing = [key for key in MIGRATED_KEYS if key not in self._data]
+        if not missing or not os.path.exists(CONFIG_PATH):
+            return
+        legacy = (_try_load_json(CONFIG_PATH) or {}).get("exclusions") or {}
+        migrated = {key: legacy[key] for key in missing if legacy.get(key)}
+        if migrated:
+            self._data.update(migrated)
+            self._changed.update(migrated)
+            self._schedule_flush()
+            logger.info(f"[STATE] Migrated {', '.join(migrated)} from settings.json")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            self._load()
+            return self._data.get(key, default)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._load()
+            return dict(self._data)
+
+    def update(self, **values):
+        with self._lock:
+            self._load()
+            self._data.update(values)
+            self._changed.update(values)
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        """Caller holds the lock. Later updates within the delay ride along with the pending write."""
+        if self._timer is None:
+            self._timer = threading.Timer(FLUSH_DELAY_SECONDS, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._changed:
+                return
+            try:
+                with file_lock(self.path):
+                    # Start from what other workers wrote meanwhile
+                    self._load()
+                    write_json(self.path, self._data, indent=2)
+                    self._identity = file_identity(self.path)
+                self._changed.clear()
+            except Exception as e:
+                logger.error(f"[STATE] Failed to save {self.path}: {e}")
+
+
+_store = StateStore()
+atexit.register(_store.flush)
+
+
+def get_state_store() -> StateStore:
+    return _store
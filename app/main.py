@@ -2,21 +2,31 @@ import logging
 import os
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
-from app.routers import dashboard, movies, shows, exclusions, settings, logs, stats, operations, webhooks
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.routers import dashboard, movies, shows, exclusions, settings, logs, stats, operations, webhooks, debug
 from app.core.scheduler import scheduler_service
-from app.core.config import get_user_settings
+from app.services.plexcache import get_plexcache_reader
+from app.services.health_monitor import get_health_monitor
+from app.services.upstream import get_breaker_states, get_governor_states
+from app.services.metrics import render_metrics
+from app.core.config import CONFIG_DIR, CONFIG_PATH, BACKUP_PATH, get_user_settings
+from app.core.state import get_state_store
+from app.core.coordination import get_leader_election
+from app.services.build_runner import get_build_runner
+from app.services.webhook_handler import start_dispatcher
 
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.FileHandler("/config/app.log"),
+        logging.FileHandler(os.path.join(CONFIG_DIR, "app.log")),
         logging.StreamHandler()
     ]
 )
 
 logging.getLogger("apscheduler").setLevel(logging.INFO)
+# Jobs log their own start/finish lines; the executor would log every 30s health probe
+logging.getLogger("apscheduler.executors.default").setLevel(logging.WARNING)
 
 logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
 logging.getLogger("httpx").setLevel(logging.WARNING)
@@ -36,6 +46,7 @@ app.include_router(logs.router, prefix="/logs", tags=["Logs"])
 app.include_router(stats.router, prefix="/stats", tags=["Stats"])
 app.include_router(operations.router, prefix="/operations", tags=["Operations"])
 app.include_router(webhooks.router, prefix="/webhooks", tags=["Webhooks"])
+app.include_router(debug.router, prefix="/debug", tags=["Debug"])
 
 
 @app.get("/")
@@ -47,8 +58,8 @@ async def root():
 @app.get("/health")
 async def health():
     s = get_user_settings()
-    config_path = "/config/settings.json"
-    backup_path = "/config/settings.json.bak"
+    config_path = CONFIG_PATH
+    backup_path = BACKUP_PATH
 
     state = {
         "radarr_url_set": bool(s.radarr.url),
@@ -57,11 +68,12 @@ async def health():
         "sonarr_key_set": bool(s.sonarr.api_key),
         "radarr_tag_count": len(s.exclusions.radarr_exclude_tag_ids),
         "sonarr_tag_count": len(s.exclusions.sonarr_exclude_tag_ids),
+        "radarr_instances": [i.name for i in s.radarr_instances],
+        "sonarr_instances": [i.name for i in s.sonarr_instances],
         "full_sync_cron": s.exclusions.full_sync_cron,
         "log_monitor_cron": s.exclusions.log_monitor_cron,
-        "last_build": s.exclusions.last_build,
-        "last_stats_update": s.exclusions.last_stats_update,
     }
+    runtime = get_state_store().snapshot()
 
     healthy = all([state["radarr_url_set"], state["radarr_key_set"],
                    state["sonarr_url_set"], state["sonarr_key_set"]])
@@ -76,10 +88,28 @@ async def health():
                 "backup_exists": os.path.exists(backup_path),
             },
             "settings": state,
+            "runtime": runtime,
+            "build": get_build_runner().status,
+            "worker": get_leader_election().info(),
+            "upstreams": get_health_monitor().get_all(),
+            "circuits": get_breaker_states(),
+            "concurrency": get_governor_states(),
+            "plexcache": get_plexcache_reader().info(s),
         }
     )
 
 
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/health/upstreams")
+async def health_upstreams():
+    monitor = get_health_monitor()
+    return {"current": monitor.get_all(), "history": monitor.get_history()}
+
+
 @app.on_event("startup")
 async def startup_event():
     logger.info("=" * 60)
@@ -100,4 +130,19 @@ async def startup_event():
         logger.warning("[STARTUP] *** Sonarr credentials missing — check /config/settings.json ***")
 
     scheduler_service.start()
+    # With several uvicorn workers, one of them builds; the others take over if it exits
+    get_leader_election().start(on_elected=_become_leader)
     logger.info("[STARTUP] Scheduler initialized. Startup complete.")
+
+
+def _become_leader():
+    scheduler_service.start_leader_jobs()
+    start_dispatcher()
+    get_build_runner().serve_requests()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    get_build_runner().stop()
+    # Runtime-state writes are coalesced; make sure the last one lands
+    get_state_store().flush()
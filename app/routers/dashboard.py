@@ -2,23 +2,29 @@ from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from app.services.ca_mover import get_mover_parser
-from app.services.radarr import get_radarr_client
-from app.services.sonarr import get_sonarr_client
+from app.services.health_monitor import get_health_monitor
+from app.services.plexcache import get_plexcache_reader
 from app.services.stats_cache import get_stats_cache
+from app.services.build_history import get_build_history
+from app.services.capacity import disk_budget
+from app.services.snapshots import format_bytes
+from app.core.config import CONFIG_DIR, get_user_settings
 import datetime
 import os
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
+templates.env.filters["bytes"] = format_bytes
 
 
 @router.get("/", response_class=HTMLResponse)
 async def dashboard(request: Request):
     mover = get_mover_parser()
     
-    # Test connections (fast - just pings the API)
-    radarr_connected = get_radarr_client().test_connection()
-    sonarr_connected = get_sonarr_client().test_connection()
+    # Connection status comes from the background health monitor — no network calls here
+    health = get_health_monitor()
+    radarr_health = health.get_status("radarr")
+    sonarr_health = health.get_status("sonarr")
     
     # Get counts from cache (reads from exclusion file)
     cache = get_stats_cache()
@@ -56,20 +62,30 @@ async def dashboard(request: Request):
         except Exception:
             last_mover_run = ts
     last_build = "Never"
-    exclusions_file = "/config/mover_exclusions.txt"
+    exclusions_file = os.path.join(CONFIG_DIR, "mover_exclusions.txt")
     if os.path.exists(exclusions_file):
         mtime = os.path.getmtime(exclusions_file)
         last_build = datetime.datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M')
+
+    # Planned usage comes from the last build, real usage from the pool right now
+    latest_build = get_build_history().latest()
+    capacity = (latest_build or {}).get("capacity")
+    if capacity and not capacity.get("error"):
+        capacity = dict(capacity, live=disk_budget(get_user_settings()))
     
     return templates.TemplateResponse("dashboard.html", {
         "request": request,
-        "radarr_up": radarr_connected,
-        "sonarr_up": sonarr_connected,
+        "radarr_up": radarr_health["status"] == "up",
+        "sonarr_up": sonarr_health["status"] == "up",
+        "radarr_health": radarr_health,
+        "sonarr_health": sonarr_health,
         "movie_count": counts['movie_count'],
         "tv_count": counts['tv_count'],
         "exclusion_count": counts['total_count'],
         "ca_mover_status": ca_mover_status,
         "ca_mover_cache": ca_mover_cache,
         "last_mover_run": last_mover_run,
-        "last_build": last_build
+        "last_build": last_build,
+        "plexcache": get_plexcache_reader().info(),
+        "capacity": capacity,
     })
@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import os
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse, FileResponse
+from app.core.config import get_user_settings
+from app.services.profiler import ProfilerBusyError, profile_call, render_page, list_reports, get_report_path
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+PROFILABLE_PAGES = ("/dashboard/", "/movies/", "/shows/", "/exclusions/", "/stats", "/logs", "/webhooks", "/settings")
+
+
+def _require_enabled():
+    # Hidden entirely unless switched on in settings.json ("debug": {"profiling_enabled": true})
+    if not get_user_settings().debug.profiling_enabled:
+        raise HTTPException(status_code=404)
+
+
+def _run_profile(label: str, fn) -> PlainTextResponse:
+    try:
+        report, name = profile_call(label, fn)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(report, headers={"X-Profile-Report": name})
+
+
+@router.post("/profile/build")
+def profile_build():
+    """Run a full exclusion build under the profiler"""
+    _require_enabled()
+    from app.core.coordination import get_leader_election
+    from app.services.build_runner import get_build_runner
+    election = get_leader_election()
+    # Only the leader builds; a follower would hand the build over and profile its own waiting
+    if not election.leads():
+        raise HTTPException(status_code=409, detail=f"Builds run on the leader worker (pid {election.leader_pid()}); "
+                                                    f"this is worker {os.getpid()}, retry until the leader answers")
+    runner = get_build_runner()
+    # Through the runner so it never overlaps another build; refused rather
+    # than queued, so the report does not include the wait
+    if runner.status.get("running"):
+        raise HTTPException(status_code=409, detail="A build is already running, try again when it finishes")
+    return _run_profile("build", lambda: runner.run_build("profile", in_process=True))
+
+
+@router.post("/profile/page")
+def profile_page(path: str = "/dashboard/"):
+    """Render one UI page in-process under the profiler"""
+    _require_enabled()
+    if path.partition("?")[0] not in PROFILABLE_PAGES:
+        raise HTTPException(status_code=400, detail=f"path must be one of {', '.join(PROFILABLE_PAGES)}")
+
+    def render():
+        status, body = asyncio.run(render_page(path))
+        return {"status": status, "bytes": len(body)}
+
+    return _run_profile(f"page {path}", render)
+
+
+@router.get("/profiles")
+def profiles():
+    _require_enabled()
+    return [{k: v for k, v in r.items() if k != "mtime"} for r in list_reports()]
+
+
+@router.get("/profiles/{name}")
+def download_profile(name: str):
+    _require_enabled()
+    path = get_report_path(name)
+    if not path:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return FileResponse(path, filename=name, media_type="text/plain")
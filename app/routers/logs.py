@@ -2,12 +2,13 @@ from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse, FileResponse
 from fastapi.templating import Jinja2Templates
 import os
+from app.core.config import CONFIG_DIR
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
 
 def get_log_data():
-    log_path = "/config/app.log"
+    log_path = os.path.join(CONFIG_DIR, "app.log")
     if os.path.exists(log_path):
         try:
             with open(log_path, "r") as f:
@@ -29,7 +30,7 @@ async def refresh_logs(request: Request):
 
 @router.get("/download")
 async def download_logs():
-    log_path = "/config/app.log"
+    log_path = os.path.join(CONFIG_DIR, "app.log")
     if os.path.exists(log_path):
         return FileResponse(log_path, filename="mover_manager.log")
     return {"error": "Log file not found"}
@@ -1,52 +1,48 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, Query
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
+from typing import List, Optional
 import logging
 
-from app.services.radarr import get_radarr_client
+from app.services.library_index import get_movie_index
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
 
 
+# Plain def: the index may fetch the library and compute statuses, so these
+# run in the threadpool instead of blocking the event loop
 @router.get("/", response_class=HTMLResponse)
-async def movies_page(request: Request):
-    """Movies listing page - shows all movies from Radarr"""
-    radarr_client = get_radarr_client()
-    
-    movies = []
-    
-    try:
-        # Get all movies and tags from Radarr
-        all_movies = radarr_client.get_all_movies()
-        all_tags = radarr_client.get_all_tags()
-        
-        # Create tag ID to label mapping
-        tag_map = {tag['id']: tag['label'] for tag in all_tags}
-        
-        for movie in all_movies:
-            # Map tag IDs to tag labels
-            tag_ids = movie.get('tags', [])
-            tag_labels = [tag_map.get(tag_id, f"Unknown Tag {tag_id}") for tag_id in tag_ids]
-            
-            movies.append({
-                'id': movie['id'],
-                'title': movie['title'],
-                'year': movie.get('year', 'N/A'),
-                'tags': tag_labels
-            })
-    except Exception as e:
-        logger.error(f"Failed to fetch movies: {e}")
-    
-    # Collect all unique tags across all movies for filter UI
-    all_tag_labels = sorted(set(tag for m in movies for tag in m['tags']))
+def movies_page(request: Request):
+    """Movies listing page - rows are loaded page by page from /movies/api/items"""
+    index = get_movie_index()
 
     context = {
         "request": request,
-        "movies": movies,
-        "total": len(movies),
-        "all_tags": all_tag_labels
+        "total": index.count(),
+        "all_tags": index.get_all_tags()
     }
-    
+
     return templates.TemplateResponse("movies.html", context)
+
+
+@router.get("/api/items")
+def list_movies(
+    q: str = "",
+    tags: Optional[List[str]] = Query(None),
+    sort: str = "title",
+    order: str = "asc",
+    offset: int = 0,
+    limit: int = 100,
+    excluded: Optional[bool] = None,
+    on_cache: Optional[bool] = None,
+    tagged: Optional[bool] = None,
+    refresh: bool = False
+):
+    """Paginated, searchable, sortable movie list"""
+    index = get_movie_index()
+    if refresh:
+        index.ensure_loaded(force=True)
+    return index.query(q=q, tags=tags, sort=sort, order=order, offset=offset, limit=limit,
+                       excluded=excluded, on_cache=on_cache, tagged=tagged)
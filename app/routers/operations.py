@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 from fastapi.responses import RedirectResponse
-from app.services.exclusions import get_exclusion_manager
+from starlette.concurrency import run_in_threadpool
+from app.services.build_runner import run_build
 
 router = APIRouter()
 
@@ -9,8 +10,8 @@ router = APIRouter()
 async def trigger_exclusion_build():
     """Manually trigger exclusion builder"""
     try:
-        excl = get_exclusion_manager()
-        excl.build_exclusions()
+        # Off the event loop, so other requests are served while it builds
+        await run_in_threadpool(run_build, "manual")
         return RedirectResponse(url="/?success=exclusions_built", status_code=303)
     except Exception as e:
         return RedirectResponse(url="/?error=build_failed", status_code=303)
@@ -20,8 +21,7 @@ async def trigger_exclusion_build():
 async def trigger_full_sync():
     """Manually trigger full sync"""
     try:
-        excl = get_exclusion_manager()
-        excl.build_exclusions()
+        await run_in_threadpool(run_build, "manual")
         return RedirectResponse(url="/?success=sync_complete", status_code=303)
     except Exception as e:
         return RedirectResponse(url="/?error=sync_failed", status_code=303)
@@ -3,6 +3,7 @@ from fastapi import APIRouter, Request, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from app.core.config import get_user_settings, save_user_settings
+from app.core.state import get_state_store
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,7 +13,8 @@ templates = Jinja2Templates(directory="app/templates")
 @router.get("", response_class=HTMLResponse)
 async def settings_page(request: Request):
     settings = get_user_settings()
-    return templates.TemplateResponse("settings.html", {"request": request, "settings": settings})
+    return templates.TemplateResponse("settings.html", {"request": request, "settings": settings,
+                                                        "runtime": get_state_store().snapshot()})
 
 @router.post("/paths/save")
 async def save_paths(
@@ -47,16 +49,40 @@ async def save_paths(
         to_prefix=form_data.get("plexcache_to", "").strip()
     )
 
+    try:
+        settings.exclusions.capacity_headroom_pct = min(100.0, max(0.0, float(form_data.get("capacity_headroom_pct", settings.exclusions.capacity_headroom_pct))))
+    except ValueError:
+        pass
+    settings.exclusions.capacity_trim_enabled = form_data.get("capacity_trim_enabled") == "on"
+    priority = [name.strip() for name in form_data.get("capacity_source_priority", "").split(",") if name.strip()]
+    if priority:
+        settings.exclusions.capacity_source_priority = priority
+
+    settings.exclusions.adaptive_sync_enabled = form_data.get("adaptive_sync_enabled") == "on"
+    settings.exclusions.build_in_worker_process = form_data.get("build_in_worker_process") == "on"
+    try:
+        min_minutes = max(1, int(form_data.get("adaptive_min_interval_minutes", settings.exclusions.adaptive_min_interval_minutes)))
+        max_minutes = max(min_minutes, int(form_data.get("adaptive_max_interval_minutes", settings.exclusions.adaptive_max_interval_minutes)))
+        settings.exclusions.adaptive_min_interval_minutes = min_minutes
+        settings.exclusions.adaptive_max_interval_minutes = max_minutes
+    except ValueError:
+        pass
+    try:
+        settings.exclusions.build_deadline_seconds = max(0, int(form_data.get("build_deadline_seconds", settings.exclusions.build_deadline_seconds)))
+    except ValueError:
+        pass
+
     save_user_settings(settings)
     scheduler_service.reload_jobs()
     logger.info("System paths and schedules updated.")
     return RedirectResponse(url="/settings?status=success", status_code=303)
 
 @router.post("/radarr/save")
-async def save_radarr(url: str = Form(...), api_key: str = Form(...)):
+async def save_radarr(url: str = Form(...), api_key: str = Form(...), max_concurrency: int = Form(4)):
     settings = get_user_settings()
     settings.radarr.url = url
     settings.radarr.api_key = api_key
+    settings.radarr.max_concurrency = max(1, max_concurrency)
     save_user_settings(settings)
     try:
         from app.services.radarr import get_radarr_client
@@ -68,10 +94,11 @@ async def save_radarr(url: str = Form(...), api_key: str = Form(...)):
         return RedirectResponse(url="/settings?radarr_status=error", status_code=303)
 
 @router.post("/sonarr/save")
-async def save_sonarr(url: str = Form(...), api_key: str = Form(...)):
+async def save_sonarr(url: str = Form(...), api_key: str = Form(...), max_concurrency: int = Form(4)):
     settings = get_user_settings()
     settings.sonarr.url = url
     settings.sonarr.api_key = api_key
+    settings.sonarr.max_concurrency = max(1, max_concurrency)
     save_user_settings(settings)
     try:
         from app.services.sonarr import get_sonarr_client
@@ -82,44 +109,62 @@ async def save_sonarr(url: str = Form(...), api_key: str = Form(...)):
     except Exception:
         return RedirectResponse(url="/settings?sonarr_status=error", status_code=303)
 
+@router.post("/instances/save")
+async def save_instances(request: Request):
+    from urllib.parse import quote
+    from app.core.config import ArrInstance, ServicePathMapping, instance_slug
+    form_data = await request.form()
+    settings = get_user_settings()
+    for service in ("radarr", "sonarr"):
+        instances = []
+        slugs = set()
+        i = 0
+        while f"{service}-{i}-name" in form_data:
+            prefix = f"{service}-{i}-"
+            field = lambda name: form_data.get(prefix + name, "").strip()
+            i += 1
+            name = field("name")
+            if not name:
+                continue
+            slug = instance_slug(name)
+            if not slug or slug in slugs:
+                detail = quote(f"{service} instance name {name!r} is empty or not unique")
+                return RedirectResponse(url=f"/settings?instances_status=error&detail={detail}", status_code=303)
+            slugs.add(slug)
+            try:
+                tag_ids = [int(t) for t in field("tags").replace(" ", "").split(",") if t]
+                max_concurrency = max(1, int(field("concurrency") or 4))
+            except ValueError:
+                detail = quote(f"Tag IDs and max requests of {name!r} must be numbers")
+                return RedirectResponse(url=f"/settings?instances_status=error&detail={detail}", status_code=303)
+            instances.append(ArrInstance(
+                name=name, url=field("url"), api_key=field("api_key"), exclude_tag_ids=tag_ids,
+                mapping=ServicePathMapping(from_prefix=field("from"), to_prefix=field("to")),
+                max_concurrency=max_concurrency,
+            ))
+        setattr(settings, f"{service}_instances", instances)
+    save_user_settings(settings)
+    logger.info(f"Additional instances saved: {len(settings.radarr_instances)} Radarr, {len(settings.sonarr_instances)} Sonarr")
+    return RedirectResponse(url="/settings?instances_status=success", status_code=303)
+
+@router.get("/path-analysis")
+def get_path_analysis(service: str = None):
+    """Per-source dominant prefixes, mapping hit rate, unmatched paths and a suggested mapping."""
+    from app.services.path_analysis import get_path_analyzer
+    return get_path_analyzer().analyze(only=service)
+
 @router.get("/path-prefixes")
-async def get_path_prefixes():
-    """Detect path prefixes from Radarr, Sonarr, and PlexCache"""
-    from app.services.radarr import get_radarr_client
-    from app.services.sonarr import get_sonarr_client
-    from pathlib import Path
+def get_path_prefixes(service: str = None):
+    """Suggested API prefix per source for the Detect buttons, plus the host prefix when one was found on the cache."""
+    from app.services.path_analysis import get_path_analyzer
     results = {}
-    try:
-        movies = get_radarr_client().get_all_movies()
-        for m in movies:
-            p = (m.get('movieFile', {}) or {}).get('path') or m.get('path', '')
-            if p:
-                parts = p.lstrip('/').split('/')
-                results['Radarr'] = '/' + parts[0] + '/'
-                break
-    except Exception as e:
-        results['Radarr'] = f"Error: {e}"
-    try:
-        shows = get_sonarr_client().get_all_series()
-        for s in shows:
-            p = s.get('path', '')
-            if p:
-                parts = p.lstrip('/').split('/')
-                results['Sonarr'] = '/' + parts[0] + '/'
-                break
-    except Exception as e:
-        results['Sonarr'] = f"Error: {e}"
-    try:
-        settings = get_user_settings()
-        pc = Path(settings.exclusions.plexcache_file_path)
-        if pc.exists():
-            with open(pc) as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#'):
-                        parts = line.lstrip('/').split('/')
-                        results['Plexcache'] = '/' + parts[0] + '/'
-                        break
-    except Exception as e:
-        results['Plexcache'] = f"Error: {e}"
+    for source, analysis in get_path_analyzer().analyze(only=service).items():
+        key = source.capitalize()
+        if "error" in analysis:
+            results[key] = f"Error: {analysis['error']}"
+        elif analysis["suggestion"]:
+            results[key] = analysis["suggestion"]["from_prefix"]
+            results[f"{key}_to"] = analysis["suggestion"]["to_prefix"]
+        elif analysis["prefixes"]:
+            results[key] = "/" + analysis["prefixes"][0]["prefix"].strip("/").split("/")[0] + "/"
     return results
@@ -1,52 +1,48 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, Query
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
+from typing import List, Optional
 import logging
 
-from app.services.sonarr import get_sonarr_client
+from app.services.library_index import get_show_index
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
 
 
+# Plain def: the index may fetch the library and compute statuses, so these
+# run in the threadpool instead of blocking the event loop
 @router.get("/", response_class=HTMLResponse)
-async def shows_page(request: Request):
-    """Shows listing page - shows all TV shows from Sonarr"""
-    sonarr_client = get_sonarr_client()
-    
-    shows = []
-    
-    try:
-        # Get all series and tags from Sonarr
-        all_series = sonarr_client.get_all_series()
-        all_tags = sonarr_client.get_all_tags()
-        
-        # Create tag ID to label mapping
-        tag_map = {tag['id']: tag['label'] for tag in all_tags}
-        
-        for series in all_series:
-            # Map tag IDs to tag labels
-            tag_ids = series.get('tags', [])
-            tag_labels = [tag_map.get(tag_id, f"Unknown Tag {tag_id}") for tag_id in tag_ids]
-            
-            shows.append({
-                'id': series['id'],
-                'title': series['title'],
-                'year': series.get('year', 'N/A'),
-                'seasons': series.get('seasonCount', 0),
-                'tags': tag_labels
-            })
-    except Exception as e:
-        logger.error(f"Failed to fetch shows: {e}")
-    
-    all_tag_labels = sorted(set(tag for s in shows for tag in s['tags']))
+def shows_page(request: Request):
+    """Shows listing page - rows are loaded page by page from /shows/api/items"""
+    index = get_show_index()
 
     context = {
         "request": request,
-        "shows": shows,
-        "total": len(shows),
-        "all_tags": all_tag_labels
+        "total": index.count(),
+        "all_tags": index.get_all_tags()
     }
-    
+
     return templates.TemplateResponse("shows.html", context)
+
+
+@router.get("/api/items")
+def list_shows(
+    q: str = "",
+    tags: Optional[List[str]] = Query(None),
+    sort: str = "title",
+    order: str = "asc",
+    offset: int = 0,
+    limit: int = 100,
+    excluded: Optional[bool] = None,
+    on_cache: Optional[bool] = None,
+    tagged: Optional[bool] = None,
+    refresh: bool = False
+):
+    """Paginated, searchable, sortable show list"""
+    index = get_show_index()
+    if refresh:
+        index.ensure_loaded(force=True)
+    return index.query(q=q, tags=tags, sort=sort, order=order, offset=offset, limit=limit,
+                       excluded=excluded, on_cache=on_cache, tagged=tagged)
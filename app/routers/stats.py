@@ -2,36 +2,49 @@ from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from app.services.ca_mover import get_mover_parser
-import re
+from app.services.build_history import get_build_history
+from app.services.cache_index import get_cache_index
+from app.services.effectiveness import get_effectiveness_report
+from app.services.snapshots import format_age, format_bytes
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
 
-def parse_size_to_gb(size_str):
-    """Helper to convert various size strings (GB, MB, KB) to a float in GB"""
-    try:
-        num = float(re.findall(r"[-+]?\d*\.\d+|\d+", size_str)[0])
-        if 'TB' in size_str: return num * 1024
-        if 'GB' in size_str: return num
-        if 'MB' in size_str: return num / 1024
-        if 'KB' in size_str: return num / (1024 * 1024)
-        return 0
-    except: return 0
+MOVE_STATUS_LABELS = {
+    "moved": "Moved",
+    "below_threshold": "Below threshold",
+    "nothing_to_move": "Nothing to move",
+    "idle": "Idle",
+}
+
+# Builds and skipped adaptive syncs listed on the page
+RECENT_ENTRIES = 10
+
+templates.env.filters["bytes"] = format_bytes
 
 @router.get("", response_class=HTMLResponse)
 async def stats_page(request: Request):
     mover_parser = get_mover_parser()
-    stats = mover_parser.get_latest_stats()
-    
-    # Calculate Total Size Protected
-    total_gb = sum(parse_size_to_gb(f.get('size', '0')) for f in stats.get('protected_files', []))
-    if total_gb > 1024:
-        display_total = f"{round(total_gb/1024, 2)} TB"
-    else:
-        display_total = f"{round(total_gb, 2)} GB"
+    stats = mover_parser.get_latest_stats() or {}
+    stats["status_label"] = MOVE_STATUS_LABELS.get(stats.get("move_status"), "Unknown")
+    if stats.get("test_mode"):
+        stats["status_label"] += " (test mode)"
+
+    # Protected bytes are computed by the exclusion builder; this only reads the last build
+    history = get_build_history()
+    build = history.latest()
+
+    cache = get_cache_index().summary()
+    cache["age"] = format_age(cache["age_seconds"]) if cache["age_seconds"] is not None else None
+
+    # Joined against the current exclusion set once per mover run
+    effectiveness = get_effectiveness_report().get()
 
     return templates.TemplateResponse("stats.html", {
         "request": request,
         "stats": stats,
-        "total_protected_size": display_total
+        "build": build,
+        "recent": history.entries(RECENT_ENTRIES),
+        "cache": cache,
+        "effectiveness": effectiveness,
     })
@@ -1,10 +1,10 @@
 import logging
 from fastapi import APIRouter, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from app.core.config import get_user_settings, save_user_settings
 from app.services.alert_log import get_alert_log
-from app.services.webhook_handler import trigger_rebuild
+from app.services.webhook_handler import enqueue_event, get_queue_depth
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -22,24 +22,34 @@ async def webhooks_page(request: Request):
     })
 
 
-@router.post("/radarr")
-async def radarr_webhook(request: Request):
-    payload = await request.json()
+async def _accept_webhook(request: Request, source: str):
+    """Validate the payload and hand it to the batch worker — never blocks on processing."""
+    try:
+        payload = await request.json()
+    except ValueError:
+        return JSONResponse(status_code=400, content={"status": "error", "detail": "Invalid JSON payload"})
+    if not isinstance(payload, dict):
+        return JSONResponse(status_code=400, content={"status": "error", "detail": "Payload must be a JSON object"})
+
     event = payload.get("eventType", "unknown")
-    logger.info(f"[WEBHOOK] Radarr event: {event}")
-    get_alert_log().add("info", "radarr", f"Radarr webhook received: {event}")
-    trigger_rebuild("radarr")
+    if not isinstance(event, str):
+        event = "unknown"
+    logger.debug(f"[WEBHOOK] {source} event queued: {event}")
+
+    if not enqueue_event(source, event):
+        # 503 makes Radarr/Sonarr retry later instead of dropping the event
+        return JSONResponse(status_code=503, content={"status": "busy", "event": event})
     return {"status": "ok", "event": event}
 
 
+@router.post("/radarr")
+async def radarr_webhook(request: Request):
+    return await _accept_webhook(request, "radarr")
+
+
 @router.post("/sonarr")
 async def sonarr_webhook(request: Request):
-    payload = await request.json()
-    event = payload.get("eventType", "unknown")
-    logger.info(f"[WEBHOOK] Sonarr event: {event}")
-    get_alert_log().add("info", "sonarr", f"Sonarr webhook received: {event}")
-    trigger_rebuild("sonarr")
-    return {"status": "ok", "event": event}
+    return await _accept_webhook(request, "sonarr")
 
 
 @router.post("/settings/save")
@@ -90,9 +100,9 @@ async def test_notification():
 
 @router.get("/status")
 async def webhook_status():
-    from app.services.webhook_handler import _timers
-    pending = {k: True for k, v in _timers.items() if v is not None}
-    return {"pending": pending}
+    from app.services.webhook_handler import pending_rebuilds
+    pending = {source: True for source in pending_rebuilds()}
+    return {"pending": pending, "queue_depth": get_queue_depth()}
 
 
 @router.post("/alerts/clear")
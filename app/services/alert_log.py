@@ -3,11 +3,14 @@ import os
 import logging
 from datetime import datetime
 from typing import List, Optional
+from app.core.config import CONFIG_DIR
+from app.core.coordination import file_identity, file_lock, write_json
 from app.services.notifier import notify
+from app.services.metrics import ALERTS_TOTAL
 
 logger = logging.getLogger(__name__)
 
-ALERT_LOG_PATH = "/config/alert_log.json"
+ALERT_LOG_PATH = os.path.join(CONFIG_DIR, "alert_log.json")
 MAX_ALERTS = 50
 
 
@@ -28,34 +31,40 @@ class Alert:
 
 
 class AlertLog:
+    """Shared by every worker: reads reload when another worker changed the file, writes merge under a file lock."""
+
     def __init__(self):
         self.alerts: List[dict] = []
+        self._identity = None
         self._load()
 
     def _load(self):
-        if os.path.exists(ALERT_LOG_PATH):
-            try:
-                with open(ALERT_LOG_PATH, "r") as f:
-                    self.alerts = json.load(f)
-                logger.debug(f"[ALERTS] Loaded {len(self.alerts)} alerts from disk")
-            except Exception as e:
-                logger.error(f"[ALERTS] Failed to load alert log: {e}")
-                self.alerts = []
+        identity = file_identity(ALERT_LOG_PATH)
+        if identity is None or identity == self._identity:
+            return
+        try:
+            with open(ALERT_LOG_PATH, "r") as f:
+                self.alerts = json.load(f)
+            self._identity = identity
+            logger.debug(f"[ALERTS] Loaded {len(self.alerts)} alerts from disk")
+        except Exception as e:
+            logger.error(f"[ALERTS] Failed to load alert log: {e}")
+            self.alerts = []
 
     def _save(self):
         try:
-            tmp = ALERT_LOG_PATH + ".tmp"
-            with open(tmp, "w") as f:
-                json.dump(self.alerts, f, indent=2)
-            os.replace(tmp, ALERT_LOG_PATH)
+            write_json(ALERT_LOG_PATH, self.alerts, indent=2)
+            self._identity = file_identity(ALERT_LOG_PATH)
         except Exception as e:
             logger.error(f"[ALERTS] Failed to save alert log: {e}")
 
     def add(self, level: str, source: str, message: str):
         alert = Alert(level, source, message)
-        self.alerts.insert(0, alert.to_dict())
-        self.alerts = self.alerts[:MAX_ALERTS]
-        self._save()
+        ALERTS_TOTAL.inc(level=level, source=source)
+        with file_lock(ALERT_LOG_PATH):
+            self._load()
+            self.alerts = ([alert.to_dict()] + self.alerts)[:MAX_ALERTS]
+            self._save()
         logger.info(f"[ALERTS] [{level.upper()}] {source}: {message}")
         try:
             notify(level, source, message)
@@ -64,11 +73,13 @@ class AlertLog:
 
 
     def get_all(self) -> List[dict]:
+        self._load()
         return self.alerts
 
     def clear(self):
-        self.alerts = []
-        self._save()
+        with file_lock(ALERT_LOG_PATH):
+            self.alerts = []
+            self._save()
 
 
 _alert_log = AlertLog()
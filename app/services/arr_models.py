@@ -0,0 +1,255 @@
+"""
+Compact records for Radarr/Sonarr payloads. Only the fields MTEM uses are
+kept, and list endpoints are decoded element by element off the socket, so
+a large library never exists as one response body plus a full dict tree.
+"""
+import codecs
+import hashlib
+import json
+import sys
+from datetime import datetime
+from typing import Callable, Iterator, Optional
+
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_SCALAR_END = _WHITESPACE + ",]"
+
+
+def _intern(path) -> str:
+    return sys.intern(path.strip()) if path else ""
+
+
+def _timestamp(value) -> Optional[int]:
+    """Epoch seconds of an *arr ISO date ("2024-01-01T00:00:00Z"), or None."""
+    if not value:
+        return None
+    try:
+        return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+    except ValueError:
+        return None
+
+
+class Movie:
+    __slots__ = ("id", "title", "sort_title", "year", "tags", "path", "file_path", "size", "added")
+
+    def __init__(self, id: int, title: str, sort_title: str, year: int, tags: tuple, path: str, file_path: str,
+                 size: Optional[int] = None, added: Optional[int] = None):
+        self.id = id
+        self.title = title
+        self.sort_title = sort_title
+        self.year = year
+        self.tags = tags
+        self.path = path
+        self.file_path = file_path
+        self.size = size
+        self.added = added
+
+    @classmethod
+    def from_api(cls, d: dict) -> "Movie":
+        title = d.get("title") or ""
+        movie_file = d.get("movieFile") or {}
+        return cls(
+            d["id"],
+            title,
+            d.get("sortTitle") or title.lower(),
+            d.get("year") or 0,
+            tuple(d.get("tags") or ()),
+            _intern(d.get("path")),
+            _intern(movie_file.get("path")),
+            movie_file.get("size"),
+            _timestamp(movie_file.get("dateAdded")),
+        )
+
+    def __repr__(self):
+        return f"Movie(id={self.id}, title={self.title!r})"
+
+
+class Series:
+    __slots__ = ("id", "title", "sort_title", "year", "seasons", "tags", "path", "episode_file_count", "size_on_disk")
+
+    def __init__(self, id: int, title: str, sort_title: str, year: int, seasons: int, tags: tuple, path: str,
+                 episode_file_count: Optional[int] = None, size_on_disk: Optional[int] = None):
+        self.id = id
+        self.title = title
+        self.sort_title = sort_title
+        self.year = year
+        self.seasons = seasons
+        self.tags = tags
+        self.path = path
+        self.episode_file_count = episode_file_count
+        self.size_on_disk = size_on_disk
+
+    @classmethod
+    def from_api(cls, d: dict) -> "Series":
+        title = d.get("title") or ""
+        stats = d.get("statistics") or {}
+        return cls(
+            d["id"],
+            title,
+            d.get("sortTitle") or title.lower(),
+            d.get("year") or 0,
+            d.get("seasonCount") or 0,
+            tuple(d.get("tags") or ()),
+            _intern(d.get("path")),
+            stats.get("episodeFileCount"),
+            stats.get("sizeOnDisk"),
+        )
+
+    @property
+    def files_key(self) -> Optional[tuple]:
+        """Changes whenever the series' files are added, removed or replaced; None if Sonarr sent no statistics."""
+        if self.episode_file_count is None or self.size_on_disk is None:
+            return None
+        return (self.episode_file_count, self.size_on_disk, self.path)
+
+    def __repr__(self):
+        return f"Series(id={self.id}, title={self.title!r})"
+
+
+class EpisodeFile:
+    __slots__ = ("id", "series_id", "path", "size", "added")
+
+    def __init__(self, id: int, series_id: int, path: str, size: Optional[int] = None, added: Optional[int] = None):
+        self.id = id
+        self.series_id = series_id
+        self.path = path
+        self.size = size
+        self.added = added
+
+    @classmethod
+    def from_api(cls, d: dict) -> "EpisodeFile":
+        return cls(d.get("id") or 0, d.get("seriesId") or 0, _intern(d.get("path")), d.get("size"),
+                   _timestamp(d.get("dateAdded")))
+
+    def __repr__(self):
+        return f"EpisodeFile(id={self.id}, path={self.path!r})"
+
+
+def iter_json_array(chunks: Iterator[bytes]) -> Iterator:
+    """
+    Yield the elements of a top-level JSON array from a stream of byte chunks,
+    holding at most one element (plus a chunk) of undecoded text at a time.
+    """
+    text = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    pos = 0
+    exhausted = False
+    started = False
+
+    def more() -> bool:
+        nonlocal buf, pos, exhausted
+        if exhausted:
+            return False
+        for chunk in chunks:
+            if chunk:
+                buf = buf[pos:] + text.decode(chunk)
+                pos = 0
+                return True
+        buf = buf[pos:] + text.decode(b"", final=True)
+        pos = 0
+        exhausted = True
+        return False
+
+    while True:
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+        if pos >= len(buf):
+            if not more():
+                raise ValueError("Unexpected end of JSON array")
+            continue
+        ch = buf[pos]
+        if not started:
+            if ch != "[":
+                raise ValueError(f"Expected a JSON array, got {ch!r}")
+            started = True
+            pos += 1
+            continue
+        if ch == "]":
+            return
+        if ch == ",":
+            pos += 1
+            continue
+        try:
+            value, end = _decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if not more():
+                raise
+            continue
+        if (not isinstance(value, (dict, list)) and (end == len(buf) or buf[end] not in _SCALAR_END)
+                and more()):
+            # A bare number cut by a chunk boundary decodes from its prefix ("-2" of "-2.5"),
+            # so a scalar only counts once a delimiter follows it
+            continue
+        pos = end
+        yield value
+
+
+def decode_records(response, factory: Callable[[dict], object]) -> Iterator:
+    """Stream a list endpoint's response into records; closes the response when done or abandoned."""
+    try:
+        for item in iter_json_array(response.iter_content(chunk_size=CHUNK_SIZE)):
+            yield factory(item)
+    finally:
+        response.close()
+
+
+class StreamedList:
+    """
+    Records from a streamed list endpoint, plus the change validators for
+    that response: ETag/Last-Modified when the upstream sends them and a
+    hash of the raw body, available once the records have been consumed.
+    A 304 reply iterates as empty with not_modified set; response=None is
+    an empty list (service not configured).
+    """
+
+    def __init__(self, response=None, factory: Callable[[dict], object] = None):
+        self._response = response
+        self._factory = factory
+        self._hash = hashlib.sha256()
+        self.not_modified = response is not None and response.status_code == 304
+        self.etag = response.headers.get("ETag") if response is not None else None
+        self.last_modified = response.headers.get("Last-Modified") if response is not None else None
+        self.complete = response is None
+
+    def _chunks(self) -> Iterator[bytes]:
+        for chunk in self._response.iter_content(chunk_size=CHUNK_SIZE):
+            self._hash.update(chunk)
+            yield chunk
+
+    def __iter__(self):
+        if self._response is None:
+            return
+        try:
+            if self.not_modified:
+                return
+            for item in iter_json_array(self._chunks()):
+                yield self._factory(item)
+            self.complete = True
+        finally:
+            self._response.close()
+
+    @property
+    def content_hash(self) -> Optional[str]:
+        return self._hash.hexdigest() if self.complete else None
+
+    def validators(self) -> dict:
+        return {"etag": self.etag, "last_modified": self.last_modified, "content_hash": self.content_hash}
+
+    def unchanged_since(self, previous: Optional[dict]) -> bool:
+        """True if the upstream answered 304 or the body hashes the same as previous["content_hash"]."""
+        if self.not_modified:
+            return True
+        return bool(previous and self.content_hash and previous.get("content_hash") == self.content_hash)
+
+
+def conditional_headers(previous: Optional[dict]) -> dict:
+    """If-None-Match / If-Modified-Since from validators saved by an earlier StreamedList."""
+    headers = {}
+    if previous:
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+    return headers
@@ -0,0 +1,73 @@
+"""
+Rolling record of recent exclusion builds (counts and protected bytes per
+source and tag), so pages can show the last build without recomputing it.
+Syncs the adaptive scheduler skipped are recorded too, with result "skipped".
+Reads pick up entries other workers recorded.
+"""
+import json
+import logging
+import os
+import threading
+from typing import List, Optional
+from app.core.config import CONFIG_DIR
+from app.core.coordination import file_identity, file_lock, write_json
+
+logger = logging.getLogger(__name__)
+
+BUILD_HISTORY_PATH = os.path.join(CONFIG_DIR, "build_history.json")
+MAX_ENTRIES = 50
+
+
+class BuildHistory:
+    def __init__(self, path: str = BUILD_HISTORY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = None
+        self._identity = None
+
+    def _load(self):
+        identity = file_identity(self.path)
+        if self._entries is not None and identity == self._identity:
+            return
+        self._entries = []
+        self._identity = identity
+        if identity is None:
+            return
+        try:
+            with open(self.path, "r") as f:
+                self._entries = json.load(f)
+        except Exception as e:
+            logger.error(f"[HISTORY] Failed to load build history, starting empty: {e}")
+
+    def record(self, entry: dict):
+        with self._lock, file_lock(self.path):
+            self._load()
+            self._entries.append(entry)
+            del self._entries[:-MAX_ENTRIES]
+            try:
+                write_json(self.path, self._entries)
+                self._identity = file_identity(self.path)
+            except Exception as e:
+                logger.error(f"[HISTORY] Failed to save build history: {e}")
+
+    def latest(self) -> Optional[dict]:
+        """The most recent build; runs the adaptive scheduler skipped are passed over."""
+        with self._lock:
+            self._load()
+            for entry in reversed(self._entries):
+                if entry.get("result") != "skipped":
+                    return entry
+            return None
+
+    def entries(self, limit: int = MAX_ENTRIES) -> List[dict]:
+        """Most recent first."""
+        with self._lock:
+            self._load()
+            return list(reversed(self._entries[-limit:]))
+
+
+_history = BuildHistory()
+
+
+def get_build_history() -> BuildHistory:
+    return _history
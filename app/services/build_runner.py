@@ -0,0 +1,273 @@
+"""
+Single entry point for exclusion builds (schedule, webhooks, manual runs).
+Builds never overlap. With build_in_worker_process set they run in a
+long-lived child process, so decoding large library payloads does not hold
+the web process's GIL; the child reports progress, alerts, history, runtime
+state and metrics back over a queue, and a child that dies mid-build is
+reported as a failed build and replaced on the next one.
+
+With several web workers only the leader builds; the others queue a build
+request in the coordination database and wait for the leader's result.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from app.core.config import CONFIG_DIR, get_user_settings
+from app.core.coordination import coordination_db, get_leader_election
+from app.core.state import get_state_store
+from app.services.alert_log import get_alert_log
+from app.services.build_history import get_build_history
+from app.services.metrics import BUILDS_TOTAL, export_samples, import_samples, publish_build_metrics
+
+logger = logging.getLogger(__name__)
+
+# How often the waiting thread checks that the worker is still alive
+POLL_SECONDS = 1.0
+STOP_TIMEOUT_SECONDS = 5
+# Build requests from follower workers: how often both sides look, how long a follower waits
+REQUEST_POLL_SECONDS = 1.0
+REQUEST_TIMEOUT_SECONDS = 1800
+# Finished requests are kept this long for followers still polling
+REQUEST_RETENTION_SECONDS = 3600
+
+# Calls the worker makes on these singletons are replayed in the web process,
+# which owns their in-memory copies
+_FORWARDED = {
+    "alerts": (get_alert_log, ("add",)),
+    "state": (get_state_store, ("update",)),
+    "history": (get_build_history, ("record",)),
+}
+
+
+class BuildWorkerError(Exception):
+    """The build worker process failed or died during a build."""
+
+
+class BuildRequestError(Exception):
+    """A build requested from the leader worker failed or was never picked up."""
+
+
+class _Forwarder:
+    """Stands in for a singleton inside the worker; allowed calls are sent to the web process."""
+
+    def __init__(self, events, name: str, methods: tuple):
+        self._events = events
+        self._name = name
+        self._methods = methods
+
+    def __getattr__(self, method):
+        if method not in self._methods:
+            raise AttributeError(f"{self._name}.{method} is not available in the build worker")
+        return lambda *args, **kwargs: self._events.put(("call", self._name, method, args, kwargs))
+
+
+def _worker_main(jobs, events):
+    """Child process: build on request until told to stop (None)."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.FileHandler(os.path.join(CONFIG_DIR, "app.log")), logging.StreamHandler()],
+    )
+    from app.core import state
+    from app.services import alert_log, build_history
+    alert_log._alert_log = _Forwarder(events, "alerts", _FORWARDED["alerts"][1])
+    state._store = _Forwarder(events, "state", _FORWARDED["state"][1])
+    build_history._history = _Forwarder(events, "history", _FORWARDED["history"][1])
+    from app.services.exclusions import get_exclusion_manager
+
+    exported = {}
+    logger.info(f"[BUILD_WORKER] Worker process {os.getpid()} ready")
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+        try:
+            result = get_exclusion_manager().build_exclusions(
+                progress=lambda stage, seconds: events.put(("progress", stage, seconds)))
+            outcome = ("done", result, None)
+        except Exception as e:
+            logger.error(f"[BUILD_WORKER] Build failed: {e}", exc_info=True)
+            outcome = ("done", None, str(e))
+        delta, exported, gauges = export_samples(exported)
+        events.put(("metrics", delta, gauges))
+        events.put(outcome)
+
+
+class BuildRunner:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ctx = multiprocessing.get_context("spawn")
+        self._process = None
+        self._jobs = None
+        self._events = None
+        self.status = {"running": False}
+        self._server = None
+
+    def run_build(self, trigger: str, in_process: bool = False) -> dict:
+        """
+        Build now (waiting for any build in progress first). Returns the
+        build result; raises on failure. in_process keeps the build in this
+        process even with build_in_worker_process set (the profiler measures it here).
+        """
+        if not get_leader_election().leads():
+            return self._request_from_leader(trigger)
+        with self._lock:
+            in_worker = not in_process and get_user_settings().exclusions.build_in_worker_process
+            self.status = {"running": True, "trigger": trigger, "stage": None, "in_worker": in_worker,
+                           "started_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+            start = time.perf_counter()
+            try:
+                if in_worker:
+                    result = self._build_in_worker()
+                else:
+                    from app.services.exclusions import get_exclusion_manager
+                    result = get_exclusion_manager().build_exclusions(progress=self._progress)
+            finally:
+                self.status = {"running": False, "trigger": trigger, "in_worker": in_worker,
+                               "seconds": round(time.perf_counter() - start, 3)}
+                try:
+                    publish_build_metrics()
+                except Exception as e:
+                    logger.error(f"[BUILD] Could not publish build metrics: {e}")
+            return result
+
+    def _progress(self, stage: str, seconds: float):
+        self.status["stage"] = stage
+        logger.debug(f"[BUILD] Stage {stage} done in {seconds:.2f}s")
+
+    # ---- worker process ------------------------------------------------------
+
+    def _ensure_worker(self):
+        if self._process is not None and self._process.is_alive():
+            return
+        self._jobs = self._ctx.Queue()
+        self._events = self._ctx.Queue()
+        self._process = self._ctx.Process(target=_worker_main, args=(self._jobs, self._events),
+                                          name="build-worker", daemon=True)
+        self._process.start()
+        logger.info(f"[BUILD_WORKER] Started worker process {self._process.pid}")
+
+    def _build_in_worker(self) -> dict:
+        self._ensure_worker()
+        self.status["pid"] = self._process.pid
+        self._jobs.put("build")
+        while True:
+            try:
+                event = self._events.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                if not self._process.is_alive():
+                    self._worker_died()
+                continue
+            kind = event[0]
+            if kind == "progress":
+                self._progress(event[1], event[2])
+            elif kind == "call":
+                _, name, method, args, kwargs = event
+                getter, methods = _FORWARDED[name]
+                if method in methods:
+                    getattr(getter(), method)(*args, **kwargs)
+            elif kind == "metrics":
+                import_samples(event[1], event[2])
+            elif kind == "done":
+                _, result, error = event
+                if error is not None:
+                    raise BuildWorkerError(error)
+                return result
+
+    def _worker_died(self):
+        code = self._process.exitcode
+        self._process = None
+        message = f"Exclusion build FAILED: worker process exited with code {code} mid-build"
+        logger.error(f"[BUILD_WORKER] {message}")
+        # The worker could not record its own failure
+        BUILDS_TOTAL.inc(result="failure")
+        get_state_store().update(last_build_error=message,
+                                 last_build_failed_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        get_alert_log().add("error", "builder", message)
+        raise BuildWorkerError(message)
+
+    # ---- requests from follower workers ----------------------------------------
+
+    def _request_from_leader(self, trigger: str) -> dict:
+        with coordination_db() as db:
+            request_id = db.execute("INSERT INTO build_requests (trigger, requested_at, status) VALUES (?, ?, 'pending')",
+                                    (trigger, time.time())).lastrowid
+        logger.info(f"[BUILD] Build ({trigger}) handed to the leader worker as request {request_id}")
+        deadline = time.monotonic() + REQUEST_TIMEOUT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(REQUEST_POLL_SECONDS)
+            with coordination_db() as db:
+                status, result, error = db.execute("SELECT status, result, error FROM build_requests WHERE id = ?",
+                                                   (request_id,)).fetchone()
+            if status == "done":
+                return json.loads(result)
+            if status == "failed":
+                raise BuildRequestError(error)
+        with coordination_db() as db:
+            db.execute("UPDATE build_requests SET status = 'failed', error = 'timed out' "
+                       "WHERE id = ? AND status = 'pending'", (request_id,))
+        raise BuildRequestError(f"No result from the leader worker after {REQUEST_TIMEOUT_SECONDS}s")
+
+    def serve_requests(self):
+        """Leader only: build for requests queued by the other workers."""
+        if self._server is not None and self._server.is_alive():
+            return
+        with coordination_db() as db:
+            # Requests the previous leader was building when it went away
+            db.execute("UPDATE build_requests SET status = 'failed', error = 'leader worker exited mid-build' "
+                       "WHERE status = 'running'")
+        self._server = threading.Thread(target=self._serve_loop, name="build-requests", daemon=True)
+        self._server.start()
+
+    def _serve_loop(self):
+        while True:
+            try:
+                self._serve_pending()
+            except Exception as e:
+                logger.error(f"[BUILD] Serving build requests failed: {e}", exc_info=True)
+            time.sleep(REQUEST_POLL_SECONDS)
+
+    def _serve_pending(self):
+        with coordination_db() as db:
+            db.execute("DELETE FROM build_requests WHERE status IN ('done', 'failed') AND requested_at < ?",
+                       (time.time() - REQUEST_RETENTION_SECONDS,))
+            rows = db.execute("SELECT id, trigger FROM build_requests WHERE status = 'pending' ORDER BY id").fetchall()
+            if not rows:
+                return
+            ids = [row[0] for row in rows]
+            db.executemany("UPDATE build_requests SET status = 'running' WHERE id = ?", [(i,) for i in ids])
+        # Requests that piled up while a build ran are all answered by one build
+        trigger = ", ".join(sorted({row[1] for row in rows}))
+        try:
+            result, status, error = json.dumps(self.run_build(trigger), default=str), "done", None
+        except Exception as e:
+            result, status, error = None, "failed", str(e)
+        with coordination_db() as db:
+            db.executemany("UPDATE build_requests SET status = ?, result = ?, error = ? WHERE id = ?",
+                           [(status, result, error, i) for i in ids])
+
+    def stop(self):
+        process = self._process
+        if process is None or not process.is_alive():
+            return
+        self._jobs.put(None)
+        process.join(STOP_TIMEOUT_SECONDS)
+        if process.is_alive():
+            process.kill()
+        self._process = None
+
+
+_runner = BuildRunner()
+
+
+def get_build_runner() -> BuildRunner:
+    return _runner
+
+
+def run_build(trigger: str) -> dict:
+    return _runner.run_build(trigger)
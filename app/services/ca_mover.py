@@ -3,6 +3,7 @@ import logging
 import shutil
 from datetime import datetime
 from app.core.config import get_user_settings
+from app.services.metrics import MOVER_LOG_PARSE_SECONDS
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +30,10 @@ class CAMoverParser:
 
     def get_latest_stats(self):
         """Parse the most recent mover run and return stats dict."""
+        with MOVER_LOG_PARSE_SECONDS.time():
+            return self._parse_latest_stats()
+
+    def _parse_latest_stats(self):
         run = self._get_latest_files()
         if not run:
             logger.debug("[CA_MOVER] No mover log files found")
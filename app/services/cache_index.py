@@ -0,0 +1,276 @@
+"""
+Persistent index of the files under cache_mount_path, answering "is this on
+the cache?" and "how many bytes are under this folder?" without touching the
+filesystem. Rescans only re-list directories whose mtime changed.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Optional
+from app.core.config import CONFIG_DIR, get_user_settings
+from app.core.coordination import write_json
+from app.services.metrics import CACHE_INDEX_SCAN_SECONDS, CACHE_INDEX_FILES, CACHE_INDEX_BYTES
+
+logger = logging.getLogger(__name__)
+
+CACHE_INDEX_PATH = os.path.join(CONFIG_DIR, "cache_index.json")
+SCAN_WORKERS = 8
+# How often the scheduler rescans, and how old a scan page requests tolerate
+RESCAN_INTERVAL_SECONDS = 300
+MAX_AGE_SECONDS = 60
+# A directory modified this close to the previous scan may have changed again
+# within the same mtime tick, so it is re-listed rather than trusted
+MTIME_GUARD_NS = 2 * 10 ** 9
+
+
+class _Dir:
+    __slots__ = ("mtime_ns", "files", "subdirs", "bytes")
+
+    def __init__(self, mtime_ns: int, files: dict, subdirs: tuple):
+        self.mtime_ns = mtime_ns
+        self.files = files
+        self.subdirs = subdirs
+        self.bytes = 0
+
+
+class CacheIndex:
+    """
+    Directories are keyed by their path relative to the root ("" for the
+    root itself, "/data/media" below it). Each holds its files' sizes, its
+    subdirectory names and the recursive byte total.
+    """
+
+    def __init__(self, path: str = CACHE_INDEX_PATH):
+        self.path = path
+        self._scan_lock = threading.Lock()
+        self._loaded = False
+        self.root = None
+        self.dirs = {}
+        self.scanned_at = None
+        self.scan_started_ns = 0
+        self.version = 0
+        self.last_scan = {}
+        self.error = None
+
+    # ---- persistence -------------------------------------------------------
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            dirs = {rel: _Dir(entry[0], entry[1], tuple(entry[2])) for rel, entry in data["dirs"].items()}
+            _compute_totals(dirs)
+            self.root = data["root"]
+            self.dirs = dirs
+            self.scanned_at = data["scanned_at"]
+            self.scan_started_ns = data["scan_started_ns"]
+            self.version += 1
+            logger.info(f"[CACHE_INDEX] Loaded index of {self.root} ({len(dirs)} directories)")
+        except Exception as e:
+            logger.error(f"[CACHE_INDEX] Failed to load {self.path}, will rescan from scratch: {e}")
+
+    def _save(self):
+        data = {
+            "root": self.root,
+            "scanned_at": self.scanned_at,
+            "scan_started_ns": self.scan_started_ns,
+            "dirs": {rel: [d.mtime_ns, d.files, list(d.subdirs)] for rel, d in self.dirs.items()},
+        }
+        try:
+            # Every worker keeps its own index and may save it
+            write_json(self.path, data, separators=(",", ":"))
+        except Exception as e:
+            logger.error(f"[CACHE_INDEX] Failed to save index: {e}")
+
+    # ---- scanning ------------------------------------------------------------
+
+    def _list(self, root: str, rel: str, mtime_ns: int):
+        """Returns (rel, _Dir or None) for one directory that needs re-listing."""
+        files = {}
+        subdirs = []
+        try:
+            with os.scandir(root + rel) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                        elif entry.is_file():
+                            files[entry.name] = entry.stat().st_size
+                        elif entry.is_symlink() and os.path.exists(entry.path):
+                            # Symlinked directories are not descended into, but count as present
+                            files[entry.name] = 0
+                    except OSError:
+                        continue
+        except OSError:
+            return rel, None
+        return rel, _Dir(mtime_ns, files, tuple(subdirs))
+
+    def refresh(self, settings=None, full: bool = False) -> bool:
+        """Rescan the cache pool (incrementally unless full). Returns False if the root is unavailable."""
+        settings = settings or get_user_settings()
+        root = settings.exclusions.cache_mount_path.rstrip("/")
+        with self._scan_lock:
+            self._load()
+            if not root or not os.path.isdir(root):
+                self.error = f"Cache mount {root or '(not set)'} is not a directory"
+                return False
+            incremental = not full and self.root == root and bool(self.dirs)
+            previous = self.dirs if incremental else {}
+            guard_ns = self.scan_started_ns - MTIME_GUARD_NS
+            started_ns = time.time_ns()
+            start = time.perf_counter()
+
+            # Directories are stat'ed here; only those whose mtime moved are listed, in the pool
+            dirs = {}
+            listed = 0
+            queue = [""]
+            pending = set()
+            with ThreadPoolExecutor(max_workers=SCAN_WORKERS, thread_name_prefix="cache-scan") as pool:
+                while queue or pending:
+                    while queue:
+                        rel = queue.pop()
+                        try:
+                            mtime_ns = os.stat(root + rel).st_mtime_ns
+                        except OSError:
+                            continue
+                        prev = previous.get(rel)
+                        if prev is not None and prev.mtime_ns == mtime_ns and mtime_ns < guard_ns:
+                            dirs[rel] = _Dir(mtime_ns, prev.files, prev.subdirs)
+                            queue.extend(f"{rel}/{sub}" for sub in prev.subdirs)
+                        else:
+                            pending.add(pool.submit(self._list, root, rel, mtime_ns))
+                    if not pending:
+                        break
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        rel, entry = future.result()
+                        listed += 1
+                        if entry is None:
+                            continue
+                        dirs[rel] = entry
+                        queue.extend(f"{rel}/{sub}" for sub in entry.subdirs)
+            _compute_totals(dirs)
+
+            elapsed = time.perf_counter() - start
+            mode = "incremental" if incremental else "full"
+            changed = not incremental or listed > 0 or len(dirs) != len(previous)
+            self.root = root
+            self.dirs = dirs
+            self.scanned_at = time.time()
+            self.scan_started_ns = started_ns
+            self.error = None
+            if changed:
+                self.version += 1
+            files = sum(len(d.files) for d in dirs.values())
+            total = dirs[""].bytes if "" in dirs else 0
+            self.last_scan = {"mode": mode, "seconds": round(elapsed, 3), "directories": len(dirs),
+                              "listed": listed, "files": files, "bytes": total}
+            CACHE_INDEX_SCAN_SECONDS.observe(elapsed, mode=mode)
+            CACHE_INDEX_FILES.set(files)
+            CACHE_INDEX_BYTES.set(total)
+            logger.info(f"[CACHE_INDEX] {mode.capitalize()} scan of {root}: {len(dirs)} dirs ({listed} listed), "
+                        f"{files} files in {elapsed:.2f}s")
+            if changed:
+                self._save()
+            return True
+
+    def ensure_fresh(self, settings=None, max_age: float = MAX_AGE_SECONDS) -> bool:
+        """Rescan if the last scan is older than max_age (or was of a different root)."""
+        settings = settings or get_user_settings()
+        with self._scan_lock:
+            self._load()
+            root = settings.exclusions.cache_mount_path.rstrip("/")
+            fresh = self.root == root and self.scanned_at is not None and time.time() - self.scanned_at < max_age
+        return True if fresh else self.refresh(settings)
+
+    def _load_if_idle(self):
+        """Load the saved index unless a scan holds the lock (it loads it itself)."""
+        if not self._loaded and self._scan_lock.acquire(blocking=False):
+            try:
+                self._load()
+            finally:
+                self._scan_lock.release()
+
+    def has_scan(self, settings=None) -> bool:
+        """
+        Whether the last scan covers the configured cache root. Never scans
+        and never waits for a running scan, so request handlers can call it;
+        rescans are left to the scheduled job.
+        """
+        settings = settings or get_user_settings()
+        self._load_if_idle()
+        return self.scanned_at is not None and self.root == settings.exclusions.cache_mount_path.rstrip("/")
+
+    # ---- queries ---------------------------------------------------------------
+
+    def _split(self, container_path: str) -> Optional[str]:
+        root = self.root
+        if root is None:
+            return None
+        path = container_path.rstrip("/")
+        if path == root:
+            return ""
+        if not path.startswith(root + "/"):
+            return None
+        return path[len(root):]
+
+    def size_of(self, container_path: str) -> Optional[int]:
+        """Bytes of the file, or under the directory, at container_path; None if it is not on the cache."""
+        rel = self._split(container_path)
+        if rel is None:
+            return None
+        dirs = self.dirs
+        d = dirs.get(rel)
+        if d is not None:
+            return d.bytes
+        parent, _, name = rel.rpartition("/")
+        d = dirs.get(parent)
+        if d is None:
+            return None
+        return d.files.get(name)
+
+    def exists(self, container_path: str) -> bool:
+        return self.size_of(container_path) is not None
+
+    def summary(self) -> dict:
+        """The last completed scan; like has_scan(), never waits for a running one."""
+        self._load_if_idle()
+        dirs = self.dirs
+        scanned_at = self.scanned_at
+        return {
+            "root": self.root,
+            "scanned_at": scanned_at,
+            "age_seconds": int(time.time() - scanned_at) if scanned_at else None,
+            "directories": len(dirs),
+            "files": sum(len(d.files) for d in dirs.values()),
+            "bytes": dirs[""].bytes if "" in dirs else 0,
+            "last_scan": self.last_scan,
+            "error": self.error,
+        }
+
+
+def _compute_totals(dirs: dict):
+    """Fill in recursive byte totals, deepest directories first."""
+    for rel in sorted(dirs, key=lambda r: r.count("/"), reverse=True):
+        d = dirs[rel]
+        total = sum(d.files.values())
+        for sub in d.subdirs:
+            child = dirs.get(f"{rel}/{sub}")
+            if child is not None:
+                total += child.bytes
+        d.bytes = total
+
+
+_index = CacheIndex()
+
+
+def get_cache_index() -> CacheIndex:
+    return _index
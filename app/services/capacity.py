@@ -0,0 +1,50 @@
+"""
+Cache capacity budget: how much the exclusion set may pin on the cache pool,
+and which entries to give up first when it would pin more.
+"""
+import logging
+import shutil
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def disk_budget(settings) -> dict:
+    """Real usage of the cache pool and the budget left after the configured headroom."""
+    ex = settings.exclusions
+    try:
+        usage = shutil.disk_usage(ex.cache_mount_path)
+    except OSError as e:
+        return {"error": f"Cannot read disk usage of {ex.cache_mount_path}: {e}"}
+    headroom = int(usage.total * ex.capacity_headroom_pct / 100)
+    return {
+        "total_bytes": usage.total,
+        "used_bytes": usage.used,
+        "free_bytes": usage.free,
+        "headroom_bytes": headroom,
+        "budget_bytes": usage.total - headroom,
+        "error": None,
+    }
+
+
+def plan(sizes: dict, priorities: dict, budget: Optional[int]) -> dict:
+    """
+    sizes maps each exclusion entry to its bytes, priorities to a sort key
+    (lower is kept first). Returns the planned bytes and, if that is over
+    budget, the entries to drop, lowest priority first, until it fits.
+    """
+    planned = sum(sizes.values())
+    result = {"planned_bytes": planned, "over_budget": False, "trim": [], "trim_bytes": 0}
+    if budget is None or planned <= budget:
+        return result
+    result["over_budget"] = True
+    remaining = planned
+    for key in sorted(sizes, key=lambda k: priorities[k], reverse=True):
+        if remaining <= budget:
+            break
+        if not sizes[key]:
+            continue
+        result["trim"].append(key)
+        remaining -= sizes[key]
+    result["trim_bytes"] = planned - remaining
+    return result
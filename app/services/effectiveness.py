@@ -0,0 +1,180 @@
+"""
+Exclusion effectiveness: joins the latest mover run's Filtered_files and
+Mover_action lists against the current exclusion set, to show which entries
+actually kept files on the cache, which never matched anything, and which
+protected files were moved anyway. Computed once per mover run.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Optional
+from app.core.config import ARR_SERVICES, arr_sources, get_user_settings
+from app.services.ca_mover import get_mover_parser
+from app.services.exclusion_status import get_exclusion_set
+from app.services.exclusions import get_exclusion_manager
+from app.services.snapshots import get_snapshot_store
+
+logger = logging.getLogger(__name__)
+
+# Rows kept per list in the report; the counts always cover everything
+LIST_LIMIT = 200
+
+
+def _identity(path: Optional[str]) -> Optional[tuple]:
+    if not path:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (path, st.st_mtime_ns, st.st_size)
+
+
+def _iter_files(path: str):
+    """Yield (action, file) per row of a mover .list file; action is None if the list has no ACTION column."""
+    with open(path, "r", errors="replace") as f:
+        first = f.readline().rstrip("\n")
+        header = first.split("|")
+        file_col = header.index("FILE") if "FILE" in header else len(header) - 1
+        action_col = header.index("ACTION") if "ACTION" in header else None
+        if first.startswith("/"):
+            # A bare list of paths, without a header row
+            yield None, first
+        for line in f:
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            # FILE is normally the last column; splitting only up to it keeps '|' in file names intact
+            parts = line.split("|", file_col)
+            if len(parts) <= file_col:
+                continue
+            action = parts[action_col] if action_col is not None and action_col < file_col else None
+            yield action, parts[file_col]
+
+
+def _covering(path: str, keys) -> Optional[str]:
+    """The deepest key that is path itself or one of its ancestor folders."""
+    path = path.rstrip("/")
+    while path:
+        if path in keys:
+            return path
+        path = path.rpartition("/")[0]
+    return None
+
+
+def _arr_source_names(settings) -> list:
+    return [name for service in ARR_SERVICES for name in arr_sources(settings, service)]
+
+
+class EffectivenessReport:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self._report = None
+
+    def _tagged_paths(self, settings) -> dict:
+        """
+        Mapped paths of every tagged Radarr/Sonarr item in the last snapshots
+        (whether or not it made it into the exclusion file) -> tag labels.
+        """
+        manager = get_exclusion_manager()
+        mappings = manager._source_mappings(settings)
+        tagged = {}
+        for source in _arr_source_names(settings):
+            snapshot = get_snapshot_store().load(source) or {}
+            for label, paths in ((snapshot.get("details") or {}).get("tags") or {}).items():
+                for path in paths:
+                    mapped = manager._apply_path_mappings(path, source, settings, mappings).rstrip("/")
+                    labels = tagged.setdefault(mapped, [])
+                    if label not in labels:
+                        labels.append(label)
+        return tagged
+
+    def get(self, settings=None) -> Optional[dict]:
+        """The report for the latest mover run (None if there is none), recomputed only when its inputs change."""
+        settings = settings or get_user_settings()
+        run = get_mover_parser()._get_latest_files()
+        if not run:
+            return None
+        excl = get_exclusion_set()
+        store = get_snapshot_store()
+        with self._lock:
+            key = (
+                run["timestamp"], _identity(run.get("filtered_files")), _identity(run.get("mover_action")),
+                excl.refresh(),
+                tuple(_identity(store._path(source)) for source in _arr_source_names(settings)),
+                tuple((m.from_prefix, m.to_prefix) for m in get_exclusion_manager()._source_mappings(settings).values()),
+            )
+            if key != self._key:
+                self._report = self._compute(run, excl.entries, self._tagged_paths(settings))
+                self._key = key
+            return self._report
+
+    def _compute(self, run: dict, entries: set, tagged: dict) -> dict:
+        start = time.perf_counter()
+        report = {
+            "run": run["timestamp"],
+            "entries": len(entries),
+            "filtered_files": 0,
+            "filtered_unmatched": 0,
+            "moved_files": 0,
+            "moved_protected_count": 0,
+            "moved_protected": [],
+            "error": None,
+        }
+        hits = dict.fromkeys(entries, 0)
+
+        filtered_path = run.get("filtered_files")
+        if filtered_path and os.path.exists(filtered_path):
+            try:
+                for _, path in _iter_files(filtered_path):
+                    report["filtered_files"] += 1
+                    entry = _covering(path, hits)
+                    if entry is None:
+                        report["filtered_unmatched"] += 1
+                    else:
+                        hits[entry] += 1
+            except Exception as e:
+                logger.error(f"[EFFECTIVENESS] Failed to read {filtered_path}: {e}")
+                report["error"] = f"Filtered_files: {e}"
+
+        action_path = run.get("mover_action")
+        if action_path and os.path.exists(action_path):
+            try:
+                for action, path in _iter_files(action_path):
+                    report["moved_files"] += 1
+                    entry = _covering(path, hits)
+                    tagged_path = _covering(path, tagged)
+                    if entry is None and tagged_path is None:
+                        continue
+                    report["moved_protected_count"] += 1
+                    if len(report["moved_protected"]) < LIST_LIMIT:
+                        report["moved_protected"].append({
+                            "file": path,
+                            "action": action,
+                            "entry": entry,
+                            "tags": tagged.get(tagged_path, []),
+                        })
+            except Exception as e:
+                logger.error(f"[EFFECTIVENESS] Failed to read {action_path}: {e}")
+                report["error"] = f"Mover_action: {e}"
+
+        matched = sorted(((entry, n) for entry, n in hits.items() if n), key=lambda item: (-item[1], item[0]))
+        dead = sorted(entry for entry, n in hits.items() if not n)
+        report["matched_count"] = len(matched)
+        report["matched"] = matched[:LIST_LIMIT]
+        report["dead_count"] = len(dead)
+        report["dead"] = dead[:LIST_LIMIT]
+        report["seconds"] = round(time.perf_counter() - start, 3)
+        logger.info(f"[EFFECTIVENESS] Run {run['timestamp']}: {len(matched)} of {len(entries)} entries matched "
+                    f"{report['filtered_files'] - report['filtered_unmatched']} filtered files, {len(dead)} dead, "
+                    f"{report['moved_protected_count']} protected files moved in {report['seconds']:.2f}s")
+        return report
+
+
+_report = EffectivenessReport()
+
+
+def get_effectiveness_report() -> EffectivenessReport:
+    return _report
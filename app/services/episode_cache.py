@@ -0,0 +1,114 @@
+"""
+Persistent per-series cache of Sonarr episode file paths, so a build only
+calls /api/v3/episodefile for series whose files changed.
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Iterable, List, Optional
+from app.core.config import CONFIG_DIR
+from app.core.coordination import write_json
+
+logger = logging.getLogger(__name__)
+
+EPISODE_CACHE_PATH = os.path.join(CONFIG_DIR, "episode_files.json")
+# Renames leave a series' file count and size alone, so entries are refetched
+# after at most this long; each entry gets a random share of it so the
+# refetches spread across builds instead of landing together
+MAX_AGE_SECONDS = 6 * 3600
+MIN_AGE_FRACTION = 0.5
+
+
+def _current_format(entry: dict) -> bool:
+    files = entry.get("files")
+    return files is not None and (not files or len(files[0]) == 3)
+
+
+class EpisodeFileCache:
+    """
+    series id -> {"key": Series.files_key, "files": [[path, size, added], ...], "expires_ts": ...}.
+    Loaded lazily, saved by the builder after each Sonarr pass.
+    """
+
+    def __init__(self, path: str = EPISODE_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = None
+        self._dirty = False
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = {}
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                self._entries = {int(k): v for k, v in json.load(f).items()}
+        except Exception as e:
+            logger.error(f"[EPISODES] Failed to load episode file cache, starting empty: {e}")
+
+    def get(self, series) -> Optional[List[list]]:
+        """Cached [path, size, added] entries for a Series record, or None if missing, changed or expired."""
+        key = series.files_key
+        if key is None:
+            return None
+        with self._lock:
+            self._load()
+            entry = self._entries.get(series.id)
+        # Entries written before sizes and dates were cached are refetched
+        if not entry or not _current_format(entry) or tuple(entry["key"]) != key or entry["expires_ts"] <= time.time():
+            return None
+        return entry["files"]
+
+    def put(self, series, files: List[tuple]):
+        key = series.files_key
+        if key is None:
+            return
+        ttl = MAX_AGE_SECONDS * random.uniform(MIN_AGE_FRACTION, 1.0)
+        with self._lock:
+            self._load()
+            self._entries[series.id] = {"key": list(key), "files": [list(f) for f in files], "expires_ts": time.time() + ttl}
+            self._dirty = True
+
+    def retain(self, series_ids: Iterable[int]):
+        """Drop series that are no longer tagged or no longer exist."""
+        keep = set(series_ids)
+        with self._lock:
+            self._load()
+            stale = [sid for sid in self._entries if sid not in keep]
+            for sid in stale:
+                del self._entries[sid]
+            if stale:
+                self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                write_json(self.path, {str(k): v for k, v in self._entries.items()})
+                self._dirty = False
+            except Exception as e:
+                logger.error(f"[EPISODES] Failed to save episode file cache: {e}")
+
+    def count(self) -> int:
+        with self._lock:
+            self._load()
+            return len(self._entries)
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_episode_cache(source: str = "sonarr") -> EpisodeFileCache:
+    """One cache per Sonarr instance, since series ids are only unique within an instance."""
+    with _caches_lock:
+        if source not in _caches:
+            path = EPISODE_CACHE_PATH if source == "sonarr" else os.path.join(CONFIG_DIR, f"episode_files_{source}.json")
+            _caches[source] = EpisodeFileCache(path)
+        return _caches[source]
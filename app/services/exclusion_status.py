@@ -0,0 +1,156 @@
+"""
+Per-item exclusion / cache-residency status for the movies and shows pages
+"""
+import logging
+import os
+import threading
+from typing import List, Optional
+from app.core.config import get_user_settings
+from app.services.exclusions import get_exclusion_manager
+from app.services.cache_index import get_cache_index
+
+logger = logging.getLogger(__name__)
+
+
+class ExclusionSet:
+    """
+    Parsed mover_exclusions.txt plus a map of every ancestor directory to the
+    number of entries beneath it, so "is this item covered?" is a couple of
+    hash lookups. Reloaded only when the file's mtime/size changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.output_file = get_exclusion_manager().output_file
+        self.version = None
+        self.entries = set()
+        self.entries_under = {}
+
+    def _file_version(self):
+        try:
+            st = os.stat(self.output_file)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def refresh(self):
+        version = self._file_version()
+        if version == self.version:
+            return self.version
+        with self._lock:
+            if version == self.version:
+                return self.version
+            entries = set()
+            entries_under = {}
+            if version is not None:
+                with open(self.output_file, 'r') as f:
+                    for line in f:
+                        entry = line.strip().rstrip('/')
+                        if not entry or entry in entries:
+                            continue
+                        entries.add(entry)
+                        parent = entry
+                        while True:
+                            parent = parent.rpartition('/')[0]
+                            if not parent:
+                                break
+                            entries_under[parent] = entries_under.get(parent, 0) + 1
+            self.entries = entries
+            self.entries_under = entries_under
+            self.version = version
+            logger.debug(f"[STATUS] Loaded {len(entries)} exclusion entries (version={version})")
+        return self.version
+
+    def covered_count(self, path: str) -> int:
+        """Number of exclusion entries covering path: the path itself, an ancestor folder, or files beneath it."""
+        path = path.rstrip('/')
+        if not path:
+            return 0
+        if path in self.entries:
+            return 1 + self.entries_under.get(path, 0)
+        parent = path
+        while True:
+            parent = parent.rpartition('/')[0]
+            if not parent:
+                break
+            if parent in self.entries:
+                return 1
+        return self.entries_under.get(path, 0)
+
+
+_exclusion_set = None
+
+
+def get_exclusion_set() -> ExclusionSet:
+    global _exclusion_set
+    if _exclusion_set is None:
+        _exclusion_set = ExclusionSet()
+    return _exclusion_set
+
+
+def status_key(source: str, settings) -> tuple:
+    """Everything the computed statuses depend on besides the library itself."""
+    ex = settings.exclusions
+    mapping = ex.radarr_mapping if source == "radarr" else ex.sonarr_mapping
+    tag_ids = ex.radarr_exclude_tag_ids if source == "radarr" else ex.sonarr_exclude_tag_ids
+    index = get_cache_index()
+    # Request path: read the last scan, never rescan here (the scheduler keeps it current)
+    indexed = index.has_scan(settings)
+    return (
+        get_exclusion_set().refresh(),
+        index.version if indexed else None,
+        mapping.from_prefix, mapping.to_prefix,
+        ex.cache_mount_path, ex.host_cache_path,
+        tuple(tag_ids),
+    )
+
+
+def compute_statuses(items: List[dict], source: str, settings=None) -> List[dict]:
+    """
+    Join library items against the exclusion set. Each item needs 'path'
+    (folder), optional 'file_path' and 'tag_ids'.
+    """
+    settings = settings or get_user_settings()
+    manager = get_exclusion_manager()
+    excl = get_exclusion_set()
+    excl.refresh()
+    index = get_cache_index()
+    indexed = index.has_scan(settings)
+    tag_ids = set(settings.exclusions.radarr_exclude_tag_ids if source == "radarr"
+                  else settings.exclusions.sonarr_exclude_tag_ids)
+
+    statuses = []
+    for item in items:
+        raw = item.get('file_path') or item.get('path') or ''
+        folder = item.get('path') or ''
+        excluded_entries = 0
+        on_cache = False
+        cache_bytes = None
+        if folder:
+            mapped_folder = manager._apply_path_mappings(folder, source, settings)
+            excluded_entries = excl.covered_count(mapped_folder)
+            if indexed:
+                cache_bytes = index.size_of(manager._to_container_path(folder, settings))
+        if raw:
+            if not excluded_entries and raw != folder:
+                excluded_entries = excl.covered_count(manager._apply_path_mappings(raw, source, settings))
+            container_path = manager._to_container_path(raw, settings)
+            on_cache = index.exists(container_path) if indexed else os.path.exists(container_path)
+        statuses.append({
+            'excluded': excluded_entries > 0,
+            'excluded_entries': excluded_entries,
+            'on_cache': on_cache,
+            'cache_bytes': cache_bytes,
+            'tagged': any(t in tag_ids for t in item.get('tag_ids', [])),
+        })
+    return statuses
+
+
+def matches_filters(status: dict, excluded: Optional[bool], on_cache: Optional[bool], tagged: Optional[bool]) -> bool:
+    if excluded is not None and status['excluded'] != excluded:
+        return False
+    if on_cache is not None and status['on_cache'] != on_cache:
+        return False
+    if tagged is not None and status['tagged'] != tagged:
+        return False
+    return True
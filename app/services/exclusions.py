@@ -1,30 +1,73 @@
+import json
 import logging
 import os
+import time
 import datetime
+import heapq
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import partial
 from pathlib import Path
-from app.core.config import get_user_settings, save_user_settings
+from typing import Callable, Optional
+from app.core.config import ARR_SERVICES, CONFIG_DIR, arr_service, arr_sources, get_user_settings
+from app.core.coordination import write_json
+from app.core.state import get_state_store
 from app.services.radarr import get_radarr_client
 from app.services.sonarr import get_sonarr_client
+from app.services.episode_cache import get_episode_cache
+from app.services.plexcache import get_plexcache_reader
+from app.services.cache_index import get_cache_index
+from app.services.build_history import get_build_history
+from app.services.capacity import disk_budget, plan
+from app.services.upstream import CircuitOpenError
 from app.services.alert_log import get_alert_log
+from app.services.snapshots import get_snapshot_store, format_age
+from app.services.metrics import (
+    BUILD_STAGE_SECONDS, BUILDS_TOTAL, EXISTENCE_CHECK_SECONDS,
+    EXCLUSION_FILE_WRITES_TOTAL, EXCLUSION_FILE_WRITTEN_BYTES_TOTAL, EXCLUSION_FILE_BYTES, EXCLUSION_FILE_ENTRIES,
+)
 
 logger = logging.getLogger(__name__)
 
+# An unchanged series list says nothing about renamed episode files; refetch them at least this often
+SONARR_REUSE_MAX_AGE_SECONDS = 6 * 3600
+# Entries listed on the stats page
+LARGEST_ENTRIES = 50
+# Cache existence checks between looks at the build deadline
+DEADLINE_CHECK_EVERY = 500
+
 class ExclusionManager:
     def __init__(self):
-        self.output_file = Path("/config/mover_exclusions.txt")
+        self.output_file = Path(CONFIG_DIR) / "mover_exclusions.txt"
+        # Which source each entry of the last written file came from, for sources cut off by the deadline
+        self.manifest_file = Path(CONFIG_DIR) / "mover_exclusions.sources.json"
 
-    def _apply_path_mappings(self, path: str, source: str = "") -> str:
-        """Apply named service path mapping to rewrite path for exclusion file"""
-        settings = get_user_settings()
-        if source == "radarr":
-            m = settings.exclusions.radarr_mapping
-        elif source == "sonarr":
-            m = settings.exclusions.sonarr_mapping
-        elif source == "plexcache":
-            m = settings.exclusions.plexcache_mapping
-        else:
-            # fallback: try all three in order
-            for m in [settings.exclusions.radarr_mapping, settings.exclusions.sonarr_mapping, settings.exclusions.plexcache_mapping]:
+    def _source_mappings(self, settings) -> dict:
+        """Path mapping per source: every Radarr instance, every Sonarr instance, then PlexCache."""
+        mappings = {}
+        for service in ARR_SERVICES:
+            mappings.update((name, instance.mapping) for name, instance in arr_sources(settings, service).items())
+        mappings["plexcache"] = settings.exclusions.plexcache_mapping
+        return mappings
+
+    def _source_mapping(self, source: str, settings):
+        ex = settings.exclusions
+        if source in ("radarr", "sonarr", "plexcache"):
+            return getattr(ex, f"{source}_mapping")
+        if arr_service(source) in ARR_SERVICES:
+            instance = arr_sources(settings, arr_service(source)).get(source)
+            return instance.mapping if instance else None
+        return None
+
+    def _apply_path_mappings(self, path: str, source: str = "", settings=None, mappings: dict = None) -> str:
+        """
+        Apply named service path mapping to rewrite path for exclusion file.
+        Callers mapping many paths pass mappings (see _source_mappings).
+        """
+        settings = settings or get_user_settings()
+        m = mappings.get(source) if mappings is not None else self._source_mapping(source, settings)
+        if m is None:
+            # fallback: try every source's mapping in order
+            for m in (mappings or self._source_mappings(settings)).values():
                 if m.from_prefix and path.startswith(m.from_prefix):
                     return m.to_prefix + path[len(m.from_prefix):]
             return path
@@ -32,9 +75,9 @@ class ExclusionManager:
             return m.to_prefix + path[len(m.from_prefix):]
         return path
 
-    def _to_container_path(self, path: str) -> str:
+    def _to_container_path(self, path: str, settings=None) -> str:
         """Translate any path to container-accessible path for existence check"""
-        settings = get_user_settings()
+        settings = settings or get_user_settings()
         host = settings.exclusions.host_cache_path.rstrip('/')  # /mnt/chloe
         container = settings.exclusions.cache_mount_path.rstrip('/')  # /mnt/cache
         # Already a full host path (e.g. /mnt/chloe/data/...) -> swap prefix
@@ -52,114 +95,547 @@ class ExclusionManager:
         # Relative path (e.g. /data/media/movies/...) -> /mnt/cache/data/media/movies/
         return container + '/' + path.lstrip('/')
 
-    def _exists_on_cache(self, path: str) -> bool:
+    def _exists_on_cache(self, path: str, settings=None) -> bool:
         """Check if path exists via container mount"""
-        container_path = self._to_container_path(path)
+        container_path = self._to_container_path(path, settings)
+        start = time.perf_counter()
         result = os.path.exists(container_path)
+        EXISTENCE_CHECK_SECONDS.observe(time.perf_counter() - start)
         logger.debug(f"PATH CHECK | container={container_path!r} exists={result}")
         return result
 
-    def build_exclusions(self):
+    def _use_snapshot(self, source: str, error: Exception, stale_sources: dict) -> tuple:
+        """Fall back to the last-known-good paths (and their details) for a source whose fetch failed."""
+        label = source.capitalize()
+        snapshot = get_snapshot_store().load(source)
+        if not snapshot:
+            logger.error(f"{label} exclusion build failed and no snapshot exists: {error}")
+            get_alert_log().add("error", arr_service(source), f"{label} connection failed during build: {error}")
+            return set(), {}
+        age = format_age(snapshot["age_seconds"])
+        stale_sources[source] = {
+            "saved_at": snapshot["saved_at"],
+            "age_seconds": int(snapshot["age_seconds"]),
+            "paths": len(snapshot["paths"]),
+            "error": str(error),
+            "fallback": "snapshot",
+        }
+        logger.warning(f"{label} unavailable ({error}) — using snapshot from {snapshot['saved_at']} ({age} old, {len(snapshot['paths'])} paths)")
+        get_alert_log().add(
+            "warning", arr_service(source),
+            f"{label} unavailable during build — using last-known-good snapshot from {snapshot['saved_at']} ({age} old): {error}"
+        )
+        return set(snapshot["paths"]), snapshot.get("details") or {}
+
+    def _load_manifest(self) -> Optional[dict]:
+        if not self.manifest_file.exists():
+            return None
+        try:
+            with open(self.manifest_file, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Failed to read exclusion manifest: {e}")
+            return None
+
+    def _write_manifest(self, final_list: list, owner: dict, source_names, finished_at: str):
+        by_source = {name: [] for name in source_names}
+        for p in final_list:
+            by_source.setdefault(owner.get(p, "custom"), []).append(p)
+        try:
+            write_json(str(self.manifest_file), {"written_at": finished_at, "written_ts": time.time(), "sources": by_source})
+        except Exception as e:
+            logger.error(f"Failed to write exclusion manifest: {e}")
+
+    def _timed_out_source(self, name: str, seconds: float, stale_sources: dict, manifest: Optional[dict]) -> dict:
+        """
+        Stand-in for a source still running at the build deadline: the raw
+        paths it contributed to the last written file, else its snapshot.
+        """
+        error = f"timed out after {seconds:.0f}s (build deadline)"
+        entries = (manifest or {}).get("sources", {}).get(name)
+        if entries is not None:
+            stale_sources[name] = {
+                "saved_at": manifest["written_at"],
+                "age_seconds": int(time.time() - manifest["written_ts"]),
+                "paths": len(entries),
+                "error": error,
+                "fallback": "previous file",
+            }
+            logger.warning(f"{name.capitalize()} cut off by the build deadline — keeping its {len(entries)} entries "
+                           f"from the exclusion file written {manifest['written_at']}")
+            paths, details = set(entries), {}
+        elif arr_service(name) in ARR_SERVICES:
+            paths, details = self._use_snapshot(name, TimeoutError(error), stale_sources)
+        else:
+            logger.error(f"{name.capitalize()} cut off by the build deadline and not in the previous exclusion file")
+            paths, details = set(), {}
+        BUILD_STAGE_SECONDS.observe(seconds, stage=name)
+        return {"paths": paths, "details": details, "seconds": seconds, "error": error, "reused": False, "timed_out": True}
+
+    def build_exclusions(self, progress: Optional[Callable[[str, float], None]] = None):
+        """Build and write the exclusion file. progress, if given, is called with each finished stage and its seconds."""
+        start = time.perf_counter()
+        try:
+            result = self._build(progress)
+        except Exception as e:
+            BUILDS_TOTAL.inc(result="failure")
+            get_state_store().update(last_build_error=str(e),
+                                     last_build_failed_at=datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            raise
+        BUILD_STAGE_SECONDS.observe(time.perf_counter() - start, stage="total")
+        BUILDS_TOTAL.inc(result="success")
+        return result
+
+    def _collect_custom(self, settings) -> tuple:
+        """Custom folders - used as-is"""
+        return {folder.strip() for folder in settings.exclusions.custom_folders if folder.strip()}, False, {}
+
+    def _collect_plexcache(self, settings) -> tuple:
+        """Raw paths from the PlexCache-D export (re-read only when the file changes)"""
+        return get_plexcache_reader().read(settings), False, {}
+
+    def _reusable_snapshot(self, source: str, tag_order: list, max_age: float = None):
+        """The source's snapshot if it was built for the same tags, in the same order (and is recent enough), else None."""
+        snapshot = get_snapshot_store().load(source)
+        if not snapshot or snapshot.get("tag_ids") != tag_order:
+            return None
+        if max_age is not None and snapshot["age_seconds"] > max_age:
+            return None
+        return snapshot
+
+    def _tag_labels(self, client, tag_ids: set) -> dict:
+        labels = {t.get("id"): t.get("label") for t in client.get_all_tags()}
+        return {t: labels.get(t) or f"tag {t}" for t in tag_ids}
+
+    def _collect_radarr(self, settings, source: str = "radarr") -> tuple:
+        """
+        Tagged movies of one Radarr instance - full file path if downloaded,
+        else folder. Returns (paths, reused, details); details holds the file
+        sizes Radarr reports ({"sizes": {path: bytes}}) and the paths under
+        each tag ({"tags": {label: [paths]}}).
+        """
+        radarr_paths = set()
+        instance = arr_sources(settings, "radarr")[source]
+        if not instance.exclude_tag_ids:
+            return radarr_paths, False, {}
+        radarr = get_radarr_client(source)
+        # In settings order, which is the tag's priority for capacity planning
+        tag_order = list(dict.fromkeys(instance.exclude_tag_ids))
+        tag_ids = set(tag_order)
+        previous = self._reusable_snapshot(source, tag_order)
+        movies = radarr.iter_movies(previous)
+        sizes = {}
+        added = {}
+        by_tag = {t: [] for t in tag_order}
+        for m in movies:
+            tags = [t for t in m.tags if t in tag_ids]
+            if tags:
+                path = m.file_path or m.path
+                if path:
+                    radarr_paths.add(path)
+                    if m.file_path and m.size is not None:
+                        sizes[path] = m.size
+                    if m.file_path and m.added is not None:
+                        added[path] = m.added
+                    for t in tags:
+                        by_tag[t].append(path)
+        if movies.unchanged_since(previous):
+            logger.info(f"{source.capitalize()} movie list unchanged since {previous['saved_at']} — reusing {len(previous['paths'])} snapshot paths")
+            return set(previous["paths"]), True, previous.get("details") or {}
+        labels = self._tag_labels(radarr, tag_ids)
+        details = {"sizes": sizes, "added": added, "tags": {labels[t]: paths for t, paths in by_tag.items()}}
+        get_snapshot_store().save(source, radarr_paths, tag_ids=tag_order, details=details, **movies.validators())
+        return radarr_paths, False, details
+
+    def _collect_sonarr(self, settings, source: str = "sonarr") -> tuple:
+        """
+        Tagged series of one Sonarr instance - individual episode files, else the series folder.
+        The series list carries per-series file counts and sizes, so new,
+        removed or upgraded files show up there: if the whole list is
+        unchanged the snapshot is reused, otherwise only series whose
+        statistics changed are refetched (see EpisodeFileCache), in parallel
+        as far as the instance's concurrency governor allows. Renames do
+        not show up, hence the reuse age limits.
+        """
+        sonarr_paths = set()
+        instance = arr_sources(settings, "sonarr")[source]
+        if not instance.exclude_tag_ids:
+            return sonarr_paths, False, {}
+        sonarr = get_sonarr_client(source)
+        tag_order = list(dict.fromkeys(instance.exclude_tag_ids))
+        tag_ids = set(tag_order)
+        previous = self._reusable_snapshot(source, tag_order, max_age=SONARR_REUSE_MAX_AGE_SECONDS)
+        series = sonarr.iter_series(previous)
+        tagged = [s for s in series if any(t in tag_ids for t in s.tags)]
+        if series.unchanged_since(previous):
+            logger.info(f"{source.capitalize()} series list unchanged since {previous['saved_at']} — reusing {len(previous['paths'])} snapshot paths")
+            return set(previous["paths"]), True, previous.get("details") or {}
+        labels = self._tag_labels(sonarr, tag_ids)
+        cache = get_episode_cache(source)
+        sizes = {}
+        added = {}
+        by_tag = {t: [] for t in tag_order}
+        files_of = {s.id: cache.get(s) for s in tagged}
+        missing = [s for s in tagged if files_of[s.id] is None]
+        if missing:
+            # The instance's concurrency governor decides how many of these actually run at once
+            fetch = partial(self._fetch_episode_files, sonarr, cache)
+            with ThreadPoolExecutor(max_workers=sonarr.max_concurrency, thread_name_prefix="episode-fetch") as pool:
+                files_of.update(zip((s.id for s in missing), pool.map(fetch, missing)))
+        for s in tagged:
+            files = files_of[s.id]
+            if files:
+                series_paths = [f[0] for f in files]
+                sizes.update((f[0], f[1]) for f in files if f[1] is not None)
+                added.update((f[0], f[2]) for f in files if f[2] is not None)
+            else:
+                series_paths = [s.path] if s.path else []
+            sonarr_paths.update(series_paths)
+            for t in s.tags:
+                if t in tag_ids:
+                    by_tag[t].extend(series_paths)
+        details = {"sizes": sizes, "added": added, "tags": {labels[t]: paths for t, paths in by_tag.items()}}
+        cache.retain(s.id for s in tagged)
+        cache.save()
+        logger.info(f"{source.capitalize()} episode files: {len(missing)} of {len(tagged)} tagged series fetched, rest from cache")
+        get_snapshot_store().save(source, sonarr_paths, tag_ids=tag_order, details=details, **series.validators())
+        return sonarr_paths, False, details
+
+    def _fetch_episode_files(self, sonarr, cache, series) -> list:
+        try:
+            files = [(ep.path, ep.size, ep.added) for ep in sonarr.fetch_episode_files(series.id) if ep.path]
+        except CircuitOpenError:
+            # Sonarr is down — abandon the whole fetch instead of falling back per series
+            raise
+        except Exception as e:
+            logger.error(f"Failed to fetch episodes for series {series.id}: {e}")
+            return []
+        cache.put(series, files)
+        return files
+
+    def _run_source(self, name: str, collect, settings, stale_sources: dict) -> dict:
+        """Run one source collector, timing it and turning failures into a snapshot fallback or an empty set."""
+        stage_start = time.perf_counter()
+        error = None
+        reused = False
+        try:
+            paths, reused, details = collect(settings)
+        except Exception as e:
+            error = str(e)
+            if arr_service(name) in ARR_SERVICES:
+                paths, details = self._use_snapshot(name, e, stale_sources)
+            else:
+                logger.error(f"Error reading {name} source: {e}")
+                paths, details = set(), {}
+        elapsed = time.perf_counter() - stage_start
+        BUILD_STAGE_SECONDS.observe(elapsed, stage=name)
+        return {"paths": paths, "details": details, "seconds": elapsed, "error": error, "reused": reused, "timed_out": False}
+
+    def _collect_sources(self, settings, stale_sources: dict, deadline: float = None, manifest: dict = None) -> dict:
+        """
+        The sources (every Radarr and Sonarr instance among them) are
+        independent and I/O-bound, so they are fetched concurrently; results
+        are keyed by source name, so the merge does not depend on completion
+        order. Sources still running at the deadline (time.monotonic()) are
+        replaced by _timed_out_source.
+        """
+        collectors = {
+            "custom": self._collect_custom,
+            "plexcache": self._collect_plexcache,
+        }
+        for name in arr_sources(settings, "radarr"):
+            collectors[name] = partial(self._collect_radarr, source=name)
+        for name in arr_sources(settings, "sonarr"):
+            collectors[name] = partial(self._collect_sonarr, source=name)
+        stage_start = time.perf_counter()
+        pool = ThreadPoolExecutor(max_workers=len(collectors), thread_name_prefix="build-source")
+        futures = {name: pool.submit(self._run_source, name, fn, settings, stale_sources)
+                   for name, fn in collectors.items()}
+        done, _ = wait(futures.values(), timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+        # A collector cut off here keeps its thread until its own request timeouts end it; the build does not wait
+        pool.shutdown(wait=False, cancel_futures=True)
+        elapsed = time.perf_counter() - stage_start
+        return {name: future.result() if future in done else self._timed_out_source(name, elapsed, stale_sources, manifest)
+                for name, future in futures.items()}
+
+    def _account_bytes(self, final_list: list, mapped_paths: list, sources: dict, settings, indexed: bool) -> dict:
+        """
+        Bytes protected by the written exclusions, in total and per source and
+        tag. Sizes reported by Radarr/Sonarr are used where known, the cache
+        index otherwise; entries inside an excluded folder are not counted twice.
+        """
+        index = get_cache_index()
+        known_sizes = [info["details"].get("sizes") or {} for info in sources.values()]
+        # Keyed on the mapped path: a PlexCache entry and a Radarr file can be the same file
+        mapped_of = {}
+        sizes = {}
+        for path, mapped in zip(final_list, mapped_paths):
+            key = mapped.rstrip('/')
+            mapped_of[path] = key
+            if sizes.get(key) is not None:
+                continue
+            size = None
+            for known in known_sizes:
+                size = known.get(path)
+                if size is not None:
+                    break
+            if size is None and indexed:
+                size = index.size_of(self._to_container_path(path, settings))
+            sizes[key] = size
+
+        # Sorted this way every folder is directly followed by the entries
+        # beneath it, which its size already includes
+        counted = {}
+        open_folder = None
+        for key in sorted(sizes, key=lambda p: p.replace('/', '\0')):
+            if open_folder is not None and key.startswith(open_folder):
+                continue
+            open_folder = key + '/'
+            counted[key] = sizes[key] or 0
+
+        def bytes_of(paths) -> int:
+            keys = {mapped_of[p] for p in paths if p in mapped_of}
+            return sum(counted.get(k, 0) for k in keys)
+
+        largest = heapq.nlargest(LARGEST_ENTRIES, counted.items(), key=lambda item: item[1])
+        return {
+            "total": sum(counted.values()),
+            "by_source": {name: bytes_of(info["paths"]) for name, info in sources.items()},
+            "by_tag": {
+                name: {label: bytes_of(paths) for label, paths in info["details"]["tags"].items()}
+                for name, info in sources.items() if info["details"].get("tags")
+            },
+            "largest": [[mapped, size] for mapped, size in largest],
+            "entries": counted,
+            "mapped_of": mapped_of,
+        }
+
+    def _entry_priorities(self, entries: dict, mapped_of: dict, sources: dict, settings) -> dict:
+        """
+        Sort key per exclusion entry, lower kept first: its source's place in
+        capacity_source_priority, then within that source the position of its
+        best exclude tag in the settings (custom folders and PlexCache have no
+        tags), then the newest file first.
+        """
+        order = settings.exclusions.capacity_source_priority
+        source_rank = {name: i for i, name in enumerate(order)}
+        unranked = (len(order), 0)
+        best = {}
+        newest = {}
+        for name, info in sources.items():
+            # Additional instances rank with their service unless listed themselves
+            rank = source_rank.get(name, source_rank.get(arr_service(name), len(order)))
+            tag_rank = {}
+            for i, paths in enumerate((info["details"].get("tags") or {}).values()):
+                for path in paths:
+                    tag_rank.setdefault(path, i)
+            for path in info["paths"]:
+                key = mapped_of.get(path)
+                if key in entries:
+                    candidate = (rank, tag_rank.get(path, 0))
+                    if candidate < best.get(key, unranked):
+                        best[key] = candidate
+            for path, ts in (info["details"].get("added") or {}).items():
+                key = mapped_of.get(path)
+                if key in entries and ts > newest.get(key, 0):
+                    newest[key] = ts
+        return {key: (*best.get(key, unranked), -newest.get(key, 0)) for key in entries}
+
+    def _drop_trimmed(self, final_list: list, mapped_paths: list, trimmed: set) -> tuple:
+        """Remove trimmed entries and anything beneath a trimmed folder."""
+        kept_raw, kept_mapped = [], []
+        for path, mapped in zip(final_list, mapped_paths):
+            key = mapped.rstrip('/')
+            dropped = key in trimmed
+            while not dropped and key:
+                key = key.rpartition('/')[0]
+                dropped = key in trimmed
+            if not dropped:
+                kept_raw.append(path)
+                kept_mapped.append(mapped)
+        return kept_raw, kept_mapped
+
+    def _plan_capacity(self, protected: dict, sources: dict, settings) -> dict:
+        """Compare the planned exclusion bytes with the cache pool budget; returns the plan, with "trim" keys."""
+        ex = settings.exclusions
+        capacity = disk_budget(settings)
+        capacity["headroom_pct"] = ex.capacity_headroom_pct
+        capacity["trim_enabled"] = ex.capacity_trim_enabled
+        entries = protected["entries"]
+        budget = capacity.get("budget_bytes")
+        # Ranking entries is only needed when something has to go
+        over = budget is not None and protected["total"] > budget
+        priorities = self._entry_priorities(entries, protected["mapped_of"], sources, settings) if over else {}
+        capacity.update(plan(entries, priorities, budget))
+        return capacity
+
+    def _build(self, progress=None):
         logger.info("Building exclusions list...")
+
+        def stage_done(stage: str, stage_start: float):
+            elapsed = time.perf_counter() - stage_start
+            BUILD_STAGE_SECONDS.observe(elapsed, stage=stage)
+            if progress is not None:
+                progress(stage, elapsed)
+
         settings = get_user_settings()
+        stale_sources = {}
+        deadline_seconds = settings.exclusions.build_deadline_seconds
+        deadline = time.monotonic() + deadline_seconds if deadline_seconds > 0 else None
+        manifest = self._load_manifest() if deadline is not None else None
+
+        def past_deadline() -> bool:
+            return deadline is not None and time.monotonic() >= deadline
+
+        stage_start = time.perf_counter()
+        sources = self._collect_sources(settings, stale_sources, deadline, manifest)
+        timed_out = [name for name, info in sources.items() if info["timed_out"]]
+        # Fallbacks are recorded in completion order; report them in source order
+        stale_sources = {name: stale_sources[name] for name in sources if name in stale_sources}
+        stage_done("sources", stage_start)
+        plexcache_paths = sources["plexcache"]["paths"]
+
         all_paths = set()
+        for info in sources.values():
+            all_paths.update(info["paths"])
 
-        # 1. Custom folders - use as-is
-        for folder in settings.exclusions.custom_folders:
-            if folder.strip():
-                all_paths.add(folder.strip())
-
-        # 2. PlexCache-D paths
-        plexcache_paths = set()
-        pc_path = Path(settings.exclusions.plexcache_file_path)
-        if pc_path.exists():
-            try:
-                with open(pc_path, 'r') as f:
-                    for line in f:
-                        line = line.strip()
-                        if not line or line.startswith('#'):
-                            continue
-                        plexcache_paths.add(line)
-            except Exception as e:
-                logger.error(f"Error reading PlexCache file: {e}")
-        all_paths.update(plexcache_paths)
-
-        # 3. Radarr - use full file path if downloaded, else folder
-        radarr_paths = set()
-        if settings.exclusions.radarr_exclude_tag_ids:
-            try:
-                movies = get_radarr_client().get_all_movies()
-                tag_ids = set(settings.exclusions.radarr_exclude_tag_ids)
-                for m in movies:
-                    if any(t in tag_ids for t in m.get('tags', [])):
-                        file_path = m.get('movieFile', {}).get('path')
-                        folder_path = m.get('path')
-                        path = (file_path or folder_path or '').strip()
-                        if path:
-                            radarr_paths.add(path)
-            except Exception as e:
-                logger.error(f"Radarr exclusion build failed: {e}")
-                get_alert_log().add("error", "radarr", f"Radarr connection failed during build: {e}")
-
-        # 4. Sonarr - individual episode files
-        sonarr_paths = set()
-        if settings.exclusions.sonarr_exclude_tag_ids:
-            try:
-                sonarr = get_sonarr_client()
-                shows = sonarr.get_all_series()
-                tag_ids = set(settings.exclusions.sonarr_exclude_tag_ids)
-                for s in shows:
-                    if any(t in tag_ids for t in s.get('tags', [])):
-                        episode_files = sonarr.get_episode_files(s['id'])
-                        if episode_files:
-                            for ep in episode_files:
-                                ep_path = (ep.get('path') or '').strip()
-                                if ep_path:
-                                    sonarr_paths.add(ep_path)
-                        elif s.get('path'):
-                            sonarr_paths.add(s['path'].strip())
-            except Exception as e:
-                logger.error(f"Sonarr exclusion build failed: {e}")
-                get_alert_log().add("error", "sonarr", f"Sonarr connection failed during build: {e}")
-
-        all_paths.update(radarr_paths)
-        all_paths.update(sonarr_paths)
-
-        # 5. Map paths then validate existence then write.
+        # Map paths then validate existence then write.
         # PlexCache raw paths (e.g. /chloe/tv/...) must be mapped to host paths
         # before existence check since raw prefix has no container mount.
+        # A path several sources list takes the mapping of the first one:
+        # Radarr instances, Sonarr instances, then PlexCache.
+        mappings = self._source_mappings(settings)
+        source_of = {}
+        for name in list(mappings) + [n for n in sources if n not in mappings]:
+            for p in sources.get(name, {}).get("paths", ()):
+                source_of.setdefault(p, name)
+
         def map_path(p):
-            if p in radarr_paths: return self._apply_path_mappings(p, "radarr")
-            if p in sonarr_paths: return self._apply_path_mappings(p, "sonarr")
-            if p in plexcache_paths: return self._apply_path_mappings(p, "plexcache")
-            return self._apply_path_mappings(p)
+            return self._apply_path_mappings(p, source_of.get(p, ""), settings, mappings)
 
-        valid_paths = []
+        stage_start = time.perf_counter()
+        # One incremental rescan of the cache pool answers every lookup below;
+        # if the mount is unavailable, fall back to checking each path
+        index = get_cache_index()
+        if past_deadline():
+            # No time left for a rescan; the last one still answers lookups
+            last_scan = index.summary()
+            indexed = last_scan["scanned_at"] is not None and last_scan["root"] == settings.exclusions.cache_mount_path.rstrip("/")
+        else:
+            indexed = index.refresh(settings)
+        if indexed:
+            exists_on_cache = lambda p: index.exists(self._to_container_path(p, settings))
+        else:
+            exists_on_cache = lambda p: self._exists_on_cache(p, settings)
+        # PlexCache paths are already guaranteed on cache - skip existence check
+        valid_paths = [p for p in all_paths if p in plexcache_paths]
+        to_check = [p for p in all_paths if p not in plexcache_paths]
         skipped = 0
-        for p in all_paths:
-            # PlexCache paths are already guaranteed on cache - skip existence check
-            if p in plexcache_paths:
-                valid_paths.append(p)
-                continue
-            if self._exists_on_cache(p):
+        checked = len(to_check)
+        for i, p in enumerate(to_check):
+            # Index lookups are in memory; only checks against the filesystem are cut off
+            if not indexed and i % DEADLINE_CHECK_EVERY == 0 and past_deadline():
+                checked = i
+                break
+            if exists_on_cache(p):
                 valid_paths.append(p)
             else:
                 skipped += 1
+        # Past the deadline, unchecked paths stay only if the previous file already listed them
+        unchecked = to_check[checked:]
+        kept_unchecked = 0
+        if unchecked:
+            previous = {p for entries in (manifest or {}).get("sources", {}).values() for p in entries}
+            kept = [p for p in unchecked if p in previous]
+            valid_paths.extend(kept)
+            kept_unchecked = len(kept)
+            logger.warning(f"Build deadline reached during cache checks — {len(unchecked)} paths unchecked, "
+                           f"{kept_unchecked} kept from the previous exclusion file")
 
-        final_list = sorted(valid_paths)
-        mapped_paths = [map_path(p) for p in final_list]
+        # Instances whose mappings lead to the same host path produce one entry
+        final_list, mapped_paths, seen = [], [], set()
+        for p in sorted(valid_paths):
+            mapped = map_path(p)
+            if mapped not in seen:
+                seen.add(mapped)
+                final_list.append(p)
+                mapped_paths.append(mapped)
+        duplicates = len(valid_paths) - len(final_list)
+        if duplicates:
+            logger.info(f"{duplicates} paths from different sources map to entries already listed")
+        stage_done("validate", stage_start)
+
+        stage_start = time.perf_counter()
+        protected = self._account_bytes(final_list, mapped_paths, sources, settings, indexed)
+        capacity = self._plan_capacity(protected, sources, settings)
+        trim = set(capacity.pop("trim"))
+        if capacity["over_budget"]:
+            over = f"Exclusions would pin {_gib(capacity['planned_bytes'])} of a {_gib(capacity['budget_bytes'])} cache budget"
+            if capacity["trim_enabled"]:
+                final_list, mapped_paths = self._drop_trimmed(final_list, mapped_paths, trim)
+                protected = self._account_bytes(final_list, mapped_paths, sources, settings, indexed)
+                message = f"{over} — dropped {len(trim)} lowest-priority entries ({_gib(capacity['trim_bytes'])})"
+            else:
+                message = f"{over} — enable capacity trimming or lower the headroom"
+            logger.warning(message)
+            get_alert_log().add("warning", "builder", message)
+        trimmed = capacity["trim_enabled"] and capacity["over_budget"]
+        capacity["trimmed_entries"] = len(trim) if trimmed else 0
+        capacity["trimmed_bytes"] = capacity["trim_bytes"] if trimmed else 0
+        capacity["protected_bytes"] = protected["total"]
+        stage_done("accounting", stage_start)
 
         try:
+            stage_start = time.perf_counter()
+            content = "".join(f"{path}\n" for path in mapped_paths)
             with open(self.output_file, 'w') as f:
-                for path in mapped_paths:
-                    f.write(f"{path}\n")
+                f.write(content)
+            written = len(content.encode())
+            EXCLUSION_FILE_WRITES_TOTAL.inc()
+            EXCLUSION_FILE_WRITTEN_BYTES_TOTAL.inc(written)
+            EXCLUSION_FILE_BYTES.set(written)
+            EXCLUSION_FILE_ENTRIES.set(len(mapped_paths))
+            stage_done("write", stage_start)
 
-            settings.exclusions.last_build = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            save_user_settings(settings)
+            finished_at = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            self._write_manifest(final_list, source_of, sources, finished_at)
+            get_state_store().update(last_build=finished_at, last_build_error=None)
+            deadline_info = {"seconds": deadline_seconds, "exceeded": bool(timed_out or unchecked),
+                             "timed_out_sources": timed_out, "unchecked_paths": len(unchecked),
+                             "unchecked_kept": kept_unchecked}
 
             logger.info(f"Exclusions built. Candidates: {len(all_paths)}, On cache: {len(final_list)}, Skipped: {skipped}")
-            get_alert_log().add("success", "builder", f"Exclusion build completed — {len(final_list)} exclusions written, {skipped} skipped (not on cache)")
-            return {"total": len(final_list), "candidates": len(all_paths), "skipped": skipped}
+            message = f"Exclusion build completed — {len(final_list)} exclusions written, {skipped} skipped (not on cache)"
+            stale = [f"{src} {info['fallback']} {format_age(info['age_seconds'])} old" for src, info in stale_sources.items()]
+            if unchecked:
+                stale.append(f"{len(unchecked)} paths not checked against the cache ({kept_unchecked} kept from the previous file)")
+            if stale:
+                get_alert_log().add("warning", "builder", f"{message} — STALE data used: {', '.join(stale)}")
+            else:
+                get_alert_log().add("success", "builder", message)
+            source_stats = {
+                name: {"paths": len(info["paths"]), "bytes": protected["by_source"][name],
+                       "seconds": round(info["seconds"], 3), "error": info["error"], "reused": info["reused"],
+                       "timed_out": info["timed_out"]}
+                for name, info in sources.items()
+            }
+            reused_sources = [name for name, info in sources.items() if info["reused"]]
+            get_build_history().record({
+                "finished_at": finished_at,
+                "total": len(final_list),
+                "candidates": len(all_paths),
+                "skipped": skipped,
+                "protected_bytes": protected["total"],
+                "sources": source_stats,
+                "tags": protected["by_tag"],
+                "largest": protected["largest"],
+                "capacity": capacity,
+                "stale_sources": list(stale_sources),
+                "deadline": deadline_info,
+            })
+            return {"total": len(final_list), "candidates": len(all_paths), "skipped": skipped,
+                    "protected_bytes": protected["total"], "capacity": capacity, "stale_sources": stale_sources,
+                    "reused_sources": reused_sources, "sources": source_stats, "deadline": deadline_info}
 
         except Exception as e:
             logger.error(f"Failed to write exclusion file: {e}")
@@ -176,5 +652,8 @@ class ExclusionManager:
         with open(self.output_file, 'r') as f:
             return [line.strip() for line in f if line.strip()]
 
+def _gib(num: int) -> str:
+    return f"{num / 1024 ** 3:.0f} GiB"
+
 def get_exclusion_manager():
     return ExclusionManager()
@@ -0,0 +1,93 @@
+"""
+Background upstream health probes. The scheduler calls probe_all() on an
+interval; the dashboard and /health only read the cached results.
+"""
+import logging
+import threading
+import time
+import concurrent.futures
+from collections import deque
+from datetime import datetime
+from app.core.config import ARR_SERVICES, arr_service, arr_sources, get_user_settings
+from app.services.radarr import get_radarr_client
+from app.services.sonarr import get_sonarr_client
+
+logger = logging.getLogger(__name__)
+
+PROBE_INTERVAL_SECONDS = 30
+HISTORY_SIZE = 120  # one hour at the default interval
+
+
+class HealthMonitor:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._status = {}
+        self._history = {}
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="health-probe")
+
+    def _names(self) -> list:
+        """Every configured Radarr/Sonarr instance, main connections first."""
+        settings = get_user_settings()
+        return [name for service in ARR_SERVICES for name in arr_sources(settings, service)]
+
+    def _upstreams(self) -> dict:
+        factories = {"radarr": get_radarr_client, "sonarr": get_sonarr_client}
+        return {name: factories[arr_service(name)](name) for name in self._names()}
+
+    def _probe(self, client) -> dict:
+        if not client.url or not client.api_key:
+            return {"status": "unconfigured", "latency_ms": None}
+        start = time.perf_counter()
+        ok = client.test_connection()
+        latency_ms = round((time.perf_counter() - start) * 1000, 1)
+        return {"status": "up" if ok else "down", "latency_ms": latency_ms}
+
+    def probe_all(self):
+        """Probe every upstream concurrently and record the results."""
+        futures = {name: self._executor.submit(self._probe, client) for name, client in self._upstreams().items()}
+        for name, future in futures.items():
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"[HEALTH] Probe for {name} raised: {e}")
+                result = {"status": "down", "latency_ms": None}
+            self._record(name, result)
+
+    def _record(self, name: str, result: dict):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            previous = self._status.get(name, {})
+            status = {
+                "status": result["status"],
+                "latency_ms": result["latency_ms"],
+                "last_checked": now,
+                "last_success": now if result["status"] == "up" else previous.get("last_success"),
+            }
+            self._status[name] = status
+            self._history.setdefault(name, deque(maxlen=HISTORY_SIZE)).append(
+                {"timestamp": now, "status": result["status"], "latency_ms": result["latency_ms"]}
+            )
+        if previous.get("status") != status["status"]:
+            logger.info(f"[HEALTH] {name} is now {status['status']} (latency={status['latency_ms']}ms)")
+
+    def get_status(self, name: str) -> dict:
+        with self._lock:
+            return dict(self._status.get(name) or {"status": "unknown", "latency_ms": None,
+                                                    "last_checked": None, "last_success": None})
+
+    def is_up(self, name: str) -> bool:
+        return self.get_status(name)["status"] == "up"
+
+    def get_all(self) -> dict:
+        return {name: self.get_status(name) for name in self._names()}
+
+    def get_history(self) -> dict:
+        with self._lock:
+            return {name: list(history) for name, history in self._history.items()}
+
+
+_monitor = HealthMonitor()
+
+
+def get_health_monitor() -> HealthMonitor:
+    return _monitor
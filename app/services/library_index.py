@@ -0,0 +1,202 @@
+"""
+Indexed in-memory copy of the Radarr/Sonarr libraries backing the paginated
+movies and shows list endpoints
+"""
+import logging
+import threading
+import time
+from typing import List, Optional
+from app.core.config import get_user_settings
+from app.services.exclusion_status import compute_statuses, matches_filters, status_key
+from app.services.radarr import get_radarr_client
+from app.services.sonarr import get_sonarr_client
+
+logger = logging.getLogger(__name__)
+
+LIBRARY_TTL_SECONDS = 300
+MAX_PAGE_SIZE = 500
+UNTAGGED = "__untagged__"
+# Fields kept for indexing/status joins but not returned to the browser
+_PRIVATE_FIELDS = ('sort_title', 'tag_ids', 'path', 'file_path')
+
+
+def _load_movies() -> List[dict]:
+    client = get_radarr_client()
+    tag_map = {tag['id']: tag['label'] for tag in client.get_all_tags()}
+    items = []
+    for movie in client.iter_movies():
+        items.append({
+            'id': movie.id,
+            'title': movie.title,
+            'sort_title': movie.sort_title,
+            'year': movie.year,
+            'tags': [tag_map.get(tag_id, f"Unknown Tag {tag_id}") for tag_id in movie.tags],
+            'tag_ids': movie.tags,
+            'path': movie.path,
+            'file_path': movie.file_path,
+        })
+    return items
+
+
+def _load_shows() -> List[dict]:
+    client = get_sonarr_client()
+    tag_map = {tag['id']: tag['label'] for tag in client.get_all_tags()}
+    items = []
+    for series in client.iter_series():
+        items.append({
+            'id': series.id,
+            'title': series.title,
+            'sort_title': series.sort_title,
+            'year': series.year,
+            'seasons': series.seasons,
+            'tags': [tag_map.get(tag_id, f"Unknown Tag {tag_id}") for tag_id in series.tags],
+            'tag_ids': series.tags,
+            'path': series.path,
+        })
+    return items
+
+
+class LibraryIndex:
+    """
+    Holds one library with precomputed search/sort/tag indexes. Rebuilt from
+    upstream at most once per LIBRARY_TTL_SECONDS (or on demand); queries
+    only touch the in-memory structures.
+    """
+
+    def __init__(self, kind: str, source: str, loader, sort_keys: tuple):
+        self.kind = kind
+        self.source = source
+        self.sort_keys = sort_keys
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._data = None
+        self.loaded_at = None
+        self.version = 0
+        self.error = None
+        self._statuses = None
+        self._status_key = None
+
+    def _is_stale(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > LIBRARY_TTL_SECONDS
+
+    def ensure_loaded(self, force: bool = False):
+        if not force and not self._is_stale():
+            return
+        with self._lock:
+            if not force and not self._is_stale():
+                return
+            start = time.monotonic()
+            try:
+                items = self._loader()
+            except Exception as e:
+                # Keep serving the previous dataset; retry on the next request
+                logger.error(f"[LIBRARY] Failed to load {self.kind}: {e}")
+                self.error = str(e)
+                return
+            data = self._build(items)
+            data["version"] = self.version + 1
+            self._data = data
+            self.loaded_at = time.monotonic()
+            self.version = data["version"]
+            self.error = None
+            logger.info(f"[LIBRARY] Indexed {len(items)} {self.kind} in {time.monotonic() - start:.2f}s (v{self.version})")
+
+    def _build(self, items: List[dict]) -> dict:
+        titles = [item['title'].lower() for item in items]
+        by_tag = {}
+        for idx, item in enumerate(items):
+            if not item['tags']:
+                by_tag.setdefault(UNTAGGED, set()).add(idx)
+            for label in item['tags']:
+                by_tag.setdefault(label.lower(), set()).add(idx)
+        orders = {}
+        for key in self.sort_keys:
+            if key == "title":
+                orders[key] = sorted(range(len(items)), key=lambda i: items[i]['sort_title'])
+            else:
+                orders[key] = sorted(range(len(items)), key=lambda i: (items[i][key], items[i]['sort_title']))
+        all_tags = sorted({label for item in items for label in item['tags']})
+        return {"items": items, "titles": titles, "by_tag": by_tag, "orders": orders, "all_tags": all_tags}
+
+    def _get_statuses(self, data: dict) -> List[dict]:
+        """Exclusion/cache status per item, recomputed only when the library, exclusion file or mappings change."""
+        settings = get_user_settings()
+        key = (data["version"],) + status_key(self.source, settings)
+        if key != self._status_key:
+            start = time.monotonic()
+            self._statuses = compute_statuses(data["items"], self.source, settings)
+            self._status_key = key
+            logger.info(f"[LIBRARY] Computed status for {len(data['items'])} {self.kind} in {time.monotonic() - start:.2f}s")
+        return self._statuses
+
+    def get_all_tags(self) -> List[str]:
+        self.ensure_loaded()
+        return self._data["all_tags"] if self._data else []
+
+    def count(self) -> int:
+        self.ensure_loaded()
+        return len(self._data["items"]) if self._data else 0
+
+    def query(self, q: str = "", tags: Optional[List[str]] = None, sort: str = "title",
+              order: str = "asc", offset: int = 0, limit: int = 100, excluded: Optional[bool] = None,
+              on_cache: Optional[bool] = None, tagged: Optional[bool] = None) -> dict:
+        self.ensure_loaded()
+        data = self._data
+        offset = max(0, offset)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        if not data:
+            return {"items": [], "total": 0, "offset": offset, "limit": limit,
+                    "next_offset": None, "version": self.version, "error": self.error}
+
+        # Tag filter: every selected tag must be present (intersection of postings)
+        candidates = None
+        for tag in tags or []:
+            posting = data["by_tag"].get(tag.lower(), set())
+            candidates = posting if candidates is None else candidates & posting
+            if not candidates:
+                break
+
+        ordered = data["orders"].get(sort, data["orders"]["title"])
+        if order == "desc":
+            ordered = reversed(ordered)
+
+        needle = q.strip().lower()
+        titles = data["titles"]
+        statuses = self._get_statuses(data)
+        filter_status = excluded is not None or on_cache is not None or tagged is not None
+        matches = [
+            idx for idx in ordered
+            if (candidates is None or idx in candidates)
+            and (not needle or needle in titles[idx])
+            and (not filter_status or matches_filters(statuses[idx], excluded, on_cache, tagged))
+        ]
+        page = matches[offset:offset + limit]
+        items = data["items"]
+        next_offset = offset + limit if offset + limit < len(matches) else None
+        return {
+            "items": [self._public_item(items[idx], statuses[idx]) for idx in page],
+            "total": len(matches),
+            "offset": offset,
+            "limit": limit,
+            "next_offset": next_offset,
+            "version": self.version,
+            "error": self.error,
+        }
+
+    @staticmethod
+    def _public_item(item: dict, status: dict) -> dict:
+        public = {k: v for k, v in item.items() if k not in _PRIVATE_FIELDS}
+        public.update(status)
+        return public
+
+
+_movie_index = LibraryIndex("movies", "radarr", _load_movies, ("title", "year"))
+_show_index = LibraryIndex("shows", "sonarr", _load_shows, ("title", "year", "seasons"))
+
+
+def get_movie_index() -> LibraryIndex:
+    return _movie_index
+
+
+def get_show_index() -> LibraryIndex:
+    return _show_index
@@ -0,0 +1,329 @@
+"""
+Minimal Prometheus text-format metrics.
+
+Writes never take a shared lock: every thread accumulates into its own shard
+(a plain dict only that thread mutates) and /metrics sums the shards at
+scrape time. A lock is only taken when a thread writes its first sample and
+when a scrape folds the shards of finished threads into a retired shard.
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from app.core.coordination import coordination_db
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._local = threading.local()
+        self._shards = []  # (thread, shard) pairs
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            self._local.shard = shard
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _collect(self) -> dict:
+        """Merge all shards into {(name, labels): value}."""
+        with self._lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    # The thread can no longer write, so its values move to the retired shard for good
+                    _merge(self._retired, shard)
+            self._shards = live
+            merged = {}
+            _merge(merged, self._retired)
+            for _, shard in live:
+                _merge(merged, shard.copy())
+        return merged
+
+    def absorb(self, samples: dict):
+        """Add samples recorded elsewhere (a build worker process) as if this process had recorded them."""
+        with self._lock:
+            _merge(self._retired, samples)
+
+    def render(self, shared: dict = None, shared_names: set = ()) -> str:
+        """shared: {(name, labels): value} served instead of this process's own samples of the shared_names metrics."""
+        values = self._collect()
+        if shared is not None:
+            values = {key: v for key, v in values.items() if key[0] not in shared_names}
+            values.update(shared)
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render(values))
+        return "\n".join(lines) + "\n"
+
+
+def _merge(target: dict, source: dict):
+    for key, value in source.items():
+        if isinstance(value, list):
+            existing = target.get(key)
+            if existing is None:
+                target[key] = list(value)
+            else:
+                for i, v in enumerate(value):
+                    existing[i] += v
+        else:
+            target[key] = target.get(key, 0) + value
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, registry: Registry, name: str, documentation: str, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return (self.name, tuple(str(labels.get(n, "")) for n in self.labelnames))
+
+    def _header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+    def _own(self, values: dict):
+        return sorted((labels, v) for (name, labels), v in values.items() if name == self.name)
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        shard = self.registry.shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def render(self, values: dict) -> list:
+        lines = self._header()
+        for labels, value in self._own(values):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        shard = self.registry.shard()
+        key = self._key(labels)
+        counts = shard.get(key)
+        if counts is None:
+            # one slot per bucket, then sum and count
+            counts = [0] * (len(self.buckets) + 2)
+            shard[key] = counts
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        counts[-2] += value
+        counts[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self, values: dict) -> list:
+        lines = self._header()
+        for labels, counts in self._own(values):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames, labels, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            inf_labels = _format_labels(self.labelnames, labels, 'le="+Inf"')
+            plain_labels = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_bucket{inf_labels} {counts[-1]}")
+            lines.append(f"{self.name}_sum{plain_labels} {_format_value(float(counts[-2]))}")
+            lines.append(f"{self.name}_count{plain_labels} {counts[-1]}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Last-value gauge. Values set from any thread; a callback may supply the value at scrape time."""
+    type_name = "gauge"
+
+    def __init__(self, registry, name, documentation, labelnames=(), callback=None):
+        super().__init__(registry, name, documentation, labelnames)
+        self._values = {}
+        self.callback = callback
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)[1]] = value
+
+    def render(self, values: dict) -> list:
+        lines = self._header()
+        # Gauges keep their own values; samples in values are shared ones (see Registry.render)
+        current = dict(self._own(values)) or dict(self._values)
+        if self.callback is not None:
+            try:
+                current[()] = self.callback()
+            except Exception:
+                pass
+        for labels, value in sorted(current.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+REGISTRY = Registry()
+
+BUILD_STAGE_SECONDS = Histogram(
+    REGISTRY, "mtem_build_stage_duration_seconds", "Duration of each exclusion build stage", ("stage",))
+BUILDS_TOTAL = Counter(
+    REGISTRY, "mtem_builds_total", "Exclusion builds by result", ("result",))
+UPSTREAM_REQUEST_SECONDS = Histogram(
+    REGISTRY, "mtem_upstream_request_duration_seconds", "Radarr/Sonarr request latency", ("service", "endpoint"))
+UPSTREAM_ERRORS_TOTAL = Counter(
+    REGISTRY, "mtem_upstream_errors_total", "Failed Radarr/Sonarr requests", ("service", "endpoint", "kind"))
+UPSTREAM_CONCURRENCY_LIMIT = Gauge(
+    REGISTRY, "mtem_upstream_concurrency_limit", "Current in-flight request limit per Radarr/Sonarr instance", ("service",))
+EXISTENCE_CHECK_SECONDS = Histogram(
+    REGISTRY, "mtem_existence_check_duration_seconds", "Cache existence checks during builds", (),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1))
+EXCLUSION_FILE_WRITES_TOTAL = Counter(
+    REGISTRY, "mtem_exclusion_file_writes_total", "Exclusion file writes")
+EXCLUSION_FILE_WRITTEN_BYTES_TOTAL = Counter(
+    REGISTRY, "mtem_exclusion_file_written_bytes_total", "Bytes written to the exclusion file")
+EXCLUSION_FILE_BYTES = Gauge(
+    REGISTRY, "mtem_exclusion_file_bytes", "Size of the last written exclusion file")
+EXCLUSION_FILE_ENTRIES = Gauge(
+    REGISTRY, "mtem_exclusion_file_entries", "Entries in the last written exclusion file")
+MOVER_LOG_PARSE_SECONDS = Histogram(
+    REGISTRY, "mtem_mover_log_parse_duration_seconds", "Time to parse the latest CA Mover run logs")
+WEBHOOK_QUEUE_DEPTH = Gauge(
+    REGISTRY, "mtem_webhook_queue_depth", "Webhook events waiting for the batch worker")
+WEBHOOK_EVENTS_TOTAL = Counter(
+    REGISTRY, "mtem_webhook_events_total", "Webhook events received", ("source", "result"))
+CACHE_INDEX_SCAN_SECONDS = Histogram(
+    REGISTRY, "mtem_cache_index_scan_duration_seconds", "Cache pool index scans", ("mode",))
+CACHE_INDEX_FILES = Gauge(
+    REGISTRY, "mtem_cache_index_files", "Files on the cache pool at the last index scan")
+CACHE_INDEX_BYTES = Gauge(
+    REGISTRY, "mtem_cache_index_bytes", "Bytes on the cache pool at the last index scan")
+ALERTS_TOTAL = Counter(
+    REGISTRY, "mtem_alerts_total", "Alerts raised", ("level", "source"))
+
+
+# Recorded only where builds run (the leader worker). They are published to
+# the coordination database after each build and every worker serves them
+# from there, so a scrape reports the same series whichever worker answers.
+BUILD_METRICS = (BUILD_STAGE_SECONDS, BUILDS_TOTAL, EXISTENCE_CHECK_SECONDS, EXCLUSION_FILE_WRITES_TOTAL,
+                 EXCLUSION_FILE_WRITTEN_BYTES_TOTAL, EXCLUSION_FILE_BYTES, EXCLUSION_FILE_ENTRIES)
+
+_published = {}
+_publish_lock = threading.Lock()
+
+
+def render_metrics() -> str:
+    try:
+        shared = load_build_metrics()
+    except Exception as e:
+        logger.warning(f"[METRICS] Could not read build metrics from the coordination database: {e}")
+        shared = None
+    return REGISTRY.render(shared, {m.name for m in BUILD_METRICS})
+
+
+def publish_build_metrics():
+    """Add the build metrics recorded since the last call to the shared totals, and replace the shared gauges."""
+    global _published
+    names = {m.name for m in BUILD_METRICS}
+    with _publish_lock:
+        delta, totals, gauges = export_samples(_published, names)
+        with coordination_db() as db:
+            for (name, labels), change in delta.items():
+                row = db.execute("SELECT value FROM shared_metrics WHERE name = ? AND labels = ?",
+                                 (name, json.dumps(labels))).fetchone()
+                value = change
+                if row is not None:
+                    before = json.loads(row[0])
+                    value = [b + c for b, c in zip(before, change)] if isinstance(change, list) else before + change
+                db.execute("INSERT OR REPLACE INTO shared_metrics (name, labels, value) VALUES (?, ?, ?)",
+                           (name, json.dumps(labels), json.dumps(value)))
+            for name, values in gauges.items():
+                for labels, value in values.items():
+                    db.execute("INSERT OR REPLACE INTO shared_metrics (name, labels, value) VALUES (?, ?, ?)",
+                               (name, json.dumps(list(labels)), json.dumps(value)))
+        _published = totals
+
+
+def load_build_metrics() -> dict:
+    with coordination_db() as db:
+        rows = db.execute("SELECT name, labels, value FROM shared_metrics").fetchall()
+    return {(name, tuple(json.loads(labels))): json.loads(value) for name, labels, value in rows}
+
+
+def export_samples(previous: dict, names: set = None) -> tuple:
+    """
+    For a worker process: (delta, totals, gauges). delta holds the
+    counter/histogram samples recorded since previous (the totals returned
+    by the last call), gauges the current gauge values; names limits all
+    three to those metrics.
+    """
+    totals = REGISTRY._collect()
+    if names is not None:
+        totals = {key: v for key, v in totals.items() if key[0] in names}
+    delta = {}
+    for key, value in totals.items():
+        before = previous.get(key)
+        if isinstance(value, list):
+            change = value if before is None else [v - b for v, b in zip(value, before)]
+            if any(change):
+                delta[key] = change
+        elif value != (before or 0):
+            delta[key] = value - (before or 0)
+    gauges = {m.name: dict(m._values) for m in REGISTRY._metrics
+              if isinstance(m, Gauge) and m._values and (names is None or m.name in names)}
+    return delta, totals, gauges
+
+
+def import_samples(delta: dict, gauges: dict):
+    """Fold what export_samples returned in a worker process into this process's metrics."""
+    REGISTRY.absorb(delta)
+    for metric in REGISTRY._metrics:
+        if isinstance(metric, Gauge) and metric.name in gauges:
+            metric._values.update(gauges[metric.name])
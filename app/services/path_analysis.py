@@ -0,0 +1,217 @@
+"""
+Path-mapping analysis for the settings page: streams every candidate path
+of each source through a prefix trie to find its dominant root prefixes,
+checks a sample of mapped paths against the cache mount, lists the paths
+no mapping rewrites and suggests a mapping found through the cache index.
+"""
+import logging
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
+from app.core.config import arr_service, arr_sources, get_user_settings
+from app.services.cache_index import get_cache_index
+from app.services.plexcache import get_plexcache_reader
+from app.services.radarr import get_radarr_client
+from app.services.sonarr import get_sonarr_client
+
+logger = logging.getLogger(__name__)
+
+# Directory levels kept in the trie; deeper levels are per-title folders
+MAX_DEPTH = 6
+# Root branches holding less than this share of a source's paths are not reported
+MIN_BRANCH_SHARE = 0.01
+# A branch's prefix is extended while one child directory holds this share of it
+DOMINANT_SHARE = 0.9
+# Mapped paths checked on disk per source
+SAMPLE_SIZE = 200
+UNMATCHED_LIMIT = 100
+
+
+class _Node:
+    __slots__ = ("count", "children")
+
+    def __init__(self):
+        self.count = 0
+        self.children = {}
+
+
+class PrefixTrie:
+    """Counts of paths per leading directory, up to MAX_DEPTH levels. The last segment (file or title folder) is not kept."""
+
+    def __init__(self, max_depth: int = MAX_DEPTH):
+        self.max_depth = max_depth
+        self.root = _Node()
+
+    def add(self, path: str):
+        node = self.root
+        node.count += 1
+        for segment in path.strip("/").split("/")[:-1][:self.max_depth]:
+            child = node.children.get(segment)
+            if child is None:
+                child = node.children[segment] = _Node()
+            child.count += 1
+            node = child
+
+    def dominant_prefixes(self) -> List[dict]:
+        """
+        One prefix per top-level directory with enough paths under it,
+        extended for as long as a single subdirectory holds most of them:
+        /data/media/movies/ rather than /data/.
+        """
+        total = self.root.count
+        results = []
+        for name, branch in self.root.children.items():
+            if branch.count < total * MIN_BRANCH_SHARE:
+                continue
+            segments = [name]
+            node = branch
+            while node.children:
+                top_name, top = max(node.children.items(), key=lambda kv: kv[1].count)
+                if top.count < node.count * DOMINANT_SHARE:
+                    break
+                segments.append(top_name)
+                node = top
+            results.append({"prefix": "/" + "/".join(segments) + "/", "count": branch.count,
+                            "share": round(branch.count / total, 3)})
+        return sorted(results, key=lambda r: r["count"], reverse=True)
+
+
+class _Sample:
+    """Uniform sample of up to size items from a stream of unknown length (reservoir sampling)."""
+
+    def __init__(self, size: int, seed: int = 0):
+        self.size = size
+        self.items = []
+        self.seen = 0
+        self._rng = random.Random(seed)
+
+    def offer(self, item):
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+        else:
+            i = self._rng.randrange(self.seen)
+            if i < self.size:
+                self.items[i] = item
+
+
+class PathMappingAnalyzer:
+    def _iter_candidates(self, source: str, settings) -> Iterator[str]:
+        """
+        Paths a build could write for the source: tagged items when the
+        instance has exclude tags, every item otherwise (so mappings can be
+        set up before tagging). Sonarr contributes series folders, which
+        share the episode files' prefix without one request per series.
+        """
+        if source == "plexcache":
+            yield from get_plexcache_reader().read(settings)
+            return
+        service = arr_service(source)
+        tag_ids = set(arr_sources(settings, service)[source].exclude_tag_ids)
+        if service == "radarr":
+            for m in get_radarr_client(source).iter_movies():
+                path = m.file_path or m.path
+                if path and (not tag_ids or tag_ids.intersection(m.tags)):
+                    yield path
+        else:
+            for s in get_sonarr_client(source).iter_series():
+                if s.path and (not tag_ids or tag_ids.intersection(s.tags)):
+                    yield s.path
+
+    def _resolve_rate(self, paths: List[str], mapping, settings) -> Optional[float]:
+        from app.services.exclusions import get_exclusion_manager
+        manager = get_exclusion_manager()
+        if not paths:
+            return None
+        hits = sum(os.path.exists(manager._to_container_path(mapping.to_prefix + p[len(mapping.from_prefix):], settings))
+                   for p in paths)
+        return round(hits / len(paths), 3)
+
+    def _suggest(self, prefixes: List[dict], sample: List[str], settings) -> Optional[dict]:
+        """
+        Try cutting the dominant prefix after each of its directories and
+        look in the cache index for a directory that holds the rest of the
+        sampled paths; the shortest cut with the most hits wins.
+        """
+        index = get_cache_index()
+        try:
+            index.ensure_fresh(settings)
+        except Exception as e:
+            logger.warning(f"[PATHS] Cache index unavailable for mapping suggestions: {e}")
+            return None
+        if not prefixes or not sample or not index.dirs:
+            return None
+        dirs = index.dirs
+        segments = prefixes[0]["prefix"].strip("/").split("/")
+        host = settings.exclusions.host_cache_path.rstrip("/")
+        best = None
+        for k in range(1, len(segments) + 1):
+            from_prefix = "/" + "/".join(segments[:k]) + "/"
+            rests = [p[len(from_prefix):].rstrip("/") for p in sample if p.startswith(from_prefix)]
+            if not rests:
+                continue
+            first = rests[0].split("/")[0]
+            # Directories of the cache with the first remaining directory under them
+            bases = [rel for rel in dirs if f"{rel}/{first}" in dirs]
+            for base in bases:
+                hits = sum(1 for rest in rests if index.size_of(f"{index.root}{base}/{rest}") is not None)
+                if best is None or hits > best[0]:
+                    best = (hits, from_prefix, f"{host}{base}/", len(rests))
+        if best is None or best[0] == 0:
+            return None
+        hits, from_prefix, to_prefix, checked = best
+        return {"from_prefix": from_prefix, "to_prefix": to_prefix, "hit_rate": round(hits / checked, 3)}
+
+    def _analyze_source(self, source: str, mapping, settings) -> dict:
+        trie = PrefixTrie()
+        matched = _Sample(SAMPLE_SIZE)
+        every = _Sample(SAMPLE_SIZE)
+        unmatched = []
+        unmatched_count = 0
+        for p in self._iter_candidates(source, settings):
+            trie.add(p)
+            every.offer(p)
+            if mapping.from_prefix and p.startswith(mapping.from_prefix):
+                matched.offer(p)
+            else:
+                unmatched_count += 1
+                if len(unmatched) < UNMATCHED_LIMIT:
+                    unmatched.append(p)
+        prefixes = trie.dominant_prefixes()
+        return {
+            "candidates": trie.root.count,
+            "prefixes": prefixes,
+            "mapping": {"from_prefix": mapping.from_prefix, "to_prefix": mapping.to_prefix},
+            "matched": matched.seen,
+            "checked": len(matched.items),
+            "hit_rate": self._resolve_rate(matched.items, mapping, settings),
+            "unmatched_count": unmatched_count,
+            "unmatched": unmatched,
+            "suggestion": self._suggest(prefixes, every.items, settings),
+        }
+
+    def analyze(self, settings=None, only: str = None) -> dict:
+        """Analysis per source (every Radarr/Sonarr instance and PlexCache), or only those of one service."""
+        from app.services.exclusions import get_exclusion_manager
+        settings = settings or get_user_settings()
+        mappings = get_exclusion_manager()._source_mappings(settings)
+        if only:
+            mappings = {name: m for name, m in mappings.items() if arr_service(name) == only or name == only}
+        with ThreadPoolExecutor(max_workers=max(1, len(mappings)), thread_name_prefix="path-analysis") as pool:
+            futures = {name: pool.submit(self._analyze_source, name, m, settings) for name, m in mappings.items()}
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logger.error(f"[PATHS] Analysis of {name} failed: {e}")
+                results[name] = {"error": str(e)}
+        return results
+
+
+_analyzer = PathMappingAnalyzer()
+
+
+def get_path_analyzer() -> PathMappingAnalyzer:
+    return _analyzer
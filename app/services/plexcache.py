@@ -0,0 +1,106 @@
+"""
+Cached view of the PlexCache-D exclusion export. The file is only re-read
+when its identity (inode, mtime, size) changes.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from typing import FrozenSet, Optional
+from app.core.config import get_user_settings
+from app.services.snapshots import format_age
+
+logger = logging.getLogger(__name__)
+
+# PlexCache-D rewrites its export on every run; older than this and it has probably stopped running
+STALE_AFTER_SECONDS = 24 * 3600
+
+
+class PlexCacheReader:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self._paths: FrozenSet[str] = frozenset()
+        self._mtime = None
+        self._size = 0
+        self.error = None
+
+    def _identity(self, path: str) -> Optional[tuple]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (path, st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _parse(self, path: str):
+        """Stream the file line by line straight into the frozenset, so only one copy exists; the previous set is released first."""
+        self._paths = frozenset()
+
+        def entries(f):
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield sys.intern(line)
+
+        with open(path, "r") as f:
+            self._paths = frozenset(entries(f))
+
+    def _refresh(self, settings=None):
+        settings = settings or get_user_settings()
+        path = settings.exclusions.plexcache_file_path
+        key = self._identity(path) if path else None
+        if key == self._key:
+            return
+        if key is None:
+            self._paths, self._mtime, self._size = frozenset(), None, 0
+            self._key = None
+            self.error = None
+            return
+        start = time.perf_counter()
+        try:
+            self._parse(path)
+            self.error = None
+        except Exception as e:
+            # Leave the key unset so the next call retries
+            logger.error(f"[PLEXCACHE] Error reading PlexCache file {path}: {e}")
+            self._paths, self._key, self._mtime, self._size = frozenset(), None, None, 0
+            self.error = str(e)
+            raise
+        self._key = key
+        self._mtime = key[2] / 1e9
+        self._size = key[3]
+        logger.info(f"[PLEXCACHE] Loaded {len(self._paths)} paths from {path} in {time.perf_counter() - start:.2f}s")
+
+    def read(self, settings=None) -> FrozenSet[str]:
+        """Normalised paths from the export (empty if the file is missing). Raises if it cannot be read."""
+        with self._lock:
+            self._refresh(settings)
+            return self._paths
+
+    def info(self, settings=None) -> dict:
+        settings = settings or get_user_settings()
+        path = settings.exclusions.plexcache_file_path
+        with self._lock:
+            try:
+                self._refresh(settings)
+            except Exception:
+                pass
+            age = time.time() - self._mtime if self._mtime is not None else None
+            return {
+                "path": path,
+                "exists": bool(path) and os.path.exists(path),
+                "entries": len(self._paths),
+                "size_bytes": self._size,
+                "age_seconds": int(age) if age is not None else None,
+                "age": format_age(age) if age is not None else None,
+                "stale": age is not None and age > STALE_AFTER_SECONDS,
+                "error": self.error,
+            }
+
+
+_reader = PlexCacheReader()
+
+
+def get_plexcache_reader() -> PlexCacheReader:
+    return _reader
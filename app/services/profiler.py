@@ -0,0 +1,166 @@
+"""
+On-demand cProfile + tracemalloc runs of exclusion builds and page renders,
+used by the debug router. The last few reports are kept under /config/profiles.
+"""
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from typing import List, Optional
+from app.core.config import CONFIG_DIR
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.path.join(CONFIG_DIR, "profiles")
+MAX_REPORTS = 5
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+
+# tracemalloc is process-wide, so only one profile may run at a time
+_profile_lock = threading.Lock()
+
+
+class ProfilerBusyError(Exception):
+    pass
+
+
+async def render_page(path: str) -> tuple:
+    """Drive the ASGI app in-process for a GET of path; returns (status, body bytes)."""
+    from app.main import app
+    raw_path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": raw_path,
+        "raw_path": raw_path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 0),
+        "server": ("localhost", 80),
+    }
+    response = {"status": 0, "body": []}
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.sleep(3600)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["body"].append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return response["status"], b"".join(response["body"])
+
+
+def _safe_label(label: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", label).strip("_") or "profile"
+
+
+def _prune_reports():
+    reports = list_reports()
+    for report in reports[MAX_REPORTS:]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, report["name"]))
+        except OSError as e:
+            logger.warning(f"[PROFILE] Could not remove old report {report['name']}: {e}")
+
+
+def list_reports() -> List[dict]:
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    reports = []
+    for entry in os.scandir(PROFILE_DIR):
+        if entry.is_file() and entry.name.endswith(".txt"):
+            st = entry.stat()
+            reports.append({
+                "name": entry.name,
+                "size_bytes": st.st_size,
+                "created": datetime.fromtimestamp(st.st_mtime).strftime("%Y-%m-%d %H:%M:%S"),
+                "mtime": st.st_mtime,
+            })
+    return sorted(reports, key=lambda r: r["mtime"], reverse=True)
+
+
+def get_report_path(name: str) -> Optional[str]:
+    """Resolve a report name from list_reports(); anything else returns None."""
+    if name in {r["name"] for r in list_reports()}:
+        return os.path.join(PROFILE_DIR, name)
+    return None
+
+
+def profile_call(label: str, fn) -> tuple:
+    """
+    Run fn() under cProfile and tracemalloc. Returns (report_text, report_name).
+    Raises ProfilerBusyError if another profile is already running.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already running")
+    try:
+        profiler = cProfile.Profile()
+        tracemalloc.start(10)
+        outcome = "ok"
+        start = time.perf_counter()
+        try:
+            result = profiler.runcall(fn)
+            if result is not None:
+                outcome = f"ok — {result!r}"[:500]
+        except Exception as e:
+            outcome = f"error — {e!r}"
+            logger.warning(f"[PROFILE] Profiled call {label!r} raised: {e}")
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+    finally:
+        _profile_lock.release()
+
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+
+    out = io.StringIO()
+    now = datetime.now()
+    out.write(f"MTEM profile — {label} — {now.strftime('%Y-%m-%d %H:%M:%S')}\n")
+    out.write(f"Wall time: {elapsed:.3f}s   Peak traced memory: {peak / (1024 ** 2):.1f} MiB\n")
+    out.write(f"Result: {outcome}\n\n")
+
+    out.write(f"== Hotspots by cumulative time (top {TOP_FUNCTIONS}) ==\n")
+    pstats.Stats(profiler, stream=out).strip_dirs().sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+    out.write(f"== Hotspots by own time (top {TOP_FUNCTIONS}) ==\n")
+    pstats.Stats(profiler, stream=out).strip_dirs().sort_stats("tottime").print_stats(TOP_FUNCTIONS)
+
+    out.write(f"== Top allocation sites still held at the end (top {TOP_ALLOCATIONS}) ==\n")
+    for i, stat in enumerate(snapshot.statistics("lineno")[:TOP_ALLOCATIONS], 1):
+        frame = stat.traceback[0]
+        out.write(f"{i:3d}. {frame.filename}:{frame.lineno}  {stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+
+    report = out.getvalue()
+    name = f"{now.strftime('%Y%m%d-%H%M%S')}-{_safe_label(label)}.txt"
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        with open(os.path.join(PROFILE_DIR, name), "w") as f:
+            f.write(report)
+        _prune_reports()
+    except OSError as e:
+        logger.error(f"[PROFILE] Failed to save report {name}: {e}")
+    logger.info(f"[PROFILE] {label} profiled in {elapsed:.2f}s (peak {peak / (1024 ** 2):.1f} MiB) -> {name}")
+    return report, name
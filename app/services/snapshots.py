@@ -0,0 +1,76 @@
+"""
+Last-known-good snapshots of each source's candidate paths, used by the
+exclusion builder when an upstream is unavailable.
+"""
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Iterable, Optional
+from app.core.config import CONFIG_DIR
+from app.core.coordination import write_json
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = os.path.join(CONFIG_DIR, "snapshots")
+
+
+def format_age(seconds: float) -> str:
+    seconds = int(max(0, seconds))
+    if seconds < 3600:
+        return f"{seconds // 60}m"
+    if seconds < 86400:
+        return f"{seconds // 3600}h {seconds % 3600 // 60}m"
+    return f"{seconds // 86400}d {seconds % 86400 // 3600}h"
+
+
+def format_bytes(num: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if num < 1024:
+            return f"{num:.0f} {unit}" if unit == "B" else f"{num:.2f} {unit}"
+        num /= 1024
+    return f"{num:.2f} TB"
+
+
+class SnapshotStore:
+    def __init__(self, directory: str = SNAPSHOT_DIR):
+        self.directory = directory
+
+    def _path(self, source: str) -> str:
+        return os.path.join(self.directory, f"{source}.json")
+
+    def save(self, source: str, paths: Iterable[str], **meta):
+        data = {
+            "source": source,
+            "saved_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "saved_ts": time.time(),
+            "paths": sorted(paths),
+        }
+        data.update(meta)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            write_json(self._path(source), data)
+            logger.debug(f"[SNAPSHOT] Saved {len(data['paths'])} paths for {source}")
+        except Exception as e:
+            logger.error(f"[SNAPSHOT] Failed to save snapshot for {source}: {e}")
+
+    def load(self, source: str) -> Optional[dict]:
+        path = self._path(source)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+            data["age_seconds"] = time.time() - data.get("saved_ts", 0)
+            return data
+        except Exception as e:
+            logger.error(f"[SNAPSHOT] Failed to load snapshot for {source}: {e}")
+            return None
+
+
+_store = SnapshotStore()
+
+
+def get_snapshot_store() -> SnapshotStore:
+    return _store
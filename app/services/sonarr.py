@@ -1,14 +1,22 @@
 import requests
 import logging
-from app.core.config import get_user_settings
+from app.core.config import ArrInstance, arr_sources, get_user_settings
+from app.services.arr_models import EpisodeFile, Series, StreamedList, conditional_headers, decode_records
+from app.services.upstream import get_governor, upstream_get
 
 logger = logging.getLogger(__name__)
 
 class SonarrClient:
-    def __init__(self):
+    def __init__(self, source: str = "sonarr"):
         self.settings = get_user_settings()
-        self.url = self.settings.sonarr.url.rstrip('/')
-        self.api_key = self.settings.sonarr.api_key
+        # "sonarr" is the main connection; additional instances are "sonarr-<name>"
+        self.source = source
+        instance = arr_sources(self.settings, "sonarr").get(source) or ArrInstance()
+        self.url = instance.url.rstrip('/')
+        self.api_key = instance.api_key
+        self.max_concurrency = instance.max_concurrency
+        # A settings change reaches the instance's governor with the next client
+        get_governor(source, self.max_concurrency)
 
     def _get_headers(self):
         return {'X-Api-Key': self.api_key}
@@ -19,31 +27,40 @@ class SonarrClient:
             return requests.get(f"{self.url}/api/v3/system/status", headers=self._get_headers(), timeout=5).status_code == 200
         except: return False
 
+    def iter_series(self, previous=None):
+        """
+        Stream series from Sonarr as compact Series records. previous is the
+        validators() dict of an earlier fetch, sent as conditional headers.
+        """
+        if not self.url or not self.api_key: return StreamedList()
+        headers = {**self._get_headers(), **conditional_headers(previous)}
+        response = upstream_get(self.source, f"{self.url}/api/v3/series", headers, timeout=60, stream=True)
+        return StreamedList(response, Series.from_api)
+
     def get_all_series(self):
         """Get all series from Sonarr"""
-        if not self.url or not self.api_key: return []
-        response = requests.get(f"{self.url}/api/v3/series", headers=self._get_headers(), timeout=60)
-        response.raise_for_status()
-        return response.json()
+        return list(self.iter_series())
 
-    def get_episode_files(self, series_id):
-        """Returns actual files on disk for a series"""
+    def fetch_episode_files(self, series_id):
+        """Returns actual files on disk for a series; raises on failure"""
         if not self.url or not self.api_key: return []
-        try:
-            response = requests.get(f"{self.url}/api/v3/episodefile?seriesId={series_id}", headers=self._get_headers(), timeout=60)
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            logger.error(f"Failed to fetch episodes for series {series_id}: {e}")
-            return []
+        response = upstream_get(self.source, f"{self.url}/api/v3/episodefile?seriesId={series_id}", self._get_headers(), timeout=60, stream=True)
+        return list(decode_records(response, EpisodeFile.from_api))
+
+    def latest_history_marker(self):
+        """Id and date of the newest history record (grab, import, rename, delete...); None if not configured. Raises on failure."""
+        if not self.url or not self.api_key: return None
+        response = upstream_get(self.source, f"{self.url}/api/v3/history?page=1&pageSize=1&sortKey=date&sortDirection=descending",
+                                self._get_headers(), timeout=10)
+        records = response.json().get("records") or []
+        return f"{records[0].get('id')}@{records[0].get('date')}" if records else ""
 
     def get_all_tags(self):
         if not self.url or not self.api_key: return []
         try:
-            response = requests.get(f"{self.url}/api/v3/tag", headers=self._get_headers(), timeout=10)
-            response.raise_for_status()
+            response = upstream_get(self.source, f"{self.url}/api/v3/tag", self._get_headers(), timeout=10)
             return response.json()
         except: return []
 
-def get_sonarr_client():
-    return SonarrClient()
+def get_sonarr_client(source: str = "sonarr"):
+    return SonarrClient(source)
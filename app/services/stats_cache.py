@@ -1,8 +1,11 @@
 """
-Simple stats from the exclusion file
+Simple stats from the exclusion file. Counts follow the file itself (its
+identity and mtime), so every worker shows the same numbers.
 """
 import logging
 import os
+from app.core.config import CONFIG_DIR
+from app.core.coordination import file_identity
 
 logger = logging.getLogger(__name__)
 
@@ -12,41 +15,50 @@ class StatsCache:
         self.tv_count = 0
         self.total_count = 0
         self.last_update = None
+        self._identity = None
     
     def refresh_from_file(self):
-        """Read exclusion file and count movies vs TV"""
+        """Read exclusion file and count movies vs TV (skipped while the file is unchanged)"""
         movie_count = 0
         tv_count = 0
         total_count = 0
         
-        exclusions_file = "/config/mover_exclusions.txt"
-        if os.path.exists(exclusions_file):
-            try:
-                with open(exclusions_file, 'r') as f:
-                    for line in f:
-                        line = line.strip()
-                        if not line:
-                            continue
-                        
-                        total_count += 1
-                        
-                        # Count based on path patterns
-                        line_lower = line.lower()
-                        if '/movies/' in line_lower or '/movie/' in line_lower:
-                            movie_count += 1
-                        elif '/tv/' in line_lower or '/shows/' in line_lower or '/series/' in line_lower:
-                            tv_count += 1
-                
-                self.movie_count = movie_count
-                self.tv_count = tv_count
-                self.total_count = total_count
-                
-                import datetime
-                self.last_update = datetime.datetime.now()
-                
-                logger.info(f"Stats updated: {movie_count} movies, {tv_count} TV, {total_count} total exclusions")
-            except Exception as e:
-                logger.error(f"Error reading exclusion file: {e}")
+        exclusions_file = os.path.join(CONFIG_DIR, "mover_exclusions.txt")
+        identity = file_identity(exclusions_file)
+        if identity is None:
+            # The file is gone (e.g. a build cleared it): nothing is excluded any more
+            self.movie_count = self.tv_count = self.total_count = 0
+            self._identity = None
+            return
+        if identity == self._identity:
+            return
+        try:
+            with open(exclusions_file, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    
+                    total_count += 1
+                    
+                    # Count based on path patterns
+                    line_lower = line.lower()
+                    if '/movies/' in line_lower or '/movie/' in line_lower:
+                        movie_count += 1
+                    elif '/tv/' in line_lower or '/shows/' in line_lower or '/series/' in line_lower:
+                        tv_count += 1
+            
+            self.movie_count = movie_count
+            self.tv_count = tv_count
+            self.total_count = total_count
+            
+            import datetime
+            self.last_update = datetime.datetime.fromtimestamp(identity[1] / 1e9)
+            self._identity = identity
+            
+            logger.info(f"Stats updated: {movie_count} movies, {tv_count} TV, {total_count} total exclusions")
+        except Exception as e:
+            logger.error(f"Error reading exclusion file: {e}")
     
     def get_counts(self):
         """Get current counts"""
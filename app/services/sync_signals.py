@@ -0,0 +1,121 @@
+"""
+Cheap change signals for the adaptive sync: the newest history record of
+each Radarr/Sonarr instance, the PlexCache export's identity, the latest
+mover run and the settings a build depends on. If none of them moved since
+the last build, a new build would write the same file, so the run is skipped
+and the interval backs off; after activity it drops back to the minimum.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from app.core.config import ARR_SERVICES, arr_sources, get_user_settings
+from app.core.coordination import file_identity
+from app.services.ca_mover import get_mover_parser
+from app.services.radarr import get_radarr_client
+from app.services.sonarr import get_sonarr_client
+
+logger = logging.getLogger(__name__)
+
+# A signal that could not be read; never equal to a previous value
+UNKNOWN = object()
+
+# Exclusion settings that do not change what a build writes
+_NOT_BUILD_INPUTS = {
+    "full_sync_cron", "log_monitor_cron",
+    "adaptive_sync_enabled", "adaptive_min_interval_minutes", "adaptive_max_interval_minutes",
+    "movie_base_path", "tv_base_path", "build_in_worker_process",
+}
+
+
+def _settings_fingerprint(settings) -> str:
+    inputs = settings.exclusions.model_dump(exclude=_NOT_BUILD_INPUTS)
+    inputs["radarr_url"] = settings.radarr.url
+    inputs["sonarr_url"] = settings.sonarr.url
+    inputs["instances"] = [instance.model_dump(exclude={"api_key"})
+                           for instance in settings.radarr_instances + settings.sonarr_instances]
+    return hashlib.sha1(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+class AdaptiveSync:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.baseline = None
+        self.last_build = None
+        self.interval_minutes = None
+        self.stats_run = None
+
+    def _mover_run(self):
+        run = get_mover_parser()._get_latest_files()
+        return (run["timestamp"], run["mtime"]) if run else None
+
+    def collect(self, settings) -> dict:
+        signals = {"settings": _settings_fingerprint(settings)}
+        factories = {"radarr": get_radarr_client, "sonarr": get_sonarr_client}
+        clients = [(name, factories[service](name)) for service in ARR_SERVICES for name in arr_sources(settings, service)]
+        for name, client in clients:
+            try:
+                signals[name] = client.latest_history_marker()
+            except Exception as e:
+                logger.warning(f"[ADAPTIVE] Could not read {name} history, will build to be safe: {e}")
+                signals[name] = UNKNOWN
+        signals["plexcache"] = file_identity(settings.exclusions.plexcache_file_path)
+        signals["mover_run"] = self._mover_run()
+        return signals
+
+    def check(self, settings=None) -> tuple:
+        """
+        Returns (signals, reasons): reasons is empty when the sync can be
+        skipped, else names the signals that moved (or why it runs anyway).
+        """
+        settings = settings or get_user_settings()
+        signals = self.collect(settings)
+        with self._lock:
+            if self.baseline is None:
+                return signals, ["first run"]
+            reasons = [name for name, value in signals.items()
+                       if value is UNKNOWN or value != self.baseline.get(name)]
+            # Tag edits leave no history record; never go longer than the max interval without a build
+            max_age = settings.exclusions.adaptive_max_interval_minutes * 60
+            if not reasons and time.monotonic() - self.last_build >= max_age:
+                reasons = ["max interval reached"]
+            return signals, reasons
+
+    def built(self, signals: dict, reasons: list, settings=None) -> int:
+        """Record a successful build; returns the next interval in minutes."""
+        settings = settings or get_user_settings()
+        ex = settings.exclusions
+        with self._lock:
+            self.baseline = signals
+            self.last_build = time.monotonic()
+            activity = any(r in signals and signals[r] is not UNKNOWN for r in reasons)
+            if activity or self.interval_minutes is None:
+                self.interval_minutes = ex.adaptive_min_interval_minutes
+            return self.interval_minutes
+
+    def skipped(self, settings=None) -> int:
+        """Record a skipped run; returns the next, doubled, interval in minutes."""
+        settings = settings or get_user_settings()
+        ex = settings.exclusions
+        with self._lock:
+            current = self.interval_minutes or ex.adaptive_min_interval_minutes
+            self.interval_minutes = max(ex.adaptive_min_interval_minutes,
+                                        min(current * 2, ex.adaptive_max_interval_minutes))
+            return self.interval_minutes
+
+    def new_mover_run(self) -> bool:
+        """Whether a mover run appeared since the stats task last asked (the first call always says yes)."""
+        run = self._mover_run()
+        with self._lock:
+            if self.stats_run is not None and run == self.stats_run:
+                return False
+            self.stats_run = run
+            return True
+
+
+_adaptive = AdaptiveSync()
+
+
+def get_adaptive_sync() -> AdaptiveSync:
+    return _adaptive
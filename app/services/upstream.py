@@ -0,0 +1,316 @@
+"""
+Shared HTTP plumbing for Radarr/Sonarr calls: a pooled session, a circuit
+breaker and a concurrency governor per upstream instance, so a dead service
+fails fast instead of waiting out every timeout and a busy one is not
+flooded, plus request latency/error metrics.
+"""
+import logging
+import threading
+import time
+import weakref
+from typing import Callable
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from app.services.metrics import UPSTREAM_CONCURRENCY_LIMIT, UPSTREAM_ERRORS_TOTAL, UPSTREAM_REQUEST_SECONDS
+
+logger = logging.getLogger(__name__)
+
+FAILURE_THRESHOLD = 3
+RESET_AFTER_SECONDS = 60
+CONNECT_TIMEOUT = 5
+# Keep-alive connections per upstream instance
+POOL_SIZE = 16
+# Governor: in-flight request limit when no instance setting applies
+DEFAULT_MAX_CONCURRENCY = 4
+# Latency is tracked per endpoint as a recent average and a baseline learned
+# only from requests that ran alone (exponentially weighted, these are the
+# weights of a new sample); the endpoint counts as slow while the recent
+# average is SLOW_FACTOR times the baseline and SLOW_MARGIN_SECONDS above it
+RECENT_GAIN = 0.1
+BASELINE_GAIN = 0.1
+SLOW_FACTOR = 2.0
+SLOW_MARGIN_SECONDS = 0.05
+# Responses averaged into a new baseline before the endpoint can count as slow
+BASELINE_WARMUP = 5
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of making a request while an upstream's circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    closed -> open after FAILURE_THRESHOLD consecutive failures. While open,
+    calls fail immediately; after RESET_AFTER_SECONDS a single trial call is
+    let through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "closed":
+                return
+            elapsed = time.monotonic() - self.opened_at
+            if self.state == "open" and elapsed >= RESET_AFTER_SECONDS:
+                self.state = "half_open"
+                logger.info(f"[UPSTREAM] {self.name} circuit half-open — allowing a trial request")
+                return
+            raise CircuitOpenError(
+                f"{self.name} circuit open after {self.failures} failures "
+                f"(retry in {max(0, int(RESET_AFTER_SECONDS - elapsed))}s): {self.last_error}"
+            )
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info(f"[UPSTREAM] {self.name} circuit closed — upstream recovered")
+            self.state = "closed"
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self, error: Exception):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)
+            if self.state == "half_open" or self.failures >= FAILURE_THRESHOLD:
+                if self.state != "open":
+                    logger.warning(f"[UPSTREAM] {self.name} circuit OPEN after {self.failures} failures: {error}")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "failures": self.failures, "last_error": self.last_error}
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def get_breaker_states() -> dict:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.snapshot() for b in breakers}
+
+
+class ConcurrencyGovernor:
+    """
+    AIMD limit on in-flight requests to one upstream instance. The limit
+    starts at 1 and grows by about one per round of fast, successful
+    responses up to max_limit; an error, or recent responses much slower
+    than the endpoint answers when requested alone, halves it. Only
+    requests started after the last decrease can decrease it again, so one
+    burst of slow responses counts once.
+
+    Latency is the time to response headers, so body size and how fast the
+    caller reads a streamed list do not count. Averages are kept per
+    endpoint and response size class, so a large list is not judged
+    against a small one, and smoothed, so one outlier among noisy but
+    healthy responses does not count as overload.
+    """
+
+    def __init__(self, name: str, max_limit: int = DEFAULT_MAX_CONCURRENCY):
+        self.name = name
+        self.max_limit = max(1, max_limit)
+        self.limit = 1.0
+        self.in_flight = 0
+        self._cond = threading.Condition()
+        # key -> [recent average, baseline, samples]
+        self._baselines = {}
+        self._decreased_at = 0.0
+        self.decreases = 0
+
+    def acquire(self) -> float:
+        """Wait for a free slot; returns the start time to hand to record()."""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+            return time.monotonic()
+
+    def _is_slow(self, key: str, latency: float) -> bool:
+        """Fold the latency into the key's averages; True while the recent one is well above the baseline."""
+        averages = self._baselines.get(key)
+        if averages is None:
+            self._baselines[key] = [latency, latency, 1]
+            return False
+        recent, baseline, samples = averages
+        recent += (latency - recent) * RECENT_GAIN
+        # Latency under concurrency includes queueing this governor caused;
+        # learning it would let the baseline ratchet up with the limit. A
+        # request at a limit of 1 ran alone and shows the upstream's own
+        # latency, including a real slowdown (which drives the limit to 1).
+        if samples < BASELINE_WARMUP:
+            # The mean of the first responses, so one fast outlier does not set it
+            baseline += (latency - baseline) / (samples + 1)
+        elif int(self.limit) == 1 and self.in_flight == 1:
+            baseline += (latency - baseline) * BASELINE_GAIN
+        self._baselines[key] = [recent, baseline, samples + 1]
+        return samples >= BASELINE_WARMUP and recent > max(baseline * SLOW_FACTOR, baseline + SLOW_MARGIN_SECONDS)
+
+    def record(self, key: str, started: float, ok: bool, latency: float = None):
+        """Adjust the limit for one response: latency is its time to headers (None when there was no response)."""
+        with self._cond:
+            slow = ok and latency is not None and self._is_slow(key, latency)
+            if not ok or slow:
+                if started >= self._decreased_at and self.limit > 1:
+                    self.limit = max(1.0, self.limit / 2)
+                    self._decreased_at = time.monotonic()
+                    self.decreases += 1
+                    logger.info(f"[UPSTREAM] {self.name} concurrency down to {int(self.limit)} "
+                                f"({'error' if not ok else f'{key} averaging {self._baselines[key][0]:.2f}s'})")
+            elif self.limit < self.max_limit:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            UPSTREAM_CONCURRENCY_LIMIT.set(int(self.limit), service=self.name)
+            self._cond.notify_all()
+
+    def release(self):
+        """Free the slot taken by acquire()."""
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {"limit": int(self.limit), "max_limit": self.max_limit,
+                    "in_flight": self.in_flight, "decreases": self.decreases}
+
+
+_governors = {}
+_governors_lock = threading.Lock()
+
+
+def get_governor(name: str, max_limit: int = None) -> ConcurrencyGovernor:
+    """The instance's governor; clients pass max_limit from settings so changes apply to the next requests."""
+    with _governors_lock:
+        if name not in _governors:
+            _governors[name] = ConcurrencyGovernor(name, max_limit or DEFAULT_MAX_CONCURRENCY)
+        governor = _governors[name]
+    if max_limit and max_limit != governor.max_limit:
+        with governor._cond:
+            governor.max_limit = max(1, max_limit)
+            governor.limit = min(governor.limit, float(governor.max_limit))
+            governor._cond.notify_all()
+    return governor
+
+
+def get_governor_states() -> dict:
+    with _governors_lock:
+        governors = list(_governors.values())
+    return {g.name: g.snapshot() for g in governors}
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(service: str) -> requests.Session:
+    """One keep-alive connection pool per upstream instance, shared by every thread."""
+    with _sessions_lock:
+        if service not in _sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[service] = session
+        return _sessions[service]
+
+
+def _release_on_close(response: requests.Response, release: Callable[[], None]):
+    """Run release once, when the response is closed, or collected unread."""
+    finalizer = weakref.finalize(response, release)
+    close = response.close
+
+    def close_and_release():
+        try:
+            close()
+        finally:
+            finalizer()
+
+    response.close = close_and_release
+
+
+def _baseline_key(endpoint: str, response: requests.Response) -> str:
+    """Endpoint plus the order of magnitude of the body, when the upstream sends Content-Length."""
+    length = response.headers.get("Content-Length", "")
+    return f"{endpoint}#{len(length) if length.isdigit() else '?'}"
+
+
+def upstream_get(service: str, url: str, headers: dict, timeout: float, **kwargs) -> requests.Response:
+    """
+    GET through the service's circuit breaker and concurrency governor,
+    waiting for a free slot first. With stream=True the slot stays taken
+    until the caller has read and closed the response (StreamedList and
+    decode_records do); the governor judges the latency when the headers
+    arrive. Raises CircuitOpenError or requests exceptions.
+    """
+    endpoint = urlsplit(url).path
+    breaker = get_breaker(service)
+    try:
+        breaker.before_call()
+    except CircuitOpenError:
+        UPSTREAM_ERRORS_TOTAL.inc(service=service, endpoint=endpoint, kind="circuit_open")
+        raise
+    governor = get_governor(service)
+    started = governor.acquire()
+    start = time.perf_counter()
+    stream = kwargs.get("stream", False)
+
+    def release():
+        governor.release()
+        UPSTREAM_REQUEST_SECONDS.observe(time.perf_counter() - start, service=service, endpoint=endpoint)
+
+    # Overload shows up as timeouts, refused connections and 5xx; other 4xx say nothing about load
+    ok = False
+    held = False
+    key, latency = endpoint, None
+    try:
+        response = get_session(service).get(url, headers=headers, timeout=(CONNECT_TIMEOUT, timeout), **kwargs)
+        # elapsed stops at the response headers, before any of the body is read
+        key, latency = _baseline_key(endpoint, response), response.elapsed.total_seconds()
+        try:
+            response.raise_for_status()
+        except requests.HTTPError:
+            # An unread streamed body would keep its pooled connection checked out
+            response.close()
+            raise
+        ok = True
+        if stream:
+            _release_on_close(response, release)
+            held = True
+    except requests.HTTPError as e:
+        status = e.response.status_code if e.response is not None else 0
+        ok = status < 500 and status != 429
+        UPSTREAM_ERRORS_TOTAL.inc(service=service, endpoint=endpoint, kind=f"http_{status}")
+        # A 404 for one resource says nothing about the upstream's health
+        if status == 404:
+            breaker.record_success()
+        else:
+            breaker.record_failure(e)
+        raise
+    except requests.RequestException as e:
+        kind = "timeout" if isinstance(e, requests.Timeout) else "connection"
+        UPSTREAM_ERRORS_TOTAL.inc(service=service, endpoint=endpoint, kind=kind)
+        breaker.record_failure(e)
+        raise
+    finally:
+        governor.record(key, started, ok, latency)
+        if not held:
+            release()
+    breaker.record_success()
+    return response
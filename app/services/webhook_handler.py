@@ -1,19 +1,35 @@
 import logging
+import queue
 import threading
+import time
+from collections import Counter
 from app.core.config import get_user_settings
+from app.core.coordination import coordination_db, get_leader_election
 from app.services.alert_log import get_alert_log
+from app.services.metrics import WEBHOOK_EVENTS_TOTAL, WEBHOOK_QUEUE_DEPTH
 
 logger = logging.getLogger(__name__)
 
-_timers = {}
-_timer_lock = threading.Lock()
+# Incoming webhook events are acknowledged immediately and processed here in batches
+WEBHOOK_QUEUE_SIZE = 1000
+WEBHOOK_BATCH_SIZE = 200
+WEBHOOK_BATCH_WINDOW_SECONDS = 0.5
+# How often the leader looks for rebuilds whose cooldown has run out
+DISPATCH_POLL_SECONDS = 1.0
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+_event_queue = queue.Queue(maxsize=WEBHOOK_QUEUE_SIZE)
+_worker = None
+_worker_lock = threading.Lock()
 
 
 def _do_rebuild(source: str):
-    from app.services.exclusions import get_exclusion_manager
+    from app.services.build_runner import run_build
     alerts = get_alert_log()
     try:
-        result = get_exclusion_manager().build_exclusions()
+        result = run_build(f"{source} webhook")
         total = result.get("total", 0)
         alerts.add("success", "builder", f"Exclusion build triggered by {source} completed — {total} exclusions written")
     except Exception as e:
@@ -21,8 +37,8 @@ def _do_rebuild(source: str):
         logger.error(f"[WEBHOOK] Build failed: {e}", exc_info=True)
 
 
-def trigger_rebuild(source: str):
-    settings = get_user_settings()
+def trigger_rebuild(source: str, settings=None, events: str = ""):
+    settings = settings or get_user_settings()
     alerts = get_alert_log()
 
     if not settings.webhooks.enabled:
@@ -30,16 +46,120 @@ def trigger_rebuild(source: str):
         return
 
     cooldown = settings.webhooks.cooldown_seconds
-    alerts.add("info", source, f"Webhook received from {source} — rebuild scheduled in {cooldown}s")
+    received = f"Webhook received from {source} ({events})" if events else f"Webhook received from {source}"
+    alerts.add("info", source, f"{received} — rebuild scheduled in {cooldown}s")
     logger.info(f"[WEBHOOK] Trigger from {source} — cooldown={cooldown}s")
 
-    with _timer_lock:
-        # Cancel existing timer if one is running
-        if source in _timers and _timers[source] is not None:
-            _timers[source].cancel()
-            logger.info(f"[WEBHOOK] Cooldown reset for {source}")
+    # The cooldown lives in the coordination database, so events landing on any worker share it
+    with coordination_db() as db:
+        pending = db.execute("SELECT 1 FROM pending_rebuilds WHERE source = ?", (source,)).fetchone()
+        db.execute("INSERT INTO pending_rebuilds (source, due_at) VALUES (?, ?) "
+                   "ON CONFLICT(source) DO UPDATE SET due_at = excluded.due_at", (source, time.time() + cooldown))
+    if pending:
+        logger.info(f"[WEBHOOK] Cooldown reset for {source}")
+    if get_leader_election().leads():
+        start_dispatcher()
+
+
+def pending_rebuilds() -> dict:
+    """Sources with a rebuild scheduled -> seconds until it runs."""
+    with coordination_db() as db:
+        rows = db.execute("SELECT source, due_at FROM pending_rebuilds").fetchall()
+    now = time.time()
+    return {source: max(0.0, round(due_at - now, 1)) for source, due_at in rows}
+
+
+def _take_due() -> list:
+    with coordination_db() as db:
+        now = time.time()
+        sources = [row[0] for row in db.execute(
+            "SELECT source FROM pending_rebuilds WHERE due_at <= ? ORDER BY due_at", (now,))]
+        db.execute("DELETE FROM pending_rebuilds WHERE due_at <= ?", (now,))
+    return sources
+
+
+def start_dispatcher():
+    """Leader only: run rebuilds once their cooldown has passed."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None or not _dispatcher.is_alive():
+            _dispatcher = threading.Thread(target=_dispatch_loop, name="webhook-dispatcher", daemon=True)
+            _dispatcher.start()
+            logger.info("[WEBHOOK] Rebuild dispatcher started")
+
+
+def _dispatch_loop():
+    while True:
+        try:
+            for source in _take_due():
+                _do_rebuild(source)
+        except Exception as e:
+            logger.error(f"[WEBHOOK] Dispatching rebuilds failed: {e}", exc_info=True)
+        time.sleep(DISPATCH_POLL_SECONDS)
+
+
+def enqueue_event(source: str, event: str) -> bool:
+    """Queue a webhook event for the batch worker. Returns False when the queue is full."""
+    _ensure_worker()
+    try:
+        _event_queue.put_nowait((source, event))
+        WEBHOOK_EVENTS_TOTAL.inc(source=source, result="queued")
+        return True
+    except queue.Full:
+        WEBHOOK_EVENTS_TOTAL.inc(source=source, result="rejected")
+        logger.warning(f"[WEBHOOK] Event queue full ({WEBHOOK_QUEUE_SIZE}) — rejecting {source} event {event!r}")
+        return False
+
+
+def get_queue_depth() -> int:
+    return _event_queue.qsize()
+
+
+WEBHOOK_QUEUE_DEPTH.callback = get_queue_depth
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_worker_loop, name="webhook-worker", daemon=True)
+            _worker.start()
+            logger.info("[WEBHOOK] Batch worker started")
+
+
+def _next_batch() -> list:
+    """Block for the first event, then collect more until the batch window closes or the batch is full."""
+    batch = [_event_queue.get()]
+    deadline = time.monotonic() + WEBHOOK_BATCH_WINDOW_SECONDS
+    while len(batch) < WEBHOOK_BATCH_SIZE:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(_event_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
+
+
+def _process_batch(batch: list):
+    settings = get_user_settings()
+    by_source = {}
+    for source, event in batch:
+        by_source.setdefault(source, Counter())[event] += 1
+
+    for source, events in by_source.items():
+        summary = ", ".join(f"{event} ×{count}" if count > 1 else event for event, count in events.most_common())
+        logger.info(f"[WEBHOOK] Processing {sum(events.values())} {source} event(s): {summary}")
+        trigger_rebuild(source, settings, summary)
+
 
-        t = threading.Timer(cooldown, _do_rebuild, args=[source])
-        t.daemon = True
-        _timers[source] = t
-        t.start()
+def _worker_loop():
+    while True:
+        batch = _next_batch()
+        try:
+            _process_batch(batch)
+        except Exception as e:
+            logger.error(f"[WEBHOOK] Failed to process batch of {len(batch)} event(s): {e}", exc_info=True)
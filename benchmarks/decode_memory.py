@@ -0,0 +1,84 @@
+"""
+Memory cost of decoding a Radarr movie list: the full response.json() dict
+tree versus the streamed compact Movie records from RadarrClient.
+
+Each method runs in its own process against a local Radarr stand-in.
+
+    python -m benchmarks.decode_memory --movies 50000
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fake_arr import FakeArrServer
+from benchmarks.run import _peak_rss_mb
+from benchmarks.synthetic import SyntheticLibrary
+
+METHODS = ("full_json", "compact_records")
+
+
+def _measure(method: str, url: str, config_dir: str, results):
+    os.environ["CONFIG_DIR"] = config_dir
+    import requests
+    from app.services.radarr import RadarrClient
+
+    client = RadarrClient()
+    client.url, client.api_key = url, "bench"
+    rss_before = _peak_rss_mb()
+    tracemalloc.start()
+    start = time.perf_counter()
+    if method == "full_json":
+        movies = requests.get(f"{url}/api/v3/movie", headers={"X-Api-Key": "bench"}, timeout=120).json()
+    else:
+        movies = client.get_all_movies()
+    wall = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results.put({
+        "movies": len(movies),
+        "wall_s": round(wall, 3),
+        "traced_peak_mb": round(peak / 1024 ** 2, 1),
+        "traced_retained_mb": round(retained / 1024 ** 2, 1),
+        "rss_growth_mb": round(_peak_rss_mb() - rss_before, 1),
+    })
+
+
+def run(movies: int) -> dict:
+    library = SyntheticLibrary(movies, 1, 1)
+    server = FakeArrServer("radarr", library).start()
+    config_dir = tempfile.mkdtemp(prefix="mtem-bench-")
+    with open(os.path.join(config_dir, "settings.json"), "w") as f:
+        json.dump({}, f)
+    ctx = multiprocessing.get_context("spawn")
+    out = {"movies": movies, "response_mb": round(len(server.respond("/api/v3/movie", {})) / 1024 ** 2, 1)}
+    try:
+        for method in METHODS:
+            results = ctx.Queue()
+            proc = ctx.Process(target=_measure, args=(method, server.url, config_dir, results))
+            proc.start()
+            out[method] = results.get(timeout=600)
+            proc.join()
+    finally:
+        server.stop()
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Radarr movie list decode memory benchmark")
+    parser.add_argument("--movies", type=int, default=50000)
+    parser.add_argument("--output", help="write the JSON result to this file")
+    args = parser.parse_args()
+
+    text = json.dumps(run(args.movies), indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Local Radarr/Sonarr stand-in serving a SyntheticLibrary over the v3 API
+endpoints MTEM calls, with per-endpoint request counters.
+
+Besides the API, two control endpoints are used by the harness:
+    GET  /__bench/counts            per-path request counts since the last reset
+    POST /__bench/reset             zero the counters
+    POST /__bench/touch?fraction=F  change a fraction of items (see SyntheticLibrary.touch)
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks.synthetic import TAGS
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle on, a keep-alive
+    # client waits out its delayed ACK (~40 ms) on every response
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path == "/__bench/reset":
+            self.server.reset_counts()
+            self._send(200, b"{}")
+        elif url.path == "/__bench/touch":
+            fraction = float(parse_qs(url.query).get("fraction", ["0.01"])[0])
+            self._send(200, json.dumps(self.server.touch(fraction)).encode())
+        else:
+            self._send(404, b"{}")
+
+    def do_PUT(self):
+        self.server.count(urlsplit(self.path).path.rsplit("/", 1)[0] + "/{id}")
+        length = int(self.headers.get("Content-Length") or 0)
+        self._send(202, self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/__bench/counts":
+            self._send(200, json.dumps(self.server.get_counts()).encode())
+            return
+        self.server.count(url.path)
+        delay = self.server.delay()
+        if delay:
+            time.sleep(delay)
+        body = self.server.respond(url.path, parse_qs(url.query))
+        if body is None:
+            self._send(404, b'{"message": "NotFound"}')
+            return
+        etag = self.server.etags.get(url.path)
+        if etag and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeArrServer(ThreadingHTTPServer):
+    """
+    kind is "radarr" or "sonarr"; list responses are serialised once up front.
+    With etag=True the list endpoints send ETags and honour If-None-Match
+    (real Radarr/Sonarr do not, so it is off by default). Each GET waits
+    latency_ms plus a uniform share of jitter_ms before answering.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, kind: str, library, port: int = 0, latency_ms: float = 0, etag: bool = False,
+                 jitter_ms: float = 0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.kind = kind
+        self.library = library
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self._counts = {}
+        self._counts_lock = threading.Lock()
+        self.use_etags = etag
+        self._static = {
+            "/api/v3/system/status": json.dumps({"appName": kind.title(), "version": "5.0.0.0-bench"}).encode(),
+            "/api/v3/tag": json.dumps(TAGS).encode(),
+        }
+        self.etags = {}
+        self._generation = library.generation
+        self._serialise()
+        self._thread = None
+
+    def delay(self) -> float:
+        return self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+
+    def _serialise(self):
+        if self.kind == "radarr":
+            self._static["/api/v3/movie"] = json.dumps(self.library.movies).encode()
+        else:
+            self._static["/api/v3/series"] = json.dumps(self.library.series).encode()
+        if self.use_etags:
+            for path in ("/api/v3/movie", "/api/v3/series"):
+                if path in self._static:
+                    self.etags[path] = '"%s"' % hashlib.sha1(self._static[path]).hexdigest()
+
+    def touch(self, fraction: float) -> dict:
+        """
+        Mutate the library and re-serialise this server's list. The library is
+        shared by both stand-ins: whichever is touched first mutates it, the
+        other only picks up the change.
+        """
+        with self._counts_lock:
+            changed = {}
+            if self._generation == self.library.generation:
+                changed = self.library.touch(fraction)
+            self._generation = self.library.generation
+            self._serialise()
+        return changed
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def respond(self, path: str, query: dict):
+        if path in self._static:
+            return self._static[path]
+        if path == "/api/v3/history":
+            # One record per library generation, so a touch shows up as new history
+            generation = self.library.generation
+            return json.dumps({"page": 1, "pageSize": 1, "totalRecords": generation + 1,
+                               "records": [{"id": generation + 1, "date": f"2026-01-01T00:00:{generation:02d}Z"}]}).encode()
+        if self.kind == "sonarr" and path == "/api/v3/episodefile":
+            try:
+                series_id = int(query.get("seriesId", ["0"])[0])
+            except ValueError:
+                return None
+            if not 1 <= series_id <= len(self.library.series):
+                return b"[]"
+            return json.dumps(self.library.episode_files(series_id)).encode()
+        return None
+
+    def count(self, path: str):
+        with self._counts_lock:
+            self._counts[path] = self._counts.get(path, 0) + 1
+
+    def get_counts(self) -> dict:
+        with self._counts_lock:
+            return dict(self._counts)
+
+    def reset_counts(self):
+        with self._counts_lock:
+            self._counts.clear()
+
+    def start(self) -> "FakeArrServer":
+        self._thread = threading.Thread(target=self.serve_forever, name=f"fake-{self.kind}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
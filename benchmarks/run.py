@@ -0,0 +1,322 @@
+"""
+End-to-end performance benchmark.
+
+Builds a synthetic library, cache tree, PlexCache export and mover logs in a
+throwaway directory, serves the library from local Radarr/Sonarr stand-ins and
+runs each scenario in a fresh process against it. Reports wall time, upstream
+request counts, peak RSS and the final concurrency limits per scenario as
+JSON, optionally compared with a previous run.
+
+    python -m benchmarks.run --scale large --output baseline.json
+    python -m benchmarks.run --scale large --compare baseline.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import requests
+
+from benchmarks.fake_arr import FakeArrServer
+from benchmarks.synthetic import (
+    SCALES, SyntheticLibrary, build_cache_tree, write_mover_logs, write_plexcache_file, write_settings,
+)
+
+SCENARIOS = {
+    "build": "Full exclusion build (cold process)",
+    "build_repeat": "Second exclusion build in the same process",
+    "build_changed": "Build after 1% of movies and series changed upstream",
+    "mover_stats": "CAMoverParser.get_latest_stats on the latest run",
+    "page_dashboard": "GET /dashboard/",
+    "page_movies": "GET /movies/ (cold library index)",
+    "page_shows": "GET /shows/ (cold library index)",
+    "api_movies": "GET /movies/api/items first page, sorted by title",
+    "page_stats": "GET /stats",
+}
+
+
+def _peak_rss_mb() -> float:
+    # VmHWM is per address space; ru_maxrss on Linux survives exec and would
+    # report the parent's peak (which holds the synthetic library)
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 ** 2 if sys.platform == "darwin" else 1024), 1)
+
+
+def _page(path: str):
+    import asyncio
+    from app.services.profiler import render_page
+    status, body = asyncio.run(render_page(path))
+    if status != 200:
+        raise RuntimeError(f"GET {path} returned {status}")
+    return {"status": status, "bytes": len(body)}
+
+
+def _scenario(name: str, log_dir: str, control):
+    """Returns a zero-argument callable for the measured part of a scenario."""
+    from app.services import ca_mover
+    # The stats page reads through the parser singleton; point it at the synthetic logs
+    ca_mover._parser_instance = ca_mover.CAMoverParser(log_dir)
+
+    if name.startswith("build"):
+        from app.services.exclusions import get_exclusion_manager
+        manager = get_exclusion_manager()
+        if name in ("build_repeat", "build_changed"):
+            manager.build_exclusions()
+            if name == "build_changed":
+                control("touch", fraction=0.01)
+            control("reset")
+        return manager.build_exclusions
+    if name == "mover_stats":
+        return ca_mover.get_mover_parser().get_latest_stats
+    paths = {
+        "page_dashboard": "/dashboard/",
+        "page_movies": "/movies/",
+        "page_shows": "/shows/",
+        "api_movies": "/movies/api/items?sort=title&limit=100",
+        "page_stats": "/stats",
+    }
+    return lambda: _page(paths[name])
+
+
+def _child(name: str, config_dir: str, log_dir: str, control_urls: list, results):
+    os.environ["CONFIG_DIR"] = config_dir
+    try:
+        def control(action: str, **params):
+            for url in control_urls:
+                requests.post(f"{url}/__bench/{action}", params=params, timeout=60).raise_for_status()
+
+        # Import the app up front so import cost is not part of the measurement
+        import app.main  # noqa: F401
+        rss_after_import = _peak_rss_mb()
+        fn = _scenario(name, log_dir, control)
+        start = time.perf_counter()
+        outcome = fn()
+        wall = time.perf_counter() - start
+        from app.services.upstream import get_governor_states
+        results.put({
+            "wall_s": round(wall, 4),
+            "peak_rss_mb": _peak_rss_mb(),
+            "rss_after_import_mb": rss_after_import,
+            "concurrency": get_governor_states(),
+            "result": _summarise(outcome),
+        })
+    except Exception as e:
+        results.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def _summarise(outcome):
+    if isinstance(outcome, dict):
+        return {k: v for k, v in outcome.items() if isinstance(v, (int, float, str, bool, dict))}
+    return outcome if isinstance(outcome, (int, float, str, bool, type(None))) else repr(outcome)[:200]
+
+
+def _counts(servers: dict) -> dict:
+    counts = {}
+    for kind, server in servers.items():
+        for path, n in server.get_counts().items():
+            counts[f"{kind} {path}"] = n
+    return counts
+
+
+def run_scenario(name: str, env: dict, servers: dict, repeat: int, timeout: float) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    runs = []
+    for _ in range(repeat):
+        for server in servers.values():
+            server.reset_counts()
+        # Every run starts from the prepared config, without snapshots or caches left by earlier runs
+        config_dir = tempfile.mkdtemp(prefix=f"{name}-", dir=env["workdir"])
+        shutil.copytree(env["config_dir"], config_dir, dirs_exist_ok=True)
+        results = ctx.Queue()
+        proc = ctx.Process(
+            target=_child,
+            args=(name, config_dir, env["log_dir"], [s.url for s in servers.values()], results),
+        )
+        proc.start()
+        try:
+            outcome = results.get(timeout=timeout)
+        except Exception:
+            proc.kill()
+            outcome = {"error": f"timed out after {timeout}s"}
+        proc.join()
+        shutil.rmtree(config_dir, ignore_errors=True)
+        if "error" not in outcome and proc.exitcode not in (0, None):
+            outcome = {"error": f"worker exited with {proc.exitcode}"}
+        if "error" in outcome:
+            return {"description": SCENARIOS[name], "error": outcome["error"]}
+        counts = _counts(servers)
+        outcome["requests"] = counts
+        outcome["request_total"] = sum(counts.values())
+        runs.append(outcome)
+
+    walls = [r["wall_s"] for r in runs]
+    last = runs[-1]
+    return {
+        "description": SCENARIOS[name],
+        "wall_s": round(statistics.median(walls), 4),
+        "wall_s_min": min(walls),
+        "peak_rss_mb": max(r["peak_rss_mb"] for r in runs),
+        "rss_after_import_mb": last["rss_after_import_mb"],
+        "request_total": last["request_total"],
+        "requests": last["requests"],
+        "concurrency": last["concurrency"],
+        "result": last["result"],
+    }
+
+
+def prepare(workdir: str, dims: dict, plexcache_entries: int, latency_ms: float, etag: bool = False,
+            jitter_ms: float = 0) -> tuple:
+    config_dir = os.path.join(workdir, "config")
+    cache_dir = os.path.join(workdir, "cache")
+    log_dir = os.path.join(workdir, "mover_logs")
+    os.makedirs(config_dir)
+    os.makedirs(cache_dir)
+
+    started = time.perf_counter()
+    library = SyntheticLibrary(dims["movies"], dims["series"], dims["episodes"])
+    servers = {
+        "radarr": FakeArrServer("radarr", library, latency_ms=latency_ms, etag=etag, jitter_ms=jitter_ms).start(),
+        "sonarr": FakeArrServer("sonarr", library, latency_ms=latency_ms, etag=etag, jitter_ms=jitter_ms).start(),
+    }
+    plexcache_path = os.path.join(workdir, "plexcache_exclusions.txt")
+    tree = build_cache_tree(library, cache_dir)
+    write_plexcache_file(library, plexcache_path, plexcache_entries)
+    write_mover_logs(log_dir, filtered=len(library.tagged_movies()) * 2, moved=max(1, dims["movies"] // 100),
+                     host_prefix="/mnt/host")
+    write_settings(config_dir, servers["radarr"].url, servers["sonarr"].url, cache_dir, plexcache_path,
+                   os.path.join(log_dir, "ca.mover.tuning.log"))
+    setup = {
+        "cache_files": tree["files"],
+        "tagged_movies": len(library.tagged_movies()),
+        "tagged_series": len(library.tagged_series()),
+        "setup_s": round(time.perf_counter() - started, 2),
+    }
+    return {"workdir": workdir, "config_dir": config_dir, "log_dir": log_dir}, servers, setup
+
+
+def compare(current: dict, baseline: dict) -> dict:
+    """Per-scenario deltas against a previous result file (positive = slower/larger)."""
+    out = {}
+    for name, cur in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base or "error" in cur or "error" in base:
+            continue
+        row = {}
+        for key in ("wall_s", "peak_rss_mb", "request_total"):
+            before, after = base.get(key), cur.get(key)
+            if before is None or after is None:
+                continue
+            row[key] = {
+                "before": before,
+                "after": after,
+                "change_pct": round((after - before) / before * 100, 1) if before else None,
+            }
+        out[name] = row
+    return out
+
+
+def _print_comparison(comparison: dict):
+    print(f"{'scenario':<16} {'wall_s':>22} {'peak_rss_mb':>24} {'requests':>18}", file=sys.stderr)
+    for name, row in comparison.items():
+        cells = []
+        for key in ("wall_s", "peak_rss_mb", "request_total"):
+            c = row.get(key)
+            pct = f"{c['change_pct']:+.1f}%" if c and c["change_pct"] is not None else "n/a"
+            cells.append(f"{c['before']}→{c['after']} ({pct})" if c else "-")
+        print(f"{name:<16} {cells[0]:>22} {cells[1]:>24} {cells[2]:>18}", file=sys.stderr)
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              timeout=10).stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exclusion build / page render benchmark against synthetic libraries")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--movies", type=int, help="override the scale's movie count")
+    parser.add_argument("--series", type=int, help="override the scale's series count")
+    parser.add_argument("--episodes", type=int, help="override the scale's total episode file count")
+    parser.add_argument("--plexcache-entries", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=0, help="artificial per-request upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=0,
+                        help="extra random 0..N ms per request, for variable latency")
+    parser.add_argument("--etag", action="store_true", help="stand-ins send ETags and answer If-None-Match with 304")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="run only these (repeatable)")
+    parser.add_argument("--repeat", type=int, default=1, help="fresh-process runs per scenario; wall_s is the median")
+    parser.add_argument("--timeout", type=float, default=1800, help="seconds before a scenario is abandoned")
+    parser.add_argument("--output", help="write the JSON result to this file")
+    parser.add_argument("--compare", help="previous JSON result to compare against")
+    parser.add_argument("--keep", action="store_true", help="keep the synthetic working directory")
+    args = parser.parse_args()
+
+    dims = dict(SCALES[args.scale])
+    for key in ("movies", "series", "episodes"):
+        if getattr(args, key) is not None:
+            dims[key] = getattr(args, key)
+
+    workdir = tempfile.mkdtemp(prefix="mtem-bench-")
+    env, servers, setup = prepare(workdir, dims, args.plexcache_entries, args.latency_ms, args.etag, args.jitter_ms)
+    try:
+        scenarios = {}
+        for name in args.scenario or list(SCENARIOS):
+            print(f"[bench] {name} …", file=sys.stderr)
+            scenarios[name] = run_scenario(name, env, servers, max(1, args.repeat), args.timeout)
+    finally:
+        for server in servers.values():
+            server.stop()
+        if args.keep:
+            print(f"[bench] working directory kept at {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "scale": args.scale,
+            "dimensions": dims,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "etag": args.etag,
+            "repeat": args.repeat,
+            "setup": setup,
+        },
+        "scenarios": scenarios,
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            result["comparison"] = compare(result, json.load(f))
+        _print_comparison(result["comparison"])
+
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
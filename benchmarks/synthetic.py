@@ -0,0 +1,202 @@
+"""
+Deterministic synthetic media libraries, cache tree, PlexCache export and
+CA Mover logs for the benchmark harness.
+"""
+import json
+import os
+import random
+
+SCALES = {
+    "small": {"movies": 2000, "series": 200, "episodes": 10000},
+    "medium": {"movies": 10000, "series": 1000, "episodes": 100000},
+    "large": {"movies": 50000, "series": 5000, "episodes": 500000},
+}
+
+TAGS = [{"id": 1, "label": "keep-cache"}, {"id": 2, "label": "4k"}, {"id": 3, "label": "kids"}, {"id": 4, "label": "anime"}]
+KEEP_TAG = 1
+
+MOVIE_ROOT = "/data/media/movies"
+TV_ROOT = "/data/media/tv"
+PLEXCACHE_ROOT = "/plex"
+
+
+class SyntheticLibrary:
+    """
+    Movies and series are generated up front; episode files are derived from
+    the series id on demand so a 500k-episode library never sits in memory.
+    """
+
+    def __init__(self, movies: int, series: int, episodes: int, tagged_fraction: float = 0.1,
+                 on_cache_fraction: float = 0.5, seed: int = 42):
+        self.rng = random.Random(seed)
+        self.tagged_fraction = tagged_fraction
+        self.on_cache_fraction = on_cache_fraction
+        self.episodes_per_series = max(1, episodes // max(1, series))
+        self.generation = 0
+        self.movies = [self._movie(i) for i in range(1, movies + 1)]
+        self.series = [self._series(i) for i in range(1, series + 1)]
+
+    def _tags(self) -> list:
+        tags = []
+        if self.rng.random() < self.tagged_fraction:
+            tags.append(KEEP_TAG)
+        for tag in TAGS[1:]:
+            if self.rng.random() < 0.05:
+                tags.append(tag["id"])
+        return tags
+
+    def _movie(self, i: int) -> dict:
+        year = 1950 + i % 75
+        title = f"Synthetic Movie {i}"
+        folder = f"{MOVIE_ROOT}/{title} ({year})"
+        movie = {
+            "id": i,
+            "title": title,
+            "sortTitle": title.lower(),
+            "year": year,
+            "tags": self._tags(),
+            "path": folder,
+            "hasFile": True,
+            "overview": "A synthetic movie used for benchmarking. " * 6,
+            "images": [{"coverType": "poster", "url": f"/MediaCover/{i}/poster.jpg"},
+                       {"coverType": "fanart", "url": f"/MediaCover/{i}/fanart.jpg"}],
+            "ratings": {"imdb": {"votes": i * 7, "value": 6.5}, "tmdb": {"votes": i * 3, "value": 7.1}},
+            "alternateTitles": [{"title": f"{title} Alt {n}", "sourceType": "tmdb"} for n in range(3)],
+            "genres": ["Drama", "Comedy"],
+            "movieFile": {
+                "id": i,
+                "path": f"{folder}/{title} ({year}) Bluray-1080p.mkv",
+                "size": 4_000_000_000 + i * 1013,
+                "dateAdded": f"20{10 + i % 15:02d}-0{1 + i % 9}-1{i % 10}T12:00:00Z",
+                "quality": {"quality": {"id": 7, "name": "Bluray-1080p"}},
+                "mediaInfo": {"videoCodec": "x264", "audioCodec": "DTS", "resolution": "1920x1080"},
+            },
+        }
+        return movie
+
+    def _series(self, i: int) -> dict:
+        year = 1990 + i % 35
+        title = f"Synthetic Show {i}"
+        seasons = 1 + i % 8
+        return {
+            "id": i,
+            "title": title,
+            "sortTitle": title.lower(),
+            "year": year,
+            "seasonCount": seasons,
+            "tags": self._tags(),
+            "path": f"{TV_ROOT}/{title}",
+            "overview": "A synthetic series used for benchmarking. " * 6,
+            "images": [{"coverType": "poster", "url": f"/MediaCover/{i}/poster.jpg"}],
+            "seasons": [{"seasonNumber": s, "monitored": True} for s in range(1, seasons + 1)],
+            "statistics": {
+                "episodeFileCount": self.episodes_per_series,
+                "sizeOnDisk": self.episodes_per_series * 1_500_000_000,
+            },
+        }
+
+    def episode_files(self, series_id: int) -> list:
+        series = self.series[series_id - 1]
+        files = []
+        for e in range(series["statistics"]["episodeFileCount"]):
+            season = 1 + e % series["seasonCount"]
+            files.append({
+                "id": series_id * 100000 + e,
+                "seriesId": series_id,
+                "seasonNumber": season,
+                "path": f"{series['path']}/Season {season:02d}/{series['title']} - S{season:02d}E{e + 1:03d}.mkv",
+                "size": 1_500_000_000,
+                "dateAdded": "2024-01-01T00:00:00Z",
+                "quality": {"quality": {"id": 7, "name": "HDTV-1080p"}},
+            })
+        return files
+
+    def touch(self, fraction: float, seed: int = 99) -> dict:
+        """Simulate library activity: a fraction of movies get a new file and of series gain an episode."""
+        rng = random.Random(seed + self.generation)
+        movies = rng.sample(self.movies, max(1, int(len(self.movies) * fraction)))
+        for movie in movies:
+            movie["movieFile"]["path"] = movie["movieFile"]["path"].replace("Bluray-1080p", "Remux-2160p")
+            movie["movieFile"]["size"] += 10_000_000_000
+        series = rng.sample(self.series, max(1, int(len(self.series) * fraction)))
+        for s in series:
+            s["statistics"]["episodeFileCount"] += 1
+            s["statistics"]["sizeOnDisk"] += 1_500_000_000
+        self.generation += 1
+        return {"movies": len(movies), "series": len(series)}
+
+    def tagged_movies(self) -> list:
+        return [m for m in self.movies if KEEP_TAG in m["tags"]]
+
+    def tagged_series(self) -> list:
+        return [s for s in self.series if KEEP_TAG in s["tags"]]
+
+
+def _touch(path: str, size: int):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        # Sparse file: realistic st_size without using disk space
+        f.truncate(size)
+
+
+def build_cache_tree(library: SyntheticLibrary, cache_dir: str) -> dict:
+    """Create a fraction of the tagged items' files under cache_dir (as the container sees the cache pool)."""
+    rng = random.Random(7)
+    created = 0
+    for movie in library.tagged_movies():
+        if rng.random() < library.on_cache_fraction:
+            _touch(cache_dir + movie["movieFile"]["path"], movie["movieFile"]["size"])
+            created += 1
+    for series in library.tagged_series():
+        if rng.random() < library.on_cache_fraction:
+            for ep in library.episode_files(series["id"]):
+                _touch(cache_dir + ep["path"], ep["size"])
+                created += 1
+    return {"files": created}
+
+
+def write_plexcache_file(library: SyntheticLibrary, path: str, entries: int) -> int:
+    rng = random.Random(11)
+    picked = rng.sample(library.movies, min(entries, len(library.movies)))
+    with open(path, "w") as f:
+        f.write("# PlexCache-D exclusion export (synthetic)\n")
+        for movie in picked:
+            f.write(movie["movieFile"]["path"].replace("/data/media", PLEXCACHE_ROOT, 1) + "\n")
+    return len(picked)
+
+
+def write_mover_logs(log_dir: str, filtered: int, moved: int, host_prefix: str, timestamp: str = "2026-01-01T030000"):
+    os.makedirs(log_dir, exist_ok=True)
+    with open(os.path.join(log_dir, f"Summary_{timestamp}.txt"), "w") as f:
+        f.write("NAME|FILES_FROM_PRIMARY|SIZE_FROM_PRIMARY\n")
+        f.write(f"data|{moved}|{moved * 1_500_000_000}\n")
+        f.write(f"TOTAL|{moved}|{moved * 1_500_000_000}\n")
+    with open(os.path.join(log_dir, f"Filtered_files_{timestamp}.list"), "w") as f:
+        f.write("PRIMARY|FILE\n")
+        for i in range(filtered):
+            f.write(f"cache|{host_prefix}{TV_ROOT}/Filtered Show {i // 50}/Season 01/Episode {i}.mkv\n")
+    with open(os.path.join(log_dir, f"Mover_action_{timestamp}.list"), "w") as f:
+        f.write("ACTION|FILE\n")
+        for i in range(moved):
+            f.write(f"move|{host_prefix}{MOVIE_ROOT}/Moved Movie {i}/Moved Movie {i}.mkv\n")
+
+
+def write_settings(config_dir: str, radarr_url: str, sonarr_url: str, cache_dir: str, plexcache_path: str, log_path: str):
+    settings = {
+        "radarr": {"url": radarr_url, "api_key": "bench"},
+        "sonarr": {"url": sonarr_url, "api_key": "bench"},
+        "exclusions": {
+            "radarr_exclude_tag_ids": [KEEP_TAG],
+            "sonarr_exclude_tag_ids": [KEEP_TAG],
+            "plexcache_file_path": plexcache_path,
+            "ca_mover_log_path": log_path,
+            "cache_mount_path": cache_dir,
+            "host_cache_path": "/mnt/host",
+            "radarr_mapping": {"from_prefix": "/data/", "to_prefix": "/mnt/host/data/"},
+            "sonarr_mapping": {"from_prefix": "/data/", "to_prefix": "/mnt/host/data/"},
+            "plexcache_mapping": {"from_prefix": f"{PLEXCACHE_ROOT}/", "to_prefix": "/mnt/host/data/media/"},
+        },
+        "webhooks": {"enabled": True, "cooldown_seconds": 3600},
+    }
+    with open(os.path.join(config_dir, "settings.json"), "w") as f:
+        json.dump(settings, f, indent=2)
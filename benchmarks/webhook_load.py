@@ -0,0 +1,148 @@
+"""
+Webhook ingestion load benchmark.
+
+Starts the webhook router under uvicorn in a child process (against a throwaway
+CONFIG_DIR) and hammers /webhooks/radarr and /webhooks/sonarr from a pool of
+client threads. Reports sustained requests/second and latency percentiles.
+
+    python -m benchmarks.webhook_load --duration 10 --concurrency 32
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import tempfile
+import threading
+import time
+
+import requests
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _serve(config_dir: str, port: int):
+    os.environ["CONFIG_DIR"] = config_dir
+    import uvicorn
+    from fastapi import FastAPI
+    from app.routers import webhooks
+
+    app = FastAPI()
+    app.include_router(webhooks.router, prefix="/webhooks")
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+def _write_settings(config_dir: str):
+    # Long cooldown so no exclusion build fires while the benchmark is running
+    settings = {"webhooks": {"enabled": True, "cooldown_seconds": 3600}}
+    with open(os.path.join(config_dir, "settings.json"), "w") as f:
+        json.dump(settings, f)
+
+
+def _wait_until_up(base_url: str, timeout: float = 20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"{base_url}/webhooks/status", timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.1)
+    raise RuntimeError("benchmark server did not start")
+
+
+def _client(base_url: str, stop_at: float, latencies: list, errors: list):
+    session = requests.Session()
+    payloads = [
+        ("radarr", {"eventType": "Download", "movie": {"id": 1, "title": "Bench"}}),
+        ("sonarr", {"eventType": "Download", "series": {"id": 1, "title": "Bench"}}),
+    ]
+    i = 0
+    local_latencies = []
+    local_errors = 0
+    while time.monotonic() < stop_at:
+        source, payload = payloads[i % 2]
+        i += 1
+        start = time.perf_counter()
+        try:
+            r = session.post(f"{base_url}/webhooks/{source}", json=payload, timeout=10)
+            if r.status_code != 200:
+                local_errors += 1
+        except requests.RequestException:
+            local_errors += 1
+        local_latencies.append(time.perf_counter() - start)
+    latencies.extend(local_latencies)
+    errors.append(local_errors)
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def run(duration: float, concurrency: int) -> dict:
+    config_dir = tempfile.mkdtemp(prefix="mtem-bench-")
+    _write_settings(config_dir)
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+
+    server = multiprocessing.Process(target=_serve, args=(config_dir, port), daemon=True)
+    server.start()
+    try:
+        _wait_until_up(base_url)
+        latencies, errors = [], []
+        stop_at = time.monotonic() + duration
+        threads = [
+            threading.Thread(target=_client, args=(base_url, stop_at, latencies, errors))
+            for _ in range(concurrency)
+        ]
+        started = time.monotonic()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.monotonic() - started
+        queue_depth = requests.get(f"{base_url}/webhooks/status", timeout=5).json().get("queue_depth")
+    finally:
+        server.terminate()
+        server.join()
+
+    latencies.sort()
+    return {
+        "duration_s": round(elapsed, 2),
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": sum(errors),
+        "requests_per_second": round(len(latencies) / elapsed, 1) if elapsed else 0,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50) * 1000, 2),
+            "p95": round(_percentile(latencies, 95) * 1000, 2),
+            "p99": round(_percentile(latencies, 99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2) if latencies else 0,
+        },
+        "queue_depth_at_end": queue_depth,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Webhook ingestion load benchmark")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of sustained load")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent client threads")
+    parser.add_argument("--output", help="write the JSON result to this file")
+    args = parser.parse_args()
+
+    result = run(args.duration, args.concurrency)
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()